@@ -1,11 +1,17 @@
-<<<<<<< HEAD
 import os
-from warcio.archiveiterator import ArchiveIterator
-import gzip
-from clear_redundancy import remove_long_repeated_substrings, remove_html_tags, clean_text
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tools.clear_redundancy import remove_long_repeated_substrings, remove_html_tags, clean_text
+from tools.record_index import count_records, iter_records_in_range
+from tools.charset import decode_html, format_charset_stats
 import re
 from tqdm import tqdm
 
+# 将项目根目录添加到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shard_store import ShardWriter
+
 # 设置代理
 os.environ['http_proxy'] = 'http://127.0.0.1:7890'
 os.environ['https_proxy'] = 'http://127.0.0.1:7890'
@@ -18,109 +24,98 @@ def url_to_filename(url):
     # 限制文件名长度，防止过长
     return filename[:100] + ".html"
 
-def convert_warc_to_htmls(warc_path, htmls_dir):
+def _write_file(item):
+    path, data = item
+    with open(path, "wb") as f:
+        f.write(data)
+
+class BatchedFileWriter:
     """
-    将指定的 WARC 文件中的网页内容提取并保存为 HTML 文件到指定目录
-    :param warc_path: 采样后的 WARC 文件路径
-    :param htmls_dir: 保存 HTML 文件的目标目录
+    批量写小文件：先在内存中攒一批，再交给线程池并发写出，
+    避免每条记录都在解析线程里同步地 open/write/close
     """
-    urls = []
-    os.makedirs(htmls_dir, exist_ok=True)
-    # 先统计 response 记录总数
-    total = 0
-    with gzip.open(warc_path, 'rb') as stream:
-        for record in ArchiveIterator(stream):
-            if record.rec_type == 'response':
-                total += 1
-    # 再次遍历并处理
-    with gzip.open(warc_path, 'rb') as stream:
-        for record in tqdm(ArchiveIterator(stream), total=total, desc="提取HTML"):
-            if record.rec_type == 'response':
-                url = record.rec_headers.get_header('WARC-Target-URI')
-                payload = record.content_stream().read()
-                try:
-                    html = payload.decode('utf-8', errors='ignore')
-                    html = remove_html_tags(html)
-                    html = clean_text(html)
-                    html = remove_long_repeated_substrings(html)
-                    if len(html.strip()) == 0:
-                        continue
-                except Exception as e:
-                    print("解析正文失败：", e)
-                    continue
-                urls.append(url)
-                filename = url_to_filename(url)
-                # 保存HTML内容到文件
-                with open(os.path.join(htmls_dir, filename), "wb") as f:
-                    f.write(payload)
-    print(f"已保存 {len(urls)} 个网页到 {htmls_dir}")
-    return urls
+    def __init__(self, batch_size=256, max_buffer_bytes=64 * 1024 * 1024, threads=8):
+        self.batch_size = batch_size
+        self.max_buffer_bytes = max_buffer_bytes
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+        self.buffer = []
+        self.buffer_bytes = 0
 
-# 示例用法
-if __name__ == "__main__":
-    warc_path = './warc/warc_files/CC-MAIN-20250315031626-20250315061626-00000-sample3000.warc.gz'
-    htmls_dir = '../htmls'
-=======
-import os
-from warcio.archiveiterator import ArchiveIterator
-import gzip
-from clear_redundancy import remove_long_repeated_substrings, remove_html_tags, clean_text
-import re
-from tqdm import tqdm
+    def write(self, path, data):
+        self.buffer.append((path, data))
+        self.buffer_bytes += len(data)
+        if len(self.buffer) >= self.batch_size or self.buffer_bytes >= self.max_buffer_bytes:
+            self.flush()
 
-# 设置代理
-os.environ['http_proxy'] = 'http://127.0.0.1:7890'
-os.environ['https_proxy'] = 'http://127.0.0.1:7890'
+    def flush(self):
+        if self.buffer:
+            # list() 等待整批写完并抛出其中的异常
+            list(self.pool.map(_write_file, self.buffer))
+            self.buffer = []
+            self.buffer_bytes = 0
 
-def url_to_filename(url):
-    # 去除协议头
-    filename = re.sub(r'^https?://', '', url)
-    # 替换所有非字母数字的字符为下划线
-    filename = re.sub(r'[^a-zA-Z0-9]', '_', filename)
-    # 限制文件名长度，防止过长
-    return filename[:100] + ".html"
+    def close(self):
+        self.flush()
+        self.pool.shutdown()
 
-def convert_warc_to_htmls(warc_path, htmls_dir):
+def convert_warc_to_htmls(warc_path, htmls_dir, batch_size=256, output_format="html",
+                          max_shard_bytes=256 * 1024 * 1024, byte_range=None):
     """
     将指定的 WARC 文件中的网页内容提取并保存为 HTML 文件到指定目录
+    WARC 只解压一遍：进度条总数取自旁路记录索引（subsample_chinese_warc 会生成），没有索引时不显示总数
     :param warc_path: 采样后的 WARC 文件路径
-    :param htmls_dir: 保存 HTML 文件的目标目录
+    :param htmls_dir: 保存 HTML 文件（或分片）的目标目录
+    :param batch_size: 每攒多少个文件批量写出一次，仅 html 模式有效
+    :param output_format: "html" 每个网页一个文件；"shard" 打包写入有大小上限的分片（见 shard_store），
+                          每个文档为 {"id", "url", "text", "html"}，TextQualityFilter 可直接读取
+    :param max_shard_bytes: shard 模式下单个分片的最大字节数
+    :param byte_range: 可选的 (start, end) 字节区间，边界须为记录起始位置，用于中断后从索引中的某条记录继续
+    正文按 HTTP 头、meta 标签声明或检测到的字符集解码（见 tools.charset），无法解码的网页跳过
     """
     urls = []
+    charset_stats = {}
     os.makedirs(htmls_dir, exist_ok=True)
-    # 先统计 response 记录总数
-    total = 0
-    with gzip.open(warc_path, 'rb') as stream:
-        for record in ArchiveIterator(stream):
-            if record.rec_type == 'response':
-                total += 1
-    # 再次遍历并处理
-    with gzip.open(warc_path, 'rb') as stream:
-        for record in tqdm(ArchiveIterator(stream), total=total, desc="提取HTML"):
+    total = count_records(warc_path, 'response') if byte_range is None else None
+    start, end = byte_range or (0, None)
+    if output_format == "shard":
+        shard_prefix = os.path.basename(warc_path).split('.')[0]
+        writer = ShardWriter(htmls_dir, prefix=shard_prefix, max_shard_bytes=max_shard_bytes)
+    else:
+        writer = BatchedFileWriter(batch_size=batch_size)
+    try:
+        for offset, record in tqdm(iter_records_in_range(warc_path, start, end), total=total, desc="提取HTML"):
             if record.rec_type == 'response':
                 url = record.rec_headers.get_header('WARC-Target-URI')
                 payload = record.content_stream().read()
                 try:
-                    html = payload.decode('utf-8', errors='ignore')
-                    html = remove_html_tags(html)
-                    html = clean_text(html)
-                    html = remove_long_repeated_substrings(html)
-                    if len(html.strip()) == 0:
+                    content_type = record.http_headers.get_header('Content-Type') if record.http_headers else None
+                    html, charset = decode_html(payload, content_type, charset_stats)
+                    if charset is None:
+                        continue
+                    text = remove_html_tags(html)
+                    text = clean_text(text)
+                    text = remove_long_repeated_substrings(text)
+                    if len(text.strip()) == 0:
                         continue
                 except Exception as e:
                     print("解析正文失败：", e)
                     continue
                 urls.append(url)
-                filename = url_to_filename(url)
-                # 保存HTML内容到文件
-                with open(os.path.join(htmls_dir, filename), "wb") as f:
-                    f.write(payload)
+                if output_format == "shard":
+                    writer.write({"id": url, "url": url, "text": text, "html": html})
+                else:
+                    filename = url_to_filename(url)
+                    # 保存HTML内容到文件，非UTF-8网页转为UTF-8保存，下游统一按UTF-8读取
+                    data = payload if charset == 'utf-8' else html.encode('utf-8')
+                    writer.write(os.path.join(htmls_dir, filename), data)
+    finally:
+        writer.close()
     print(f"已保存 {len(urls)} 个网页到 {htmls_dir}")
+    print(f"字符集统计:\n{format_charset_stats(charset_stats)}")
     return urls
 
 # 示例用法
 if __name__ == "__main__":
     warc_path = './warc/warc_files/CC-MAIN-20250315031626-20250315061626-00000-sample3000.warc.gz'
     htmls_dir = '../htmls'
->>>>>>> 8f019371d2553e62d8f0ac92a7aaa5c3567f92a7
-    convert_warc_to_htmls(warc_path, htmls_dir)
\ No newline at end of file
+    convert_warc_to_htmls(warc_path, htmls_dir)
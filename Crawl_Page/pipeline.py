@@ -0,0 +1,95 @@
+"""
+WARC处理流水线
+下载、中文筛选、HTML提取三个阶段各占一个线程，阶段之间用有界队列连接：
+第N+1个文件下载的同时筛选第N个文件、提取第N-1个文件，队列满时上游阶段阻塞等待（背压）
+"""
+import os
+import time
+import queue
+import threading
+from warc.download_warcfile import BASE_URL, read_warc_paths, download_file
+from subsample_warc_warc import subsample_chinese_warc
+from convert_warc_to_htmls import convert_warc_to_htmls
+
+_DONE = object()  # 阶段结束标记
+
+
+def _stage_log(stage, message):
+    print(f"[{stage}] {time.strftime('%H:%M:%S')} {message}", flush=True)
+
+
+def _run_stage(stage, inbox, outbox, work, stats):
+    """
+    通用阶段循环：从 inbox 取任务，调用 work 处理，非空结果放入 outbox
+    单个任务出错只记录并跳过，无论如何都会向下游发送结束标记，避免下游永久阻塞
+    """
+    try:
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            start = time.time()
+            _stage_log(stage, f"开始处理 {item}")
+            try:
+                result = work(item)
+            except Exception as e:
+                stats["error"] += 1
+                _stage_log(stage, f"处理 {item} 出错: {e}")
+                continue
+            stats["done"] += 1
+            stats["seconds"] += time.time() - start
+            _stage_log(stage, f"完成 {item}，耗时 {time.time() - start:.1f}s（已完成 {stats['done']} 个）")
+            if outbox is not None and result is not None:
+                outbox.put(result)  # 下游队列满时在此阻塞
+    finally:
+        if outbox is not None:
+            outbox.put(_DONE)
+
+
+def run_pipeline(output_dir, htmls_dir, download_numbers=1, queue_size=1,
+                 parts_per_file=4, filter_workers=1):
+    """
+    流水线方式执行 下载 -> 中文筛选 -> HTML提取
+    :param output_dir: WARC文件下载目录
+    :param htmls_dir: HTML文件保存目录
+    :param download_numbers: 下载 warc.paths 中前多少个文件
+    :param queue_size: 阶段之间队列的容量，决定下载最多可以领先处理多少个文件
+    :param parts_per_file: 每个文件的并行下载分段数
+    :param filter_workers: 中文筛选的进程数，默认 1 即在筛选线程内串行处理；
+                           大于 1 或 None（全部CPU核）时会在其他阶段线程运行期间创建进程池，须显式指定
+    :return: 各阶段统计信息
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    urls = read_warc_paths('./warc.paths', download_numbers)
+
+    url_queue = queue.Queue()
+    filter_queue = queue.Queue(maxsize=queue_size)
+    convert_queue = queue.Queue(maxsize=queue_size)
+    for url in urls:
+        url_queue.put(url)
+    url_queue.put(_DONE)
+
+    stats = {stage: {"done": 0, "error": 0, "seconds": 0.0} for stage in ("下载", "筛选", "提取")}
+    stages = [
+        ("下载", url_queue, filter_queue,
+         lambda url: download_file(BASE_URL + url, output_dir, parts=parts_per_file)),
+        ("筛选", filter_queue, convert_queue,
+         lambda path: subsample_chinese_warc(path, workers=filter_workers)),
+        ("提取", convert_queue, None,
+         lambda path: convert_warc_to_htmls(path, htmls_dir)),
+    ]
+    threads = [
+        threading.Thread(target=_run_stage, args=(stage, inbox, outbox, work, stats[stage]), name=stage)
+        for stage, inbox, outbox, work in stages
+    ]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"流水线完成，总耗时 {time.time() - start:.1f}s")
+    for stage, stage_stats in stats.items():
+        print(f"  {stage}: 完成 {stage_stats['done']} 个，出错 {stage_stats['error']} 个，"
+              f"累计处理时间 {stage_stats['seconds']:.1f}s")
+    return stats
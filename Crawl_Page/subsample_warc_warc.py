@@ -1,200 +1,475 @@
 import os
-import random
-import time
+import io
+import multiprocessing
+import threading
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+import shutil
 from tqdm import tqdm
-from warcio.archiveiterator import ArchiveIterator
 from warcio.warcwriter import WARCWriter
-import gzip
-from tools.lang import is_chinese_fasttext
+from warcio.recordloader import ArcWarcRecord
+import time
+from tools.lang import is_chinese_fasttext_batch, preload_model
 from tools.clear_redundancy import remove_html_tags, clean_text
-import threading
+from tools.prefilter import may_be_chinese
+from tools.charset import decode_html, merge_charset_stats, format_charset_stats
+from tools.record_index import (RecordIndexWriter, index_path_for, read_index, build_index, split_ranges,
+                                iter_records_at, iter_records_in_range)
 
 # 设置代理
 os.environ['http_proxy'] = 'http://127.0.0.1:7890'
 os.environ['https_proxy'] = 'http://127.0.0.1:7890'
 
-def read_with_timeout(content_stream, timeout=1.0):
-    result = {}
-    def target():
+class BoundedPayloadReader:
+    """
+    带字节预算和时间预算的负载读取器，所有记录复用同一个实例，不为每条记录创建线程
+    - 字节预算：WARC头声明的长度超限时不读取直接跳过；读取过程中累计超限时立即放弃
+    - 时间预算：按块读取，每读完一块检查一次耗时，超时立即放弃
+    被放弃记录的剩余字节由 ArchiveIterator 在迭代到下一条记录时跳过
+    """
+    def __init__(self, max_bytes=5 * 1024 * 1024, timeout=1.0, chunk_size=64 * 1024):
+        """
+        :param max_bytes: 单条记录负载的最大字节数，None 表示不限制
+        :param timeout: 单条记录读取的最长秒数，None 表示不限制
+        :param chunk_size: 每次读取的块大小
+        """
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+
+    def read(self, record):
+        """
+        读取记录的原始负载
+        :return: (data, err)，err 为 None 表示成功，'oversize' / 'timeout' 表示超出预算，其他为读取异常
+        """
+        if self.max_bytes is not None and record.length is not None and record.length > self.max_bytes:
+            return None, 'oversize'
+        stream = record.raw_stream
+        chunks = []
+        size = 0
+        deadline = time.monotonic() + self.timeout if self.timeout is not None else None
         try:
-            result['data'] = content_stream.read()
+            while True:
+                chunk = stream.read(self.chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if self.max_bytes is not None and size > self.max_bytes:
+                    return None, 'oversize'
+                if deadline is not None and time.monotonic() > deadline:
+                    return None, 'timeout'
+                chunks.append(chunk)
         except Exception as e:
-            result['error'] = e
+            return None, e
+        return b''.join(chunks), None
 
-    thread = threading.Thread(target=target)
-    thread.start()
-    thread.join(timeout)
-    if thread.is_alive():
-        # 超时
-        return None, 'timeout'
-    if 'error' in result:
-        return None, result['error']
-    return result.get('data', None), None
+def new_run_stats():
+    """
+    创建一次筛选运行的统计字典
+    """
+    return {
+        "records": 0,           # 遍历的WARC记录总数
+        "responses": 0,         # response记录数
+        "chinese": 0,           # 判定为中文并写出的记录数
+        "skipped_oversize": 0,  # 负载超出字节预算被跳过的记录数
+        "skipped_timeout": 0,   # 读取超出时间预算被跳过的记录数
+        "skipped_error": 0,     # 读取异常被跳过的记录数
+        "skipped_prefilter": 0, # 预筛判为非中文、未做完整判定的记录数
+    }
 
-def subsample_chinese_warc(input_warc_path):
+def get_output_warc_path(input_warc_path):
     """
-    对输入的WARC文件筛选所有中文response网页，返回筛选后WARC文件路径
+    根据输入WARC路径生成筛选结果的输出路径（xxx.warc.gz -> xxx-chinese.warc.gz）
     """
-    # 生成输出文件路径
     base, ext = os.path.splitext(input_warc_path)
     if ext == ".gz":
         base, ext2 = os.path.splitext(base)
-        output_warc_path = f"{base}-chinese{ext2}{ext}"
+        return f"{base}-chinese{ext2}{ext}"
+    return f"{base}-chinese{ext}"
+
+def decode_http_body(http_headers, raw):
+    """
+    按HTTP头中的 Transfer-Encoding / Content-Encoding 解码原始负载，返回网页正文字节
+    与 warcio 的 record.content_stream() 行为一致，但只依赖可序列化的数据，便于在子进程中调用
+    """
+    record = ArcWarcRecord('warc', 'response', None, io.BytesIO(raw), http_headers, None, len(raw))
+    return record.content_stream().read()
+
+def passes_prefilter(http_headers, raw, min_cjk_chars=20):
+    """
+    对一条response记录做预筛（见 tools.prefilter），返回 False 表示明显不是中文
+    负载经过压缩或分块编码时先解码；解码失败时放行，交给完整判定处理
+    """
+    content = raw
+    if http_headers is not None and (http_headers.get_header('Content-Encoding')
+                                     or http_headers.get_header('Transfer-Encoding')):
+        try:
+            content = decode_http_body(http_headers, raw)
+        except Exception:
+            return True
+    content_type = http_headers.get_header('Content-Type') if http_headers is not None else None
+    content_language = http_headers.get_header('Content-Language') if http_headers is not None else None
+    return may_be_chinese(content, content_type, content_language, min_cjk_chars)
+
+def _prefiltered(records, stats, min_cjk_chars):
+    for offset, record, raw in records:
+        if passes_prefilter(record.http_headers, raw, min_cjk_chars):
+            yield offset, record, raw
+        else:
+            stats["skipped_prefilter"] += 1
+
+def payload_text(content, content_type=None, charset_stats=None):
+    """
+    从网页正文字节中提取用于语言判定的纯文本
+    按声明或检测到的字符集解码（见 tools.charset），无法解码的网页返回空串，不再交给 fastText 判定乱码
+    :param charset_stats: 可选的字符集统计字典
+    """
+    text, charset = decode_html(content, content_type, charset_stats)
+    if charset is None:
+        return ''
+    text = remove_html_tags(text)
+    return clean_text(text)
+
+def classify_responses(items, charset_stats=None):
+    """
+    对一批response记录的原始负载做中文判定，整批只调用一次 fastText 预测
+    解码失败的记录和整批预测出错时视为非中文；模型加载失败时抛出异常，不当作非中文
+    作为进程池任务时在子进程中执行，fastText模型在父进程预加载后由子进程共享（fork），否则在每个进程首次调用时加载一次
+    :param items: [(http_headers, raw), ...]
+    :param charset_stats: 可选的字符集统计字典
+    :return: 布尔列表，与 items 一一对应
+    """
+    results = [False] * len(items)
+    batch = []
+    for i, (http_headers, raw) in enumerate(items):
+        try:
+            content_type = http_headers.get_header('Content-Type') if http_headers is not None else None
+            text = payload_text(decode_http_body(http_headers, raw), content_type, charset_stats)
+        except Exception:
+            continue
+        if len(text.strip()) > 0:
+            batch.append((i, text))
+    # 在 try 之外加载模型（已加载时直接返回），加载失败的异常不会被当作预测错误吞掉
+    preload_model()
+    try:
+        predictions = is_chinese_fasttext_batch([text for _, text in batch])
+    except ValueError as e:
+        # fastText 对个别输入预测失败时抛出 ValueError，只放弃这一批
+        print(f"预测错误: {e}")
+        return results
+    for (i, _), is_chinese in zip(batch, predictions):
+        results[i] = is_chinese
+    return results
+
+def _classify_with_charset_stats(items):
+    """
+    进程池任务：判定一批记录，同时返回本批的字符集统计，由主进程汇总
+    """
+    charset_stats = {}
+    return classify_responses(items, charset_stats), charset_stats
+
+def classify_response(http_headers, raw):
+    """
+    对一条response记录的原始负载做中文判定，解码失败或其他异常视为非中文
+    """
+    return classify_responses([(http_headers, raw)])[0]
+
+def classify_record(record, reader=None):
+    """
+    建立索引时使用的语言判定函数，返回写入索引 lang 字段的值
+    负载同样经 BoundedPayloadReader 读取，超出预算或读取异常的记录记为 'other'
+    :param reader: BoundedPayloadReader 实例，默认使用默认预算
+    """
+    data, err = (reader or BoundedPayloadReader()).read(record)
+    if err is not None:
+        return 'other'
+    return 'zh' if classify_response(record.http_headers, data) else 'other'
+
+def iter_response_payloads(input_warc_path, reader, stats, byte_range=None, offsets=None):
+    """
+    流式遍历WARC文件中的response记录，返回 (offset, record, raw) 三元组
+    offset 为记录在压缩文件中的起始偏移，与记录索引一致
+    raw 为缓存下来的原始负载，写出时用它重建 record.raw_stream
+    （迭代器前进时会读空当前记录的 raw_stream，所以不能提前替换，否则在途记录会写出空负载）
+    :param reader: BoundedPayloadReader 实例，超出预算或读取异常的记录被跳过并计入 stats
+    :param byte_range: 可选的 (start, end) 字节区间，只处理起始偏移落在其中的记录
+    :param offsets: 可选的记录偏移列表（通常来自索引），只处理这些记录
+    """
+    if offsets is not None:
+        source = iter_records_at(input_warc_path, offsets)
+        total = len(offsets)
     else:
-        output_warc_path = f"{base}-chinese{ext}"
-
-    chinese_offsets = []
-
-    with gzip.open(input_warc_path, 'rb') as stream:
-        offset = stream.tell()
-        for record in tqdm(ArchiveIterator(stream, arc2warc=True), desc="遍历WARC记录", miniters=1):
-            if record.rec_type == 'response':
-                try:
-                    payload, err = read_with_timeout(record.content_stream(), timeout=1.0)
-                    if err == 'timeout':
-                        print(f"第{offset}个网页读取超时，已跳过")
-                        continue
-                    elif err is not None:
-                        print(f"第{offset}个网页读取异常: {err}，已跳过")
-                        continue
-                    text = payload.decode('utf-8', errors='ignore')
-                    text = remove_html_tags(text)
-                    text = clean_text(text)
-                    if len(text.strip()) == 0:
-                        continue
-                    else:
-                        if is_chinese_fasttext(text):
-                            chinese_offsets.append(offset)
-                except Exception as e:
-                    pass  # 解码失败或其他异常直接跳过
-            offset = stream.tell()
-
-    print(f"检测到的中文网页数量: {len(chinese_offsets)}")
-
-    if len(chinese_offsets) == 0:
-        print("没有检测到中文网页，未生成筛选文件。")
-        return None
+        start, end = byte_range or (0, None)
+        source = iter_records_in_range(input_warc_path, start, end)
+        total = None
+    for offset, record in tqdm(source, total=total, desc="遍历WARC记录", miniters=1):
+        stats["records"] += 1
+        if record.rec_type == 'response':
+            stats["responses"] += 1
+            raw, err = reader.read(record)
+            if err == 'oversize':
+                stats["skipped_oversize"] += 1
+            elif err == 'timeout':
+                stats["skipped_timeout"] += 1
+            elif err is not None:
+                print(f"偏移{offset}处的网页读取异常: {err}，已跳过")
+                stats["skipped_error"] += 1
+            else:
+                yield offset, record, raw
 
-    chinese_offsets_set = set(chinese_offsets)
+class LazyWARCWriter:
+    """
+    第一次写入时才创建输出文件的WARC写出器，没有命中记录时不生成空文件
+    同时在输出文件旁写一份记录索引（见 tools.record_index），下游可直接从索引得到记录数和位置
+    """
+    def __init__(self, output_warc_path):
+        self.output_warc_path = output_warc_path
+        self.outstream = None
+        self.writer = None
+        self.index = None
+        self.count = 0
 
-    # 重新遍历一遍，写入所有中文response网页到新warc文件
-    with gzip.open(input_warc_path, 'rb') as instream, open(output_warc_path, 'wb') as outstream:
-        writer = WARCWriter(outstream, gzip=True)
-        offset = instream.tell()
-        for record in ArchiveIterator(instream, arc2warc=True):
-            if offset in chinese_offsets_set and record.rec_type == 'response':
-                writer.write_record(record)
-            offset = instream.tell()
+    def write_record(self, record, raw, lang=None):
+        if self.writer is None:
+            self.outstream = open(self.output_warc_path, 'wb')
+            self.writer = WARCWriter(self.outstream, gzip=True)
+            self.index = RecordIndexWriter(index_path_for(self.output_warc_path))
+        offset = self.outstream.tell()
+        record.raw_stream = io.BytesIO(raw)
+        self.writer.write_record(record)
+        content_type = record.http_headers.get_header('Content-Type') if record.http_headers else None
+        self.index.write(offset, self.outstream.tell() - offset, record.rec_type, content_type, lang,
+                         record.rec_headers.get_header('WARC-Target-URI'))
+        self.count += 1
 
-    print(f"已筛选并写入 {len(chinese_offsets)} 个中文response网页到 {output_warc_path}")
-    return output_warc_path
+    def close(self):
+        if self.outstream is not None:
+            self.outstream.close()
+            self.index.close()
 
-# 示例用法
-if __name__ == "__main__":
-    input_warc_path = './warc/warc_files/CC-MAIN-20250315031626-20250315061626-00000.warc.gz'
-    result_path = subsample_chinese_warc(input_warc_path)
-    print("筛选后的WARC文件路径:", result_path)
+def _iter_batches(records, batch_size):
+    batch = []
+    for item in records:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
-# 遍历WARC记录: 83575it [18:04, 77.08it/s]
-# 检测到的中文网页数量: 1400
-# 已筛选并写入 1400 个中文response网页到 ./warc_files/CC-MAIN-20250315031626-20250315061626-00000-chinese.warc.gz    
-import os
-import random
-import time
-from tqdm import tqdm
-from warcio.archiveiterator import ArchiveIterator
-from warcio.warcwriter import WARCWriter
-import gzip
-from tools.lang import is_chinese_fasttext
-from tools.clear_redundancy import remove_html_tags, clean_text
-import threading
+def _classify_batch(batch, charset_stats=None):
+    return classify_responses([(record.http_headers, raw) for _, record, raw in batch], charset_stats)
 
-# 设置代理
-os.environ['http_proxy'] = 'http://127.0.0.1:7890'
-os.environ['https_proxy'] = 'http://127.0.0.1:7890'
+def _write_batch(writer, batch, results):
+    for (offset, record, raw), is_chinese in zip(batch, results):
+        if is_chinese:
+            writer.write_record(record, raw, lang='zh')
 
-def read_with_timeout(content_stream, timeout=1.0):
-    result = {}
-    def target():
-        try:
-            result['data'] = content_stream.read()
-        except Exception as e:
-            result['error'] = e
+def _subsample_serial(records, writer, batch_size, charset_stats):
+    for batch in _iter_batches(records, batch_size):
+        _write_batch(writer, batch, _classify_batch(batch, charset_stats))
 
-    thread = threading.Thread(target=target)
-    thread.start()
-    thread.join(timeout)
-    if thread.is_alive():
-        # 超时
-        return None, 'timeout'
-    if 'error' in result:
-        return None, result['error']
-    return result.get('data', None), None
+def _pool_options():
+    """
+    进程池的启动方式，返回传给 ProcessPoolExecutor 的 mp_context 和 initializer
+    在主线程中且支持 fork 时，先在父进程加载fastText模型再 fork，子进程写时复制共享模型内存，不再各自加载一份；
+    在其他线程中（如流水线的筛选阶段）fork 会复制其他线程持有的锁，可能死锁，改用 forkserver，
+    子进程启动时各自加载一次模型；都不支持的平台（Windows）使用默认方式，子进程在第一次判定时各自加载
+    """
+    methods = multiprocessing.get_all_start_methods()
+    if threading.current_thread() is threading.main_thread() and 'fork' in methods:
+        preload_model()
+        return {"mp_context": multiprocessing.get_context('fork')}
+    if 'forkserver' in methods:
+        return {"mp_context": multiprocessing.get_context('forkserver'), "initializer": preload_model}
+    return {}
 
-def subsample_chinese_warc(input_warc_path):
+def _subsample_parallel(records, writer, workers, max_pending, batch_size, charset_stats):
+    """
+    多进程引擎：主进程负责解压和读取负载，按批分发给进程池，按提交顺序取回判定结果写出
+    在途记录数不超过 max_pending，读取速度快于判定速度时主进程会阻塞等待，内存占用有上界
+    """
+    max_batches = max(1, max_pending // batch_size)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, **_pool_options()) as pool:
+        for batch in _iter_batches(records, batch_size):
+            items = [(record.http_headers, raw) for _, record, raw in batch]
+            pending.append((batch, pool.submit(_classify_with_charset_stats, items)))
+            if len(pending) >= max_batches:
+                batch, future = pending.popleft()
+                results, batch_charset_stats = future.result()
+                merge_charset_stats(charset_stats, batch_charset_stats)
+                _write_batch(writer, batch, results)
+        while pending:
+            batch, future = pending.popleft()
+            results, batch_charset_stats = future.result()
+            merge_charset_stats(charset_stats, batch_charset_stats)
+            _write_batch(writer, batch, results)
+
+def subsample_chinese_warc(input_warc_path, workers=1, max_pending=None,
+                           max_payload_bytes=5 * 1024 * 1024, read_timeout=1.0, stats=None,
+                           byte_range=None, offsets=None, output_warc_path=None, batch_size=32,
+                           prefilter=True, min_cjk_chars=20, charset_stats=None):
     """
     对输入的WARC文件筛选所有中文response网页，返回筛选后WARC文件路径
+    单遍流式处理：每条response记录判定为中文后立即写入输出WARC，解压和解析只做一次
+    :param input_warc_path: 输入WARC文件路径
+    :param workers: 判定进程数，1 表示在当前进程内串行处理，None 表示使用全部CPU核
+    :param max_pending: 多进程模式下允许在途的最大记录数，默认为每个进程 4 批
+    :param max_payload_bytes: 单条记录负载的字节预算，超出则跳过
+    :param read_timeout: 单条记录负载读取的时间预算（秒），超出则跳过
+    :param stats: 可选的统计字典，传入时运行统计会累加到其中
+    :param byte_range: 可选的 (start, end) 字节区间，边界须为记录起始位置（见 tools.record_index.split_ranges），
+                       中断后可从索引中最后处理到的偏移继续
+    :param offsets: 可选的记录偏移列表，只重跑这些记录（见 tools.record_index.select_offsets）
+    :param output_warc_path: 输出路径，默认为 xxx-chinese.warc.gz
+    :param batch_size: 每批语言判定的记录数，一批只调用一次 fastText 预测
+    :param prefilter: 是否先做字节级预筛，明显不是中文的记录不再解析和判定（计入 skipped_prefilter）
+    :param min_cjk_chars: 预筛时 UTF-8 CJK字符数达到该值即放行
+    :param charset_stats: 可选的字符集统计字典，每个字符集的记录数、字节数和解码耗时会累加到其中
     """
-    # 生成输出文件路径
-    base, ext = os.path.splitext(input_warc_path)
-    if ext == ".gz":
-        base, ext2 = os.path.splitext(base)
-        output_warc_path = f"{base}-chinese{ext2}{ext}"
-    else:
-        output_warc_path = f"{base}-chinese{ext}"
-
-    chinese_offsets = []
-
-    with gzip.open(input_warc_path, 'rb') as stream:
-        offset = stream.tell()
-        for record in tqdm(ArchiveIterator(stream, arc2warc=True), desc="遍历WARC记录", miniters=1):
-            if record.rec_type == 'response':
-                try:
-                    payload, err = read_with_timeout(record.content_stream(), timeout=1.0)
-                    if err == 'timeout':
-                        print(f"第{offset}个网页读取超时，已跳过")
-                        continue
-                    elif err is not None:
-                        print(f"第{offset}个网页读取异常: {err}，已跳过")
-                        continue
-                    text = payload.decode('utf-8', errors='ignore')
-                    text = remove_html_tags(text)
-                    text = clean_text(text)
-                    if len(text.strip()) == 0:
-                        continue
-                    else:
-                        if is_chinese_fasttext(text):
-                            chinese_offsets.append(offset)
-                except Exception as e:
-                    pass  # 解码失败或其他异常直接跳过
-            offset = stream.tell()
-
-    print(f"检测到的中文网页数量: {len(chinese_offsets)}")
-
-    if len(chinese_offsets) == 0:
+    output_warc_path = output_warc_path or get_output_warc_path(input_warc_path)
+    workers = workers or os.cpu_count() or 1
+    # 开始读取前加载语言识别模型，模型加载失败时直接报错，而不是把所有记录都判为非中文
+    preload_model()
+
+    run_stats = new_run_stats()
+    reader = BoundedPayloadReader(max_bytes=max_payload_bytes, timeout=read_timeout)
+    records = iter_response_payloads(input_warc_path, reader, run_stats, byte_range=byte_range, offsets=offsets)
+    if prefilter:
+        records = _prefiltered(records, run_stats, min_cjk_chars)
+
+    run_charset_stats = {}
+    writer = LazyWARCWriter(output_warc_path)
+    try:
+        if workers > 1:
+            _subsample_parallel(records, writer, workers, max_pending or workers * 4 * batch_size, batch_size,
+                                run_charset_stats)
+        else:
+            _subsample_serial(records, writer, batch_size, run_charset_stats)
+    finally:
+        writer.close()
+
+    run_stats["chinese"] = writer.count
+    if stats is not None:
+        for key, value in run_stats.items():
+            stats[key] = stats.get(key, 0) + value
+    if charset_stats is not None:
+        merge_charset_stats(charset_stats, run_charset_stats)
+
+    print(f"检测到的中文网页数量: {writer.count}")
+    print(f"运行统计: {run_stats}")
+    print(f"字符集统计:\n{format_charset_stats(run_charset_stats)}")
+
+    if writer.count == 0:
         print("没有检测到中文网页，未生成筛选文件。")
         return None
 
-    chinese_offsets_set = set(chinese_offsets)
+    print(f"已筛选并写入 {writer.count} 个中文response网页到 {output_warc_path}")
+    return output_warc_path
 
-    # 重新遍历一遍，写入所有中文response网页到新warc文件
-    with gzip.open(input_warc_path, 'rb') as instream, open(output_warc_path, 'wb') as outstream:
-        writer = WARCWriter(outstream, gzip=True)
-        offset = instream.tell()
-        for record in ArchiveIterator(instream, arc2warc=True):
-            if offset in chinese_offsets_set and record.rec_type == 'response':
-                writer.write_record(record)
-            offset = instream.tell()
+def _subsample_part(input_warc_path, byte_range, part_path, max_payload_bytes, read_timeout):
+    """
+    进程池任务：串行筛选一个字节区间，返回 (分片路径或None, 运行统计, 字符集统计)
+    """
+    stats = {}
+    charset_stats = {}
+    result = subsample_chinese_warc(input_warc_path, workers=1, max_payload_bytes=max_payload_bytes,
+                                    read_timeout=read_timeout, stats=stats, byte_range=byte_range,
+                                    output_warc_path=part_path, charset_stats=charset_stats)
+    return result, stats, charset_stats
 
-    print(f"已筛选并写入 {len(chinese_offsets)} 个中文response网页到 {output_warc_path}")
+def subsample_chinese_warc_by_ranges(input_warc_path, parts=None, max_payload_bytes=5 * 1024 * 1024,
+                                     read_timeout=1.0, stats=None, charset_stats=None):
+    """
+    按记录索引把输入WARC切成 parts 个字节区间，每个进程独立解压和筛选一个区间，最后按顺序拼接
+    与 workers>1 的单遍模式不同，解压也被并行化；输入文件须为逐条记录gzip压缩（CommonCrawl 格式）
+    没有索引时先建立一次索引（不做语言判定），之后可重复使用
+    :param parts: 区间数（进程数），None 表示使用全部CPU核
+    :return: 筛选后WARC文件路径，没有中文网页时返回 None
+    """
+    parts = parts or os.cpu_count() or 1
+    index_path = index_path_for(input_warc_path)
+    if not os.path.exists(index_path):
+        build_index(input_warc_path, index_path)
+    ranges = split_ranges(index_path, parts)
+
+    output_warc_path = get_output_warc_path(input_warc_path)
+    part_paths = [f"{output_warc_path}.part{i}" for i in range(len(ranges))]
+    run_stats = new_run_stats()
+    run_charset_stats = {}
+    with ProcessPoolExecutor(max_workers=len(ranges) or 1, **_pool_options()) as pool:
+        futures = [pool.submit(_subsample_part, input_warc_path, byte_range, part_path,
+                               max_payload_bytes, read_timeout)
+                   for byte_range, part_path in zip(ranges, part_paths)]
+        results = [future.result() for future in futures]
+
+    # 按区间顺序拼接分片，同时把分片索引中的偏移平移到拼接后的位置
+    count = 0
+    with open(output_warc_path, 'wb') as out, RecordIndexWriter(index_path_for(output_warc_path)) as index:
+        for result, part_stats, part_charset_stats in results:
+            for key, value in part_stats.items():
+                run_stats[key] += value
+            merge_charset_stats(run_charset_stats, part_charset_stats)
+            if result is None:
+                continue
+            base = out.tell()
+            with open(result, 'rb') as part:
+                shutil.copyfileobj(part, out)
+            for entry in read_index(index_path_for(result)):
+                index.write(base + entry['offset'], entry['length'], entry['rec_type'],
+                            entry['content_type'], entry['lang'], entry['uri'])
+                count += 1
+            os.remove(result)
+            os.remove(index_path_for(result))
+
+    if stats is not None:
+        for key, value in run_stats.items():
+            stats[key] = stats.get(key, 0) + value
+    if charset_stats is not None:
+        merge_charset_stats(charset_stats, run_charset_stats)
+    print(f"运行统计: {run_stats}")
+    print(f"字符集统计:\n{format_charset_stats(run_charset_stats)}")
+
+    if count == 0:
+        os.remove(output_warc_path)
+        os.remove(index_path_for(output_warc_path))
+        print("没有检测到中文网页，未生成筛选文件。")
+        return None
+    print(f"已筛选并写入 {count} 个中文response网页到 {output_warc_path}")
     return output_warc_path
 
+def measure_prefilter(input_warc_path, min_cjk_chars=20, batch_size=32, limit=None):
+    """
+    在一个WARC文件上测量预筛的效果：对每条response记录同时做预筛和完整判定
+    漏判率 = 完整判定为中文但被预筛排除的记录数 / 完整判定为中文的记录数
+    :param limit: 最多测量的response记录数，None 表示全部
+    :return: 统计字典
+    """
+    reader = BoundedPayloadReader()
+    result = {"responses": 0, "chinese": 0, "rejected": 0, "false_negatives": 0}
+    records = iter_response_payloads(input_warc_path, reader, new_run_stats())
+    if limit is not None:
+        records = islice(records, limit)
+    for batch in _iter_batches(records, batch_size):
+        for (offset, record, raw), is_chinese in zip(batch, _classify_batch(batch)):
+            passed = passes_prefilter(record.http_headers, raw, min_cjk_chars)
+            result["responses"] += 1
+            result["chinese"] += is_chinese
+            result["rejected"] += not passed
+            result["false_negatives"] += is_chinese and not passed
+    result["reject_rate"] = result["rejected"] / result["responses"] if result["responses"] else 0.0
+    result["false_negative_rate"] = result["false_negatives"] / result["chinese"] if result["chinese"] else 0.0
+    print(f"预筛测量: {result}")
+    return result
+
 # 示例用法
 if __name__ == "__main__":
     input_warc_path = './warc/warc_files/CC-MAIN-20250315031626-20250315061626-00000.warc.gz'
-    result_path = subsample_chinese_warc(input_warc_path)
+    result_path = subsample_chinese_warc(input_warc_path, workers=os.cpu_count())
     print("筛选后的WARC文件路径:", result_path)
 
-# 遍历WARC记录: 83575it [18:04, 77.08it/s]
+# 两遍处理（旧实现）: 83575it [18:04, 77.08it/s]
 # 检测到的中文网页数量: 1400
-# 已筛选并写入 1400 个中文response网页到 ./warc_files/CC-MAIN-20250315031626-20250315061626-00000-chinese.warc.gz    
\ No newline at end of file
+# 已筛选并写入 1400 个中文response网页到 ./warc_files/CC-MAIN-20250315031626-20250315061626-00000-chinese.warc.gz
@@ -0,0 +1,96 @@
+"""
+测试三阶段WARC处理流水线
+下载、筛选、提取三个阶段都换成桩函数，不访问网络、不需要语言识别模型
+"""
+import os
+import sys
+import time
+import threading
+
+# 将 Crawl_Page 目录添加到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pipeline
+
+URLS = [f"crawl-data/CC-TEST/segment/warc/file{i}.warc.gz" for i in range(8)]
+
+
+class StubStages:
+    """记录各阶段处理过的文件，fail 中的文件在对应阶段抛出异常"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.lock = threading.Lock()
+        self.downloaded = []
+        self.filtered = []
+        self.extracted = []
+        self.filter_workers = []
+        self.max_lead = 0
+
+    def install(self, monkeypatch):
+        monkeypatch.setattr(pipeline, "read_warc_paths", lambda paths_file, download_numbers: URLS[:download_numbers])
+        monkeypatch.setattr(pipeline, "download_file", self.download)
+        monkeypatch.setattr(pipeline, "subsample_chinese_warc", self.subsample)
+        monkeypatch.setattr(pipeline, "convert_warc_to_htmls", self.convert)
+
+    def download(self, url, output_dir, parts=4):
+        name = os.path.basename(url)
+        if ("download", name) in self.fail:
+            raise IOError(f"下载 {name} 失败")
+        with self.lock:
+            self.downloaded.append(name)
+            # 下载领先筛选的文件数受队列容量限制
+            self.max_lead = max(self.max_lead, len(self.downloaded) - len(self.filtered))
+        return os.path.join(output_dir, name)
+
+    def subsample(self, path, workers=1):
+        time.sleep(0.01)
+        name = os.path.basename(path)
+        with self.lock:
+            self.filter_workers.append(workers)
+            self.filtered.append(name)
+        if ("filter", name) in self.fail:
+            raise RuntimeError(f"筛选 {name} 失败")
+        return path.replace(".warc.gz", "-chinese.warc.gz")
+
+    def convert(self, path, htmls_dir):
+        self.extracted.append(os.path.basename(path))
+
+
+def run_with_timeout(timeout=10, **kwargs):
+    """在单独的线程中运行流水线，超时未结束视为卡死"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(stats=pipeline.run_pipeline(**kwargs)), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "流水线没有结束"
+    return result["stats"]
+
+
+def test_every_file_reaches_the_last_stage(monkeypatch, tmp_path):
+    """每个文件依次经过三个阶段，下载最多领先队列容量个文件，筛选阶段默认串行"""
+    stages = StubStages()
+    stages.install(monkeypatch)
+    stats = run_with_timeout(output_dir=str(tmp_path / "warc"), htmls_dir=str(tmp_path / "htmls"),
+                             download_numbers=len(URLS), queue_size=1)
+
+    names = [os.path.basename(url) for url in URLS]
+    assert stages.filtered == names
+    assert stages.extracted == [name.replace(".warc.gz", "-chinese.warc.gz") for name in names]
+    assert stages.filter_workers == [1] * len(URLS)
+    # 队列中 1 个，筛选阶段正在处理 1 个，下载阶段阻塞在 put 上 1 个
+    assert stages.max_lead <= 3
+    assert all(stage_stats["done"] == len(URLS) and stage_stats["error"] == 0 for stage_stats in stats.values())
+
+
+def test_stage_errors_do_not_hang_the_pipeline(monkeypatch, tmp_path):
+    """某个阶段处理出错的文件被跳过并计数，其余文件照常处理，流水线正常结束"""
+    stages = StubStages(fail={("download", "file1.warc.gz"), ("filter", "file4.warc.gz")})
+    stages.install(monkeypatch)
+    stats = run_with_timeout(output_dir=str(tmp_path / "warc"), htmls_dir=str(tmp_path / "htmls"),
+                             download_numbers=len(URLS), queue_size=1)
+
+    assert "file1.warc.gz" not in stages.filtered
+    assert len(stages.extracted) == len(URLS) - 2
+    assert stats["下载"] == {"done": len(URLS) - 1, "error": 1, "seconds": stats["下载"]["seconds"]}
+    assert stats["筛选"]["error"] == 1 and stats["提取"]["done"] == len(URLS) - 2
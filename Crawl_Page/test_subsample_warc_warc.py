@@ -0,0 +1,189 @@
+"""
+测试中文WARC筛选
+用 warcio 生成小的逐条gzip压缩WARC文件，语言识别模型换成按汉字比例判定的假模型，不需要 fastText
+"""
+import io
+import os
+import sys
+import random
+import types
+from functools import partial
+
+# 将 Crawl_Page 目录和项目根目录添加到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from warcio.archiveiterator import ArchiveIterator
+from warcio.statusandheaders import StatusAndHeaders
+from warcio.warcwriter import WARCWriter
+
+import lang_id
+from subsample_warc_warc import (subsample_chinese_warc, subsample_chinese_warc_by_ranges, classify_record,
+                                 BoundedPayloadReader, measure_prefilter)
+from tools.record_index import (build_index, read_index, split_ranges, iter_records_at, iter_records_in_range,
+                                index_path_for)
+
+CHINESE = "这是第{}个中文网页，介绍中文WARC筛选的测试内容。"
+ENGLISH = "This is English page number {}, used to test WARC subsampling. "
+TRADITIONAL = "這是第{}個繁體中文網頁，測試未聲明字元集的預篩。"
+
+
+class FakeModel:
+    """汉字占比超过三成判为中文的假 fastText 模型"""
+
+    def predict(self, texts, k=1):
+        labels, probs = [], []
+        for text in texts:
+            cjk = sum(1 for char in text if '一' <= char <= '鿿')
+            labels.append(['__label__zh' if cjk > 0.3 * len(text) else '__label__en'])
+            probs.append([0.9])
+        return labels, probs
+
+
+def use_fake_model(monkeypatch, tmp_path):
+    path = str(tmp_path / "fake.ftz")
+    monkeypatch.setenv(lang_id.MODEL_PATH_ENV, path)
+    monkeypatch.setitem(lang_id._models, path, FakeModel())
+
+
+def make_warc(path, pages):
+    """
+    写一个WARC文件，每个网页一条 response 记录加一条 request 记录
+    :param pages: [(正文字节, Content-Type), ...]
+    """
+    with open(path, 'wb') as out:
+        writer = WARCWriter(out, gzip=True)
+        for i, (body, content_type) in enumerate(pages):
+            uri = f'http://example.com/page{i}'
+            http_headers = StatusAndHeaders('200 OK', [('Content-Type', content_type)], protocol='HTTP/1.1')
+            writer.write_record(writer.create_warc_record(uri, 'response', payload=io.BytesIO(body),
+                                                          http_headers=http_headers))
+            writer.write_record(writer.create_warc_record(uri, 'request',
+                                                          payload=io.BytesIO(b'GET / HTTP/1.1\r\n\r\n')))
+    return path
+
+
+def html_pages(count):
+    """中文和英文网页交替出现"""
+    pages = []
+    for i in range(count):
+        text = (CHINESE if i % 2 == 0 else ENGLISH).format(i) * 5
+        pages.append((f"<html><body><p>{text}</p></body></html>".encode('utf-8'), 'text/html; charset=utf-8'))
+    return pages
+
+
+def read_records(path):
+    """返回 [(uri, 正文字节), ...]"""
+    with open(path, 'rb') as stream:
+        return [(record.rec_headers.get_header('WARC-Target-URI'), record.content_stream().read())
+                for record in ArchiveIterator(stream)]
+
+
+def test_parallel_engine_matches_serial(monkeypatch, tmp_path):
+    """多进程引擎与串行引擎写出相同的记录、顺序一致，写出的负载都不为空"""
+    use_fake_model(monkeypatch, tmp_path)
+    pages = html_pages(30)
+    input_path = make_warc(str(tmp_path / "input.warc.gz"), pages)
+
+    serial_stats, parallel_stats = {}, {}
+    serial = subsample_chinese_warc(input_path, workers=1, stats=serial_stats,
+                                    output_warc_path=str(tmp_path / "serial.warc.gz"))
+    parallel = subsample_chinese_warc(input_path, workers=2, batch_size=4, stats=parallel_stats,
+                                      output_warc_path=str(tmp_path / "parallel.warc.gz"))
+
+    # 写出的负载与输入相同，不是被迭代器读空后的空负载
+    expected = [(f'http://example.com/page{i}', pages[i][0]) for i in range(0, 30, 2)]
+    assert read_records(serial) == expected
+    assert read_records(parallel) == expected
+    assert serial_stats == parallel_stats
+
+
+def test_record_index_ranges_and_random_access(monkeypatch, tmp_path):
+    """索引切出的区间恰好覆盖每条记录一次，按区间并行筛选与单遍筛选结果相同，按偏移随机读取得到相同的记录"""
+    use_fake_model(monkeypatch, tmp_path)
+    pages = html_pages(40)
+    input_path = make_warc(str(tmp_path / "input.warc.gz"), pages)
+    entries = list(read_index(build_index(input_path)))
+    assert len(entries) == 2 * len(pages)
+
+    ranges = split_ranges(index_path_for(input_path), 3)
+    assert len(ranges) == 3
+    offsets = [offset for start, end in ranges for offset, _ in iter_records_in_range(input_path, start, end)]
+    assert offsets == [entry['offset'] for entry in entries]
+
+    uris = [record.rec_headers.get_header('WARC-Target-URI') for _, record in iter_records_at(input_path, offsets)]
+    assert uris == [entry['uri'] for entry in entries]
+
+    single = subsample_chinese_warc(input_path, output_warc_path=str(tmp_path / "single.warc.gz"))
+    by_ranges = subsample_chinese_warc_by_ranges(input_path, parts=3)
+    assert read_records(by_ranges) == read_records(single)
+    merged_index = [(entry['offset'], entry['uri']) for entry in read_index(index_path_for(by_ranges))]
+    single_index = [(entry['offset'], entry['uri']) for entry in read_index(index_path_for(single))]
+    assert merged_index == single_index
+
+
+def test_index_classification_uses_bounded_reader(monkeypatch, tmp_path):
+    """建立索引时的语言判定经过负载读取预算，超出预算的记录记为 other"""
+    use_fake_model(monkeypatch, tmp_path)
+    input_path = make_warc(str(tmp_path / "input.warc.gz"), html_pages(6))
+
+    langs = [entry['lang'] for entry in read_index(build_index(input_path, classify=classify_record))
+             if entry['rec_type'] == 'response']
+    assert langs == ['zh', 'other'] * 3
+
+    small = partial(classify_record, reader=BoundedPayloadReader(max_bytes=100))
+    langs = [entry['lang'] for entry in read_index(build_index(input_path, classify=small))
+             if entry['rec_type'] == 'response']
+    assert langs == ['other'] * 6
+
+
+def mixed_charset_pages(count):
+    """UTF-8 中文、未声明字符集的 GBK 和 Big5 中文、英文、Latin-1 和二进制负载轮流出现"""
+    rng = random.Random(0)
+    pages = []
+    for i in range(count):
+        kind = i % 6
+        if kind == 0:
+            body = f"<html><body><p>{CHINESE.format(i) * 5}</p></body></html>".encode('utf-8')
+        elif kind == 1:
+            body = f"<html><body><p>{CHINESE.format(i) * 5}</p></body></html>".encode('gbk')
+        elif kind == 2:
+            body = f"<html><body><p>{TRADITIONAL.format(i) * 5}</p></body></html>".encode('big5')
+        elif kind == 3:
+            body = f"<html><body><p>{ENGLISH.format(i) * 5}</p></body></html>".encode('utf-8')
+        elif kind == 4:
+            text = "Schöne Grüße, hätte, wäre, Café, déjà vu. " * 10
+            body = f"<html><body><p>{text}</p></body></html>".encode('cp1252')
+        else:
+            body = bytes(rng.randrange(256) for _ in range(2048))
+        pages.append((body, 'application/octet-stream' if kind == 5 else 'text/html'))
+    return pages
+
+
+def test_prefilter_keeps_undeclared_legacy_charset_pages(monkeypatch, tmp_path):
+    """预筛不漏掉没有声明字符集的 GBK/Big5 中文网页，西文和二进制负载被排除"""
+    use_fake_model(monkeypatch, tmp_path)
+    input_path = make_warc(str(tmp_path / "input.warc.gz"), mixed_charset_pages(36))
+
+    result = measure_prefilter(input_path)
+    assert result["responses"] == 36
+    assert result["chinese"] == 18
+    assert result["false_negatives"] == 0
+    assert result["rejected"] == 18
+
+
+def test_model_load_error_is_raised(monkeypatch, tmp_path):
+    """模型加载失败时筛选和建立带语言判定的索引直接报错，不把所有记录判为非中文"""
+    def load_model(path):
+        raise ValueError(f"{path} cannot be opened for loading!")
+
+    monkeypatch.setenv(lang_id.MODEL_PATH_ENV, str(tmp_path / "missing.bin"))
+    monkeypatch.setitem(sys.modules, "fasttext", types.SimpleNamespace(load_model=load_model))
+    input_path = make_warc(str(tmp_path / "input.warc.gz"), html_pages(4))
+
+    with pytest.raises(ValueError):
+        subsample_chinese_warc(input_path, output_warc_path=str(tmp_path / "output.warc.gz"))
+    assert not os.path.exists(tmp_path / "output.warc.gz")
+    with pytest.raises(ValueError):
+        build_index(input_path, classify=classify_record)
@@ -0,0 +1,232 @@
+"""
+网页正文字节的字符集识别与解码
+中文网站中 GBK/GB18030/Big5 编码的网页占比不小，直接 decode('utf-8', errors='ignore') 会把它们变成乱码，
+乱码再交给 fastText 只会被误判并浪费一次预测。按以下顺序确定字符集，前面的步骤命中就不再往后走：
+1. BOM
+2. HTTP Content-Type 头中的 charset
+3. 网页开头 <meta charset> / <meta http-equiv="Content-Type"> 中的 charset
+4. 严格按 UTF-8 解码（绝大多数网页在这一步命中）
+5. 统计检测：安装了 cchardet 时使用，否则严格尝试 GB18030 和 Big5，
+   按双字节字符第二个字节的分布决定先试哪个（GB2312 汉字两个字节都在 0xA1 以上，Big5 常用字约一半第二字节在 0x40-0x7E）；
+   Latin-1 等西文网页的字节往往也能按 GB18030 / Big5 严格解码，解码结果须像中文才接受：
+   非 ASCII 字符中常用汉字和全角符号（GB2312 或 Big5 常用字区）占比足够高，且没有私用区字符和生僻扩展区汉字，
+   否则按 windows-1252 解码
+声明的字符集解码失败时继续往后尝试；都失败时按 UTF-8 替换解码，替换字符过多的记为无法解码（charset 为 None）
+GB2312/GBK 统一按其超集 GB18030 解码，Big5 按 Big5-HKSCS 解码
+"""
+import codecs
+import re
+import time
+from collections import Counter
+from itertools import islice
+
+from tools.prefilter import CHARSET_PATTERN, HEAD_BYTES
+
+# cchardet 为 C 实现，安装后用于统计检测；纯 Python 的 chardet / charset_normalizer 每个网页要几毫秒，不使用
+try:
+    import cchardet as _detector
+except ImportError:
+    _detector = None
+
+# 声明的字符集名称到实际解码器的映射，超集代替子集
+CHARSET_ALIASES = {
+    'gb2312': 'gb18030', 'gbk': 'gb18030', 'x-gbk': 'gb18030', 'cp936': 'gb18030', 'euc-cn': 'gb18030',
+    'big5': 'big5hkscs', 'big5-hkscs': 'big5hkscs', 'cp950': 'big5hkscs',
+    # 按 HTML 标准，声明为 latin-1 / ascii 的网页按 windows-1252 解码
+    'iso-8859-1': 'cp1252', 'latin-1': 'cp1252', 'latin1': 'cp1252', 'us-ascii': 'cp1252', 'ascii': 'cp1252',
+    # 没有 BOM 时声明的 UTF-16 按 UTF-8 处理（网页中的 meta 标签本身是单字节编码的）
+    'utf-16': 'utf-8', 'utf-16le': 'utf-8', 'utf-16be': 'utf-8',
+}
+BOMS = ((codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+# 没有统计检测库时尝试的中文字符集
+FALLBACK_CHARSETS = ('gb18030', 'big5hkscs')
+# 中文字符集的解码结果都不像中文时尝试的西文字符集
+LATIN_CHARSET = 'cp1252'
+# 双字节字符中第二个字节低于 0xA1 的比例超过该值时先试 Big5
+BIG5_LOW_TRAIL_RATIO = 0.1
+DOUBLE_BYTE_PATTERN = re.compile(rb'[\xa1-\xfe][\x40-\xfe]')
+LOW_TRAIL_PATTERN = re.compile(rb'[\xa1-\xfe][\x40-\x7e]')
+# 统计检测只看开头这么多字节
+DETECT_BYTES = 64 * 1024
+# 替换解码后替换字符占比超过该值时视为无法解码
+MAX_REPLACEMENT_RATIO = 0.02
+# 按 GB18030 / Big5 解码的结果中，非 ASCII 字符里常用汉字和全角符号的最低占比
+MIN_COMMON_CJK_RATIO = 0.9
+# 检查是否像中文时只看解码结果中前这么多个非 ASCII 字符
+PLAUSIBILITY_CHARS = 4096
+# Big5 常用字（含符号区）的编码上界，0xC940 起为次常用字
+BIG5_COMMON_END = b'\xc6\x7f'
+# 私用区和生僻汉字（扩展A区、兼容汉字、扩展B区及以后）
+RARE_CHAR_PATTERN = re.compile('[\u3400-\u4dbf\ue000-\uf8ff\uf900-\ufaff\U00020000-\U0010ffff]')
+NON_ASCII_PATTERN = re.compile('[^\x00-\x7f]')
+
+
+def normalize_charset(name):
+    """
+    把声明的字符集名称规范为 Python 解码器名称，未知字符集返回 None
+    """
+    if not name:
+        return None
+    if isinstance(name, bytes):
+        name = name.decode('ascii', errors='ignore')
+    name = name.strip().strip('"\'').lower()
+    name = CHARSET_ALIASES.get(name, name)
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def declared_charset(content, content_type=None):
+    """
+    按 BOM、HTTP 头、meta 标签的顺序查找声明的字符集
+    :return: (字符集, 来源)，来源为 'bom' / 'header' / 'meta'，没有声明时返回 (None, None)
+    """
+    for bom, charset in BOMS:
+        if content.startswith(bom):
+            return charset, 'bom'
+    if content_type:
+        match = CHARSET_PATTERN.search(content_type.encode('latin-1', errors='ignore'))
+        charset = normalize_charset(match.group(1)) if match else None
+        if charset:
+            return charset, 'header'
+    match = CHARSET_PATTERN.search(content[:HEAD_BYTES])
+    charset = normalize_charset(match.group(1)) if match else None
+    if charset:
+        return charset, 'meta'
+    return None, None
+
+
+def _decode_strict(content, charset):
+    try:
+        return content.decode(charset)
+    except (UnicodeDecodeError, LookupError):
+        return None
+
+
+def _is_common_cjk(char):
+    """
+    是否为 GB2312 或 Big5 常用字区中的字符（常用汉字和全角符号）
+    """
+    try:
+        char.encode('gb2312')
+        return True
+    except UnicodeEncodeError:
+        pass
+    try:
+        return char.encode('big5') < BIG5_COMMON_END
+    except UnicodeEncodeError:
+        return False
+
+
+def is_plausible_chinese(text):
+    """
+    按中文字符集解码的结果是否像中文：没有私用区和生僻汉字，非 ASCII 字符中常用汉字和全角符号占比足够高
+    """
+    chars = [match.group() for match in islice(NON_ASCII_PATTERN.finditer(text), PLAUSIBILITY_CHARS)]
+    if not chars:
+        return True
+    if RARE_CHAR_PATTERN.search(''.join(chars)):
+        return False
+    counts = Counter(chars)
+    common = sum(count for char, count in counts.items() if _is_common_cjk(char))
+    return common >= MIN_COMMON_CJK_RATIO * len(chars)
+
+
+def _guess_chinese_charsets(content):
+    """
+    没有统计检测库时按字节分布粗略区分 GB 和 Big5，返回按优先顺序排列的候选字符集，最后是 windows-1252
+    """
+    sample = content[:DETECT_BYTES]
+    pairs = len(DOUBLE_BYTE_PATTERN.findall(sample))
+    if pairs and len(LOW_TRAIL_PATTERN.findall(sample)) > BIG5_LOW_TRAIL_RATIO * pairs:
+        return list(reversed(FALLBACK_CHARSETS)) + [LATIN_CHARSET]
+    return list(FALLBACK_CHARSETS) + [LATIN_CHARSET]
+
+
+def _detect(content):
+    """
+    统计检测字符集，返回候选字符集列表（按优先顺序）
+    """
+    if _detector is None:
+        return _guess_chinese_charsets(content)
+    result = _detector.detect(content[:DETECT_BYTES])
+    charset = normalize_charset(result.get('encoding')) if result else None
+    return [charset] if charset else _guess_chinese_charsets(content)
+
+
+def detect_and_decode(content, content_type=None):
+    """
+    识别字符集并解码网页正文字节
+    :param content: 网页正文字节（已按 Content-Encoding 解码）
+    :param content_type: HTTP Content-Type 头
+    :return: (text, charset, source)；source 为 'bom' / 'header' / 'meta' / 'utf-8' / 'detected' / 'fallback'，
+             无法解码时 charset 为 None
+    """
+    charset, source = declared_charset(content, content_type)
+    if charset:
+        text = _decode_strict(content, charset)
+        if text is not None:
+            return text, charset, source
+    if charset != 'utf-8':
+        text = _decode_strict(content, 'utf-8')
+        if text is not None:
+            return text, 'utf-8', 'utf-8'
+    for candidate in _detect(content):
+        text = _decode_strict(content, candidate)
+        if text is None or (candidate in FALLBACK_CHARSETS and not is_plausible_chinese(text)):
+            continue
+        return text, candidate, 'detected'
+    # 都不能严格解码：按声明的字符集（没有声明时按 UTF-8）替换解码，替换字符过多的视为无法解码
+    charset = charset or 'utf-8'
+    text = content.decode(charset, errors='replace')
+    if text.count('\ufffd') > MAX_REPLACEMENT_RATIO * len(text):
+        charset = None
+    return text, charset, 'fallback'
+
+
+def decode_html(content, content_type=None, stats=None):
+    """
+    解码网页正文字节，返回 (text, charset)，无法解码时 charset 为 None
+    :param stats: 可选的统计字典，按字符集累加记录数、字节数和耗时（见 merge_charset_stats / format_charset_stats）
+    """
+    start = time.perf_counter()
+    text, charset, source = detect_and_decode(content, content_type)
+    if stats is not None:
+        entry = stats.setdefault(charset or 'undecodable', {"count": 0, "bytes": 0, "seconds": 0.0})
+        entry["count"] += 1
+        entry["bytes"] += len(content)
+        entry["seconds"] += time.perf_counter() - start
+        sources = stats.setdefault('_sources', {})
+        sources[source] = sources.get(source, 0) + 1
+    return text, charset
+
+
+def merge_charset_stats(into, other):
+    """
+    把 other 中的字符集统计累加到 into 中（多进程时汇总各子进程的统计）
+    """
+    for key, value in other.items():
+        if key == '_sources':
+            sources = into.setdefault('_sources', {})
+            for source, count in value.items():
+                sources[source] = sources.get(source, 0) + count
+            continue
+        entry = into.setdefault(key, {"count": 0, "bytes": 0, "seconds": 0.0})
+        for field in ("count", "bytes", "seconds"):
+            entry[field] += value[field]
+    return into
+
+
+def format_charset_stats(stats):
+    """
+    把字符集统计格式化为每个字符集一行：记录数、字节数和解码吞吐量
+    """
+    lines = []
+    for charset, entry in sorted(((k, v) for k, v in stats.items() if k != '_sources'),
+                                 key=lambda item: -item[1]["count"]):
+        speed = entry["bytes"] / entry["seconds"] / 1024 / 1024 if entry["seconds"] > 0 else 0.0
+        lines.append(f"{charset}: {entry['count']} 条，{entry['bytes'] / 1024 / 1024:.2f} MB，{speed:.1f} MB/s")
+    if stats.get('_sources'):
+        lines.append("来源: " + ", ".join(f"{source} {count}" for source, count in stats['_sources'].items()))
+    return "\n".join(lines)
@@ -1,370 +1,266 @@
+import os
+import sys
 import re
+import hashlib
+from array import array
 from html import unescape
-from bs4 import BeautifulSoup
 import subprocess
 
-def remove_html_tags(html_content):
+# 将项目根目录添加到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from html_extract import extract_text
+
+def remove_html_tags(html_content, backend=None):
     """
-    使用 BeautifulSoup 移除 HTML 标签
+    移除 HTML 标签，连同 script/style/nav/header/footer 等元素的内容一起去掉
     :param html_content: 包含 HTML 标签的字符串
+    :param backend: 提取后端 "selectolax" / "lxml" / "bs4"，默认使用最快的可用后端（见 html_extract）
     :return: 移除 HTML 标签后的文本
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-    return soup.get_text()
+    return extract_text(html_content, backend=backend)
+
+# 允许的标点符号
+ALLOWED_PUNCTUATION = " !~@#$%^&*()_+<>?:\"{}|,./;'[]\\-！￥……&*（）_+<>？：{}|，。，；【】—"
+
+# 中英文、数字、允许的标点之外的字符，连续的一段一次删除
+# emoji 所在的 Unicode 范围不在白名单内，同样会被删除
+DISALLOWED_PATTERN = re.compile("[^\u4e00-\u9fffA-Za-z0-9" + re.escape(ALLOWED_PUNCTUATION) + "]+")
+MULTI_SPACE_PATTERN = re.compile(r'\s{2,}')
 
 def clean_text(text):
     """
     清理文本，保留中英文、数字、常见符号和空格，并移除特定 Unicode 范围的表情符号
+    整段文本只做一次预编译正则替换，不再逐字符匹配
     :param text: 待清理的文本
     :return: 清理后的文本
     """
-    # 移除 emoji 表情
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F300-\U0001F5FF"
-        "\u2190-\u21FF"
-        "\u2600-\u26FF"
-        "\u2700-\u27BF"
-        "\U0001F600-\U0001F6FF"
-        "\U0001F700-\U0001F77F"
-        "\U0001F900-\U0001F9FF"
-        "]+",
-        flags=re.UNICODE
-    )
-    text = emoji_pattern.sub('', text)
-
-    # 允许的标点符号
-    allowed_punctuation = " !~@#$%^&*()_+<>?:\"{}|,./;'[]\\-！￥……&*（）_+<>？：{}|，。，；【】—"
-
-    # 保留中英文、数字、允许的标点
-    cleaned_chars = []
-    for char in text:
-        if re.match(r'[\u4e00-\u9fffA-Za-z0-9]', char):
-            cleaned_chars.append(char)
-        elif char in allowed_punctuation:
-            cleaned_chars.append(char)
-        # 否则过滤掉
-
-    cleaned_text = ''.join(cleaned_chars)
+    cleaned_text = DISALLOWED_PATTERN.sub('', text)
     # 合并多个连续空格为一个空格
-    cleaned_text = re.sub(r'\s{2,}', ' ', cleaned_text)
+    cleaned_text = MULTI_SPACE_PATTERN.sub(' ', cleaned_text)
     return cleaned_text.strip()
 
-class SuffixAutomatonState:
-    def __init__(self):
-        self.length = 0
-        self.link = -1
-        self.next = dict()  # char -> stateId
-        self.end_pos_set = set()  # 收集出现位置
+# 转移表的键为 (状态 << 21) | 字符码位，Unicode 码位不超过 21 位
+_CODE_BITS = 21
 
 class SuffixAutomaton:
+    """
+    数组实现的后缀自动机
+    - length / link: 每个状态的最长串长度和后缀链接，平铺在整数数组中
+    - next: 所有状态的转移放在同一个字典里，键为 (状态 << 21) | 字符码位
+    - edge_head / edge_char / edge_next: 每个状态出边字符组成的链表，克隆状态时复制出边用
+    - repeat_length: 第 i 个字符结尾的后缀中，在 i 之前已经出现过的最长一个的长度
+    不保存任何出现位置集合，内存与文本长度成正比
+    """
     def __init__(self):
-        self.states = [SuffixAutomatonState()]
+        self.length = array('i', [0])
+        self.link = array('i', [-1])
+        self.edge_head = array('i', [-1])
+        self.edge_char = array('i')
+        self.edge_next = array('i')
+        self.next = {}
         self.last = 0
-
-    def extend(self, c, pos):
-        cur = len(self.states)
-        self.states.append(SuffixAutomatonState())
-        self.states[cur].length = self.states[self.last].length + 1
-        self.states[cur].end_pos_set.add(pos)
+        self.repeat_length = array('i')
+
+    def _new_state(self, length, link):
+        self.length.append(length)
+        self.link.append(link)
+        self.edge_head.append(-1)
+        return len(self.length) - 1
+
+    def _add_edge(self, state, code, target):
+        self.next[(state << _CODE_BITS) | code] = target
+        self.edge_char.append(code)
+        self.edge_next.append(self.edge_head[state])
+        self.edge_head[state] = len(self.edge_char) - 1
+
+    def extend(self, c):
+        code = ord(c)
+        length, link, next_ = self.length, self.link, self.next
+        edge_head, edge_char, edge_next = self.edge_head, self.edge_char, self.edge_next
+        cur = self._new_state(length[self.last] + 1, 0)
 
         p = self.last
-        while p != -1 and c not in self.states[p].next:
-            self.states[p].next[c] = cur
-            p = self.states[p].link
+        key = (p << _CODE_BITS) | code
+        while key not in next_:
+            # 内联 _add_edge，这是构建时最热的循环
+            next_[key] = cur
+            edge_char.append(code)
+            edge_next.append(edge_head[p])
+            edge_head[p] = len(edge_char) - 1
+            p = link[p]
+            if p == -1:
+                break
+            key = (p << _CODE_BITS) | code
         if p == -1:
-            self.states[cur].link = 0
+            repeat = 0
         else:
-            q = self.states[p].next[c]
-            if self.states[p].length + 1 == self.states[q].length:
-                self.states[cur].link = q
+            # p 是第一个已有 c 转移的状态，说明长度 length[p]+1 的后缀在此之前出现过
+            repeat = length[p] + 1
+            q = next_[key]
+            if repeat == length[q]:
+                link[cur] = q
             else:
-                clone = len(self.states)
-                self.states.append(SuffixAutomatonState())
-                self.states[clone].length = self.states[p].length + 1
-                self.states[clone].next = self.states[q].next.copy()
-                self.states[clone].link = self.states[q].link
-                self.states[clone].end_pos_set = set(self.states[q].end_pos_set)
-                while p != -1 and self.states[p].next[c] == q:
-                    self.states[p].next[c] = clone
-                    p = self.states[p].link
-                self.states[q].link = clone
-                self.states[cur].link = clone
+                clone = self._new_state(repeat, link[q])
+                edge = edge_head[q]
+                while edge != -1:
+                    edge_code = edge_char[edge]
+                    self._add_edge(clone, edge_code, next_[(q << _CODE_BITS) | edge_code])
+                    edge = edge_next[edge]
+                while p != -1 and next_.get((p << _CODE_BITS) | code) == q:
+                    next_[(p << _CODE_BITS) | code] = clone
+                    p = link[p]
+                link[q] = clone
+                link[cur] = clone
+        self.repeat_length.append(repeat)
         self.last = cur
 
-    def consolidate_end_pos(self):
-        # 按长度从大到小排序
-        order = list(range(len(self.states)))
-        order.sort(key=lambda x: -self.states[x].length)
-        for s in order:
-            link = self.states[s].link
-            if link != -1:
-                self.states[link].end_pos_set.update(self.states[s].end_pos_set)
-
-def remove_long_repeated_substrings(s):
-    """
-    从字符串 s 中，删除所有"长度≥21"的重复子串的第2+次出现；
-    保留每个重复子串在文本中的第一次出现。
-    返回删除后得到的字符串。
-    """
-    # 1) 构建后缀自动机
-    automaton = SuffixAutomaton()
-    for i, c in enumerate(s):
-        automaton.extend(c, i)
-    automaton.consolidate_end_pos()
-
-    # 2) 遍历所有状态, 获取满足"length≥21 && 出现次数≥2"的子串的出现区间
-    substring_occurrences_map = dict()
-    states = automaton.states
-    for st in states:
-        if st.length < 21:
-            continue
-        if len(st.end_pos_set) < 2:
-            continue
-        substring_len = st.length
-        link_len = 0 if st.link == -1 else states[st.link].length
-        for end_pos in st.end_pos_set:
-            start_pos = end_pos - substring_len + 1
-            if start_pos < 0:
+    def repeated_spans(self, min_length=21):
+        """
+        返回所有长度 ≥ min_length 的重复子串第2+次出现所覆盖的区间，已合并，按位置排序
+        位置 i 处的后缀若在 i 之前出现过且长度 ≥ min_length，则 [i - 长度 + 1, i] 属于后续出现；
+        反过来任何后续出现都被它结尾位置上的这个区间覆盖，所以这些区间的并集就是要删除的全部字符
+        :return: [(start, end), ...]，闭区间
+        """
+        merged = []
+        for end, repeat in enumerate(self.repeat_length):
+            if repeat < min_length:
                 continue
-            sub = s[start_pos:end_pos + 1]
-            if sub not in substring_occurrences_map:
-                substring_occurrences_map[sub] = []
-            substring_occurrences_map[sub].append((start_pos, end_pos))
-
-    # 3) 对每个重复子串（sub）：
-    #    - 出现区间按起始位置排序
-    #    - 保留第一次出现(不删除)，把后续出现的区间都放进"待删除"的列表
-    to_remove = []
-    for sub, intervals in substring_occurrences_map.items():
-        if len(intervals) < 2:
-            continue
-        intervals.sort(key=lambda x: x[0])
-        for interval in intervals[1:]:
-            to_remove.append(interval)
-
-    if not to_remove:
-        return s
-
-    # 4) 合并区间
-    to_remove.sort(key=lambda x: (x[0], x[1]))
-    merged = []
-    cur = list(to_remove[0])
-    for nxt in to_remove[1:]:
-        if nxt[0] <= cur[1] + 1:
-            cur[1] = max(cur[1], nxt[1])
-        else:
-            merged.append(tuple(cur))
-            cur = list(nxt)
-    merged.append(tuple(cur))
-
-    # 5) 跳过这些区间
-    result_pieces = []
-    index = 0
-    for start, end in merged:
-        if index < start:
-            result_pieces.append(s[index:start])
-        index = end + 1
-    if index < len(s):
-        result_pieces.append(s[index:])
-    return ''.join(result_pieces)
-
-def deduplicate_with_commoncrawl_dedupe(input_path, output_path, dedupe_path='./commoncrawl_dedupe'):
+            start = end - repeat + 1
+            # 新区间可能向前覆盖已合并的多个区间
+            while merged and start <= merged[-1][1] + 1:
+                start = min(start, merged.pop()[0])
+            merged.append((start, end))
+        return merged
+
+def build_suffix_array(s):
     """
-    用 commoncrawl_dedupe 工具对文件去重
-    :param input_path: 输入文件路径
-    :param output_path: 输出文件路径
-    :param dedupe_path: dedupe 可执行文件路径
+    前缀倍增构造后缀数组，每轮把 (rank[i], rank[i+k]) 编码为一个整数后排序
+    重复越长需要的轮数越多，最多 log2(n) 轮
+    :return: 后缀数组 sa，sa[r] 为字典序第 r 小的后缀的起始位置
     """
-    with open(output_path, 'w', encoding='utf-8') as fout:
-        subprocess.run([dedupe_path], stdin=open(input_path, 'r', encoding='utf-8'), stdout=fout)
-
-
-def remove_repeat(text):
+    n = len(s)
+    if n == 0:
+        return []
+    # 字符码位压缩为连续的秩
+    alphabet = {c: r for r, c in enumerate(sorted(set(s)))}
+    rank = [alphabet[c] for c in s]
+    sa = sorted(range(n), key=rank.__getitem__)
+    k = 1
+    while k < n:
+        base = max(rank) + 2
+        shifted = rank[k:] + [-1] * k
+        key = [a * base + b + 1 for a, b in zip(rank, shifted)]
+        sa.sort(key=key.__getitem__)
+        new_rank = [0] * n
+        r = 0
+        prev = key[sa[0]]
+        for i in sa:
+            if key[i] != prev:
+                r += 1
+                prev = key[i]
+            new_rank[i] = r
+        rank = new_rank
+        if r == n - 1:
+            break
+        k <<= 1
+    return sa
+
+def build_lcp_array(s, sa):
     """
-    使用 commoncrawl_dedupe 工具对文本去重
+    Kasai 算法计算 LCP 数组，lcp[r] 为 sa[r-1] 与 sa[r] 两个后缀的最长公共前缀长度，lcp[0] = 0
     """
-    with open('temp.txt', 'w', encoding='utf-8') as fout:
-        fout.write(text)
-    deduplicate_with_commoncrawl_dedupe('temp.txt', 'temp_deduped.txt')
-    return open('temp_deduped.txt', 'r', encoding='utf-8').read()
-# ----------------------
-# 简单测试与演示
-# # ----------------------
-# if __name__ == "__main__":
-#     test_string = (
-#         "abc...abc...这里构造一些重复子串...xyz...xyz"
-#         "再拼接一大段文字，确保里面有超过20字符的重复"
-#         "再拼接一大段文字，确保里面有超过20字符的重复"
-#         "...结尾处也可能有重复..."
-#     )
-#     result = remove_long_repeated_substrings(test_string)
-#     print("原字符串:", test_string)
-#     print("删除重复子串后:", result)
-
-#     my_string = "This is some 测试文本 🤔🙂😊😳,,,,,,行者.slideshare.net"
-#     print(remove_html_tags(clean_text(my_string)))
-import re
-from html import unescape
-from bs4 import BeautifulSoup
-import subprocess
-
-def remove_html_tags(html_content):
+    n = len(s)
+    rank = [0] * n
+    for r, i in enumerate(sa):
+        rank[i] = r
+    lcp = [0] * n
+    h = 0
+    for i in range(n):
+        r = rank[i]
+        if r == 0:
+            h = 0
+            continue
+        j = sa[r - 1]
+        while i + h < n and j + h < n and s[i + h] == s[j + h]:
+            h += 1
+        lcp[r] = h
+        if h:
+            h -= 1
+    return lcp
+
+def longest_previous_factor(sa, lcp):
     """
-    使用 BeautifulSoup 移除 HTML 标签
-    :param html_content: 包含 HTML 标签的字符串
-    :return: 移除 HTML 标签后的文本
+    计算每个位置 i 的最长前向因子：s[i:] 的前缀中，在 i 之前某处也作为起点出现过的最长一个的长度
+    它等于后缀数组中 i 上下两侧最近的、起始位置比 i 小的后缀与 i 的 LCP 的较大者，用单调栈线性求出
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-    return soup.get_text()
-
-def clean_text(text):
+    n = len(sa)
+    lpf = [0] * n
+    # 栈中的秩对应的起始位置单调递增；m 为该秩到栈中上一个元素（或当前秩）之间 LCP 的最小值
+    stack = []
+    for r in range(n):
+        pos = sa[r]
+        cur = lcp[r]
+        while stack and sa[stack[-1][0]] > pos:
+            top, m = stack.pop()
+            m = min(m, cur)
+            # r 是 top 下方第一个起始位置更小的后缀
+            if m > lpf[sa[top]]:
+                lpf[sa[top]] = m
+            cur = m
+        if stack:
+            # 栈顶是 r 上方第一个起始位置更小的后缀
+            top, m = stack[-1]
+            m = min(m, cur)
+            stack[-1] = (top, m)
+            if m > lpf[pos]:
+                lpf[pos] = m
+        stack.append((r, n))
+    return lpf
+
+def repeated_spans_suffix_array(s, min_length=21):
     """
-    清理文本，保留中英文、数字、常见符号和空格，并移除特定 Unicode 范围的表情符号
-    :param text: 待清理的文本
-    :return: 清理后的文本
+    用后缀数组 + LCP 求所有长度 ≥ min_length 的重复子串第2+次出现所覆盖的区间，已合并，按位置排序
+    以 i 起始、在 i 之前出现过的最长子串长度为 lpf[i]，[i, i + lpf[i] - 1] 就是后续出现；
+    任何后续出现都被它起始位置上的这个区间覆盖，与后缀自动机按结尾位置求出的区间并集相同
+    :return: [(start, end), ...]，闭区间
     """
-    # 移除 emoji 表情
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F300-\U0001F5FF"
-        "\u2190-\u21FF"
-        "\u2600-\u26FF"
-        "\u2700-\u27BF"
-        "\U0001F600-\U0001F6FF"
-        "\U0001F700-\U0001F77F"
-        "\U0001F900-\U0001F9FF"
-        "]+",
-        flags=re.UNICODE
-    )
-    text = emoji_pattern.sub('', text)
-
-    # 允许的标点符号
-    allowed_punctuation = " !~@#$%^&*()_+<>?:\"{}|,./;'[]\\-！￥……&*（）_+<>？：{}|，。，；【】—"
-
-    # 保留中英文、数字、允许的标点
-    cleaned_chars = []
-    for char in text:
-        if re.match(r'[\u4e00-\u9fffA-Za-z0-9]', char):
-            cleaned_chars.append(char)
-        elif char in allowed_punctuation:
-            cleaned_chars.append(char)
-        # 否则过滤掉
-
-    cleaned_text = ''.join(cleaned_chars)
-    # 合并多个连续空格为一个空格
-    cleaned_text = re.sub(r'\s{2,}', ' ', cleaned_text)
-    return cleaned_text.strip()
-
-class SuffixAutomatonState:
-    def __init__(self):
-        self.length = 0
-        self.link = -1
-        self.next = dict()  # char -> stateId
-        self.end_pos_set = set()  # 收集出现位置
-
-class SuffixAutomaton:
-    def __init__(self):
-        self.states = [SuffixAutomatonState()]
-        self.last = 0
-
-    def extend(self, c, pos):
-        cur = len(self.states)
-        self.states.append(SuffixAutomatonState())
-        self.states[cur].length = self.states[self.last].length + 1
-        self.states[cur].end_pos_set.add(pos)
-
-        p = self.last
-        while p != -1 and c not in self.states[p].next:
-            self.states[p].next[c] = cur
-            p = self.states[p].link
-        if p == -1:
-            self.states[cur].link = 0
+    sa = build_suffix_array(s)
+    lpf = longest_previous_factor(sa, build_lcp_array(s, sa))
+    merged = []
+    for start, length in enumerate(lpf):
+        if length < min_length:
+            continue
+        end = start + length - 1
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
         else:
-            q = self.states[p].next[c]
-            if self.states[p].length + 1 == self.states[q].length:
-                self.states[cur].link = q
-            else:
-                clone = len(self.states)
-                self.states.append(SuffixAutomatonState())
-                self.states[clone].length = self.states[p].length + 1
-                self.states[clone].next = self.states[q].next.copy()
-                self.states[clone].link = self.states[q].link
-                self.states[clone].end_pos_set = set(self.states[q].end_pos_set)
-                while p != -1 and self.states[p].next[c] == q:
-                    self.states[p].next[c] = clone
-                    p = self.states[p].link
-                self.states[q].link = clone
-                self.states[cur].link = clone
-        self.last = cur
+            merged.append((start, end))
+    return merged
 
-    def consolidate_end_pos(self):
-        # 按长度从大到小排序
-        order = list(range(len(self.states)))
-        order.sort(key=lambda x: -self.states[x].length)
-        for s in order:
-            link = self.states[s].link
-            if link != -1:
-                self.states[link].end_pos_set.update(self.states[s].end_pos_set)
-
-def remove_long_repeated_substrings(s):
+def remove_long_repeated_substrings(s, min_length=21, engine="automaton"):
     """
     从字符串 s 中，删除所有"长度≥21"的重复子串的第2+次出现；
     保留每个重复子串在文本中的第一次出现。
     返回删除后得到的字符串。
+    :param engine: "automaton" 使用后缀自动机；"suffix_array" 使用后缀数组 + LCP，两者结果相同
     """
-    # 1) 构建后缀自动机
-    automaton = SuffixAutomaton()
-    for i, c in enumerate(s):
-        automaton.extend(c, i)
-    automaton.consolidate_end_pos()
-
-    # 2) 遍历所有状态, 获取满足"length≥21 && 出现次数≥2"的子串的出现区间
-    substring_occurrences_map = dict()
-    states = automaton.states
-    for st in states:
-        if st.length < 21:
-            continue
-        if len(st.end_pos_set) < 2:
-            continue
-        substring_len = st.length
-        link_len = 0 if st.link == -1 else states[st.link].length
-        for end_pos in st.end_pos_set:
-            start_pos = end_pos - substring_len + 1
-            if start_pos < 0:
-                continue
-            sub = s[start_pos:end_pos + 1]
-            if sub not in substring_occurrences_map:
-                substring_occurrences_map[sub] = []
-            substring_occurrences_map[sub].append((start_pos, end_pos))
-
-    # 3) 对每个重复子串（sub）：
-    #    - 出现区间按起始位置排序
-    #    - 保留第一次出现(不删除)，把后续出现的区间都放进"待删除"的列表
-    to_remove = []
-    for sub, intervals in substring_occurrences_map.items():
-        if len(intervals) < 2:
-            continue
-        intervals.sort(key=lambda x: x[0])
-        for interval in intervals[1:]:
-            to_remove.append(interval)
-
-    if not to_remove:
+    # 1) 得到需要删除的区间
+    if engine == "suffix_array":
+        merged = repeated_spans_suffix_array(s, min_length)
+    elif engine == "automaton":
+        # 构建后缀自动机，同时记录每个位置结尾的最长已出现后缀
+        automaton = SuffixAutomaton()
+        for c in s:
+            automaton.extend(c)
+        merged = automaton.repeated_spans(min_length)
+    else:
+        raise ValueError(f"未知的去重引擎: {engine}")
+    if not merged:
         return s
 
-    # 4) 合并区间
-    to_remove.sort(key=lambda x: (x[0], x[1]))
-    merged = []
-    cur = list(to_remove[0])
-    for nxt in to_remove[1:]:
-        if nxt[0] <= cur[1] + 1:
-            cur[1] = max(cur[1], nxt[1])
-        else:
-            merged.append(tuple(cur))
-            cur = list(nxt)
-    merged.append(tuple(cur))
-
-    # 5) 跳过这些区间
+    # 2) 跳过这些区间
     result_pieces = []
     index = 0
     for start, end in merged:
@@ -386,14 +282,66 @@ def deduplicate_with_commoncrawl_dedupe(input_path, output_path, dedupe_path='./
         subprocess.run([dedupe_path], stdin=open(input_path, 'r', encoding='utf-8'), stdout=fout)
 
 
-def remove_repeat(text):
+# commoncrawl_dedupe 约定的文档分隔符，以它开头的行不参与去重
+DOCUMENT_DELIMITER = "df6fa1abb58549287111ba8d776733e9"
+
+class LineDeduplicator:
+    """
+    进程内的行级去重，语义与 commoncrawl_dedupe 相同：
+    - 以文档分隔符开头的行总是保留
+    - 其余行按内容去重，只保留第一次出现
+    - 输出的每一行都以换行结尾
+    集合中只存每行的 8 字节哈希，同一个实例处理的所有文档共享这个集合，
+    一个分片（或一批文档）用同一个实例处理即可跨文档去重
+    """
+    def __init__(self):
+        self.seen = set()
+
+    @staticmethod
+    def line_hash(line):
+        return int.from_bytes(hashlib.blake2b(line.encode('utf-8', errors='surrogatepass'), digest_size=8).digest(), 'little')
+
+    def dedupe_lines(self, lines):
+        """
+        过滤行迭代器（行不含换行符），返回保留的行
+        """
+        seen = self.seen
+        for line in lines:
+            if line.startswith(DOCUMENT_DELIMITER):
+                yield line
+                continue
+            h = self.line_hash(line)
+            if h not in seen:
+                seen.add(h)
+                yield line
+
+    def dedupe(self, text):
+        """
+        对一段文本按行去重
+        """
+        lines = text.split('\n')
+        # 与按行读取一致：结尾的换行不产生额外的空行
+        if lines and lines[-1] == '':
+            lines.pop()
+        return ''.join(line + '\n' for line in self.dedupe_lines(lines))
+
+def dedupe_documents(texts, deduplicator=None):
+    """
+    对一批文档做行级去重，整批共享同一个哈希集合，先出现的文档中的行优先保留
+    :param texts: 文档文本列表
+    :param deduplicator: 可选的 LineDeduplicator，传入时可在多批之间（例如整个分片）继续共享
+    :return: 去重后的文档文本列表
+    """
+    deduplicator = deduplicator or LineDeduplicator()
+    return [deduplicator.dedupe(text) for text in texts]
+
+def remove_repeat(text, deduplicator=None):
     """
-    使用 commoncrawl_dedupe 工具对文本去重
+    对文本按行去重，与 commoncrawl_dedupe 工具的结果相同，但在进程内完成，不写临时文件，可并行调用
+    :param deduplicator: 可选的 LineDeduplicator，不传时只在本文本内去重
     """
-    with open('temp.txt', 'w', encoding='utf-8') as fout:
-        fout.write(text)
-    deduplicate_with_commoncrawl_dedupe('temp.txt', 'temp_deduped.txt')
-    return open('temp_deduped.txt', 'r', encoding='utf-8').read()
+    return (deduplicator or LineDeduplicator()).dedupe(text)
+
 # ----------------------
 # 简单测试与演示
 # # ----------------------
@@ -409,4 +357,4 @@ def remove_repeat(text):
 #     print("删除重复子串后:", result)
 
 #     my_string = "This is some 测试文本 🤔🙂😊😳,,,,,,行者.slideshare.net"
-#     print(remove_html_tags(clean_text(my_string)))
\ No newline at end of file
+#     print(remove_html_tags(clean_text(my_string)))
@@ -1,31 +1,32 @@
-import fasttext
-# 加载预训练语言识别模型（模型文件路径自行替换）  
-model = fasttext.load_model(r"N:\program-files\nlp_learn\paper_craw\Crawl_Page\tools\lid.176.bin")  
+import os
+import sys
 
-def is_chinese_fasttext(text, threshold=0.7):  
-    predictions = model.predict(text, k=1)  # 返回最可能的语言和置信度  
-    lang_label, confidence = predictions[0][0], predictions[1][0]  
-    return lang_label == '__label__zh' and confidence >= threshold  
+# 将项目根目录添加到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-# # 测试  
-# text = "s iss is an English t"  
-# print(is_chinese_fasttext(text))  # True 或 False（取决于置信度）  
+from lang_id import predict_chinese, get_model, preload_model, DEFAULT_MAX_CHARS
 
-# text2 = "This is an English text."  
-# print(is_chinese_fasttext(text2))  # False  
+# 预训练语言识别模型在第一次判定时才加载，路径可用环境变量 FASTTEXT_LID_MODEL 指定（见 lang_id）
 
-import fasttext
-# 加载预训练语言识别模型（模型文件路径自行替换）  
-model = fasttext.load_model(r"N:\program-files\nlp_learn\paper_craw\Crawl_Page\tools\lid.176.bin")  
+def is_chinese_fasttext(text, threshold=0.7, max_chars=DEFAULT_MAX_CHARS):
+    """
+    判断单个文本是否为中文
+    :param max_chars: 只取均匀分布的最多 max_chars 个字符做预测，None 表示使用全文
+    """
+    return is_chinese_fasttext_batch([text], threshold, max_chars)[0]
 
-def is_chinese_fasttext(text, threshold=0.7):  
-    predictions = model.predict(text, k=1)  # 返回最可能的语言和置信度  
-    lang_label, confidence = predictions[0][0], predictions[1][0]  
-    return lang_label == '__label__zh' and confidence >= threshold  
+def is_chinese_fasttext_batch(texts, threshold=0.7, max_chars=DEFAULT_MAX_CHARS):
+    """
+    批量判断文本是否为中文，整批只调用一次 model.predict
+    :param texts: 文本列表
+    :param max_chars: 每个文本只取均匀分布的最多 max_chars 个字符做预测，None 表示使用全文
+    :return: 布尔列表，与 texts 一一对应
+    """
+    return predict_chinese(get_model(), texts, threshold, max_chars)
 
-# # 测试  
-# text = "s iss is an English t"  
-# print(is_chinese_fasttext(text))  # True 或 False（取决于置信度）  
+# # 测试
+# text = "s iss is an English t"
+# print(is_chinese_fasttext(text))  # True 或 False（取决于置信度）
 
-# text2 = "This is an English text."  
-# print(is_chinese_fasttext(text2))  # False  
+# text2 = "This is an English text."
+# print(is_chinese_fasttext(text2))  # False
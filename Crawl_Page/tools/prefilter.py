@@ -0,0 +1,102 @@
+"""
+中文网页预筛
+在解析HTML和fastText判定之前，直接扫描网页正文字节，快速排除明显不是中文的记录
+- 统计 UTF-8 编码的CJK字符：U+4000-U+9FFF 的 UTF-8 编码为首字节 0xE4-0xE9 加两个续字节 0x80-0xBF，
+  先用一次 bytes.translate 按首字节计数得到上界（Latin-1、二进制等负载中这些字节也会单独出现），
+  上界达到阈值时再用正则统计完整的三字节序列
+- 字节中CJK字符太少时，再看 HTTP 头和网页头部的提示：中文字符集（GBK/GB2312/Big5 等，此时正文不是UTF-8，
+  按字节计数无效）或 zh 语言声明，有提示的仍交给完整判定
+- 没有提示时，不是合法 UTF-8、GB/Big5 双字节字符（首字节 0x81-0xFE，第二字节 0x40-0xFE）足够多，
+  且按 GB18030 或 Big5 解码开头部分像中文（见 tools.charset.is_plausible_chinese）的，视为未声明字符集的中文网页
+三者都不满足的记录直接判为非中文
+"""
+import re
+
+# U+4000-U+9FFF（覆盖全部基本区汉字）的 UTF-8 首字节
+CJK_LEAD_BYTES = bytes(range(0xE4, 0xEA))
+CJK_CHAR_PATTERN = re.compile(rb'[\xe4-\xe9][\x80-\xbf]{2}')
+# 正文不是 UTF-8 的中文字符集
+CHINESE_CHARSETS = {'gb2312', 'gbk', 'gb18030', 'cp936', 'x-gbk', 'euc-cn', 'hz-gb-2312', 'big5', 'big5-hkscs', 'cp950'}
+# 只在网页开头这么多字节内查找 meta 和 html 标签上的提示
+HEAD_BYTES = 8192
+# GB2312/GBK/GB18030 和 Big5 双字节字符的首字节
+DOUBLE_BYTE_LEAD_BYTES = bytes(range(0x81, 0xFF))
+DOUBLE_BYTE_CHAR_PATTERN = re.compile(rb'[\x81-\xfe][\x40-\xfe]')
+# 检查 GB/Big5 解码结果是否像中文时只解码开头这么多字节
+DOUBLE_BYTE_SAMPLE_BYTES = 64 * 1024
+
+CHARSET_PATTERN = re.compile(rb'charset\s*=\s*["\']?\s*([a-zA-Z0-9_\-]+)', re.IGNORECASE)
+LANG_PATTERN = re.compile(rb'<html[^>]*?\slang\s*=\s*["\']?\s*zh', re.IGNORECASE)
+
+
+def count_cjk_lead_bytes(content):
+    """
+    统计字节串中CJK首字节的个数，是 count_cjk_chars 的廉价上界
+    """
+    return len(content) - len(content.translate(None, CJK_LEAD_BYTES))
+
+
+def count_cjk_chars(content):
+    """
+    统计字节串中 UTF-8 编码的CJK字符数（首字节后须跟两个续字节）
+    """
+    return len(CJK_CHAR_PATTERN.findall(content))
+
+
+def count_double_byte_chars(content):
+    """
+    统计字节串中 GB/Big5 双字节字符的个数（按首字节和第二字节的取值范围，不校验编码表）
+    """
+    return len(DOUBLE_BYTE_CHAR_PATTERN.findall(content))
+
+
+def may_be_undeclared_chinese(content, min_cjk_chars=20):
+    """
+    是否像没有声明字符集的 GBK/GB18030/Big5 中文网页：不是合法 UTF-8，双字节字符足够多，且按 GB18030 或 Big5 解码开头部分像中文
+    """
+    if len(content) - len(content.translate(None, DOUBLE_BYTE_LEAD_BYTES)) < min_cjk_chars:
+        return False
+    if count_double_byte_chars(content) < min_cjk_chars:
+        return False
+    try:
+        content.decode('utf-8')
+        return False
+    except UnicodeDecodeError:
+        pass
+    # tools.charset 依赖本模块，在这里导入
+    from tools.charset import FALLBACK_CHARSETS, is_plausible_chinese
+    sample = content[:DOUBLE_BYTE_SAMPLE_BYTES]
+    return any(is_plausible_chinese(sample.decode(charset, errors='replace')) for charset in FALLBACK_CHARSETS)
+
+
+def has_chinese_hint(content, content_type=None, content_language=None):
+    """
+    HTTP 头或网页头部是否声明了中文字符集或中文语言
+    :param content: 网页正文字节
+    :param content_type: HTTP Content-Type 头
+    :param content_language: HTTP Content-Language 头
+    """
+    if content_language and content_language.strip().lower().startswith('zh'):
+        return True
+    if content_type:
+        match = CHARSET_PATTERN.search(content_type.encode('latin-1', errors='ignore'))
+        if match and match.group(1).decode('ascii').lower() in CHINESE_CHARSETS:
+            return True
+    head = content[:HEAD_BYTES]
+    match = CHARSET_PATTERN.search(head)
+    if match and match.group(1).decode('ascii').lower() in CHINESE_CHARSETS:
+        return True
+    return LANG_PATTERN.search(head) is not None
+
+
+def may_be_chinese(content, content_type=None, content_language=None, min_cjk_chars=20):
+    """
+    预筛：返回 False 表示明显不是中文，可以跳过后续解析和判定
+    :param content: 网页正文字节（已按 Content-Encoding 解码）
+    :param min_cjk_chars: UTF-8 CJK字符数达到该值即放行；没有提示时，GB/Big5 双字节字符数也须达到该值
+    """
+    if count_cjk_lead_bytes(content) >= min_cjk_chars and count_cjk_chars(content) >= min_cjk_chars:
+        return True
+    if has_chinese_hint(content, content_type, content_language):
+        return True
+    return may_be_undeclared_chinese(content, min_cjk_chars)
@@ -0,0 +1,207 @@
+"""
+WARC记录索引（类似CDX）
+每个WARC文件旁边放一个同名的 .idx 文本文件，每行描述一条记录，字段以制表符分隔：
+offset  length  rec_type  content_type  lang  uri
+offset/length 为记录在WARC文件中的字节位置和长度，对 .warc.gz 来说正好是gzip成员边界
+未知字段写为 '-'
+
+索引只需建立一次，之后可以：
+- seek 到任意记录直接读取（iter_records_at），只重跑选中的记录
+- 从任意记录边界开始顺序读取一段字节区间（iter_records_in_range），中断后从断点继续
+- 按字节区间把一个WARC切分给多个进程并行处理（split_ranges）
+
+命令行用法（在 Crawl_Page 目录下）：
+    python -m tools.record_index build xxx.warc.gz [--lang]
+    python -m tools.record_index split xxx.warc.gz --parts 4
+"""
+import os
+import argparse
+from tqdm import tqdm
+from warcio.archiveiterator import ArchiveIterator
+
+from tools.lang import preload_model
+
+INDEX_SUFFIX = '.idx'
+FIELDS = ('offset', 'length', 'rec_type', 'content_type', 'lang', 'uri')
+
+
+def index_path_for(warc_path):
+    """
+    返回WARC文件对应的索引文件路径
+    """
+    return warc_path + INDEX_SUFFIX
+
+
+def _clean_field(value):
+    if value is None or value == '':
+        return '-'
+    # 字段内不能出现分隔符和换行
+    return str(value).replace('\t', ' ').replace('\n', ' ').replace('\r', ' ')
+
+
+class RecordIndexWriter:
+    """
+    逐条追加写索引行
+    """
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.f = open(index_path, 'w', encoding='utf-8')
+
+    def write(self, offset, length, rec_type, content_type=None, lang=None, uri=None):
+        fields = (offset, length, rec_type, content_type, lang, uri)
+        self.f.write('\t'.join(_clean_field(value) for value in fields) + '\n')
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_index(index_path):
+    """
+    逐行读取索引，返回字典迭代器，offset/length 转为整数
+    """
+    with open(index_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            values = line.rstrip('\n').split('\t')
+            if len(values) != len(FIELDS):
+                continue
+            entry = dict(zip(FIELDS, values))
+            entry['offset'] = int(entry['offset'])
+            entry['length'] = int(entry['length'])
+            yield entry
+
+
+def count_records(warc_path, rec_type='response'):
+    """
+    从旁路索引统计指定类型的记录数，不解压WARC文件
+    :return: 记录数；没有索引文件时返回 None
+    """
+    index_path = index_path_for(warc_path)
+    if not os.path.exists(index_path):
+        return None
+    return sum(1 for entry in read_index(index_path) if entry['rec_type'] == rec_type)
+
+
+def build_index(warc_path, index_path=None, classify=None):
+    """
+    遍历一遍WARC文件，为每条记录生成一行索引
+    :param warc_path: WARC文件路径
+    :param index_path: 索引文件路径，默认为 warc_path + '.idx'
+    :param classify: 可选的语言判定函数 classify(record) -> str，只对 response 记录调用，结果写入 lang 字段
+    :return: 索引文件路径
+    """
+    index_path = index_path or index_path_for(warc_path)
+    if classify is not None:
+        # 开始遍历前加载语言识别模型，模型加载失败时直接报错，而不是把每条记录都记为非中文
+        preload_model()
+    with open(warc_path, 'rb') as stream, RecordIndexWriter(index_path) as writer:
+        iterator = ArchiveIterator(stream, arc2warc=True)
+        for record in tqdm(iterator, desc="建立索引"):
+            content_type = record.http_headers.get_header('Content-Type') if record.http_headers else None
+            lang = None
+            if classify is not None and record.rec_type == 'response':
+                lang = classify(record)
+            writer.write(iterator.get_record_offset(), iterator.get_record_length(), record.rec_type,
+                         content_type, lang, record.rec_headers.get_header('WARC-Target-URI'))
+    return index_path
+
+
+def select_offsets(index_path, rec_type='response', lang=None):
+    """
+    从索引中挑出指定类型（和语言判定结果）的记录偏移
+    """
+    return [entry['offset'] for entry in read_index(index_path)
+            if entry['rec_type'] == rec_type and (lang is None or entry['lang'] == lang)]
+
+
+def iter_records_at(warc_path, offsets):
+    """
+    按偏移直接 seek 到各条记录读取，返回 (offset, record) 迭代器
+    offset 必须是记录起始位置（对 .warc.gz 即gzip成员边界），通常来自索引
+    """
+    with open(warc_path, 'rb') as stream:
+        for offset in offsets:
+            stream.seek(offset)
+            for record in ArchiveIterator(stream, arc2warc=True):
+                yield offset, record
+                break
+
+
+def iter_records_in_range(warc_path, start=0, end=None):
+    """
+    从记录边界 start 开始顺序读取，遇到起始偏移不小于 end 的记录时停止，返回 (offset, record) 迭代器
+    :param start: 起始偏移，必须是记录起始位置
+    :param end: 结束偏移（不含），None 表示读到文件末尾
+    """
+    with open(warc_path, 'rb') as stream:
+        stream.seek(start)
+        iterator = ArchiveIterator(stream, arc2warc=True)
+        for record in iterator:
+            # 迭代器刚返回记录时 offset 就是该记录的起始偏移
+            offset = iterator.offset
+            if end is not None and offset >= end:
+                break
+            yield offset, record
+
+
+def split_ranges(index_path, parts):
+    """
+    按字节数把索引覆盖的区间切成约 parts 个连续区间，边界都落在记录起始位置
+    :return: [(start, end), ...]，end 不含，最后一个区间的 end 为 None
+    """
+    entries = list(read_index(index_path))
+    if not entries:
+        return []
+    first = entries[0]['offset']
+    total = entries[-1]['offset'] + entries[-1]['length'] - first
+    target = max(1, total // max(1, parts))
+
+    ranges = []
+    start = first
+    for entry in entries[1:]:
+        if entry['offset'] - start >= target and len(ranges) < parts - 1:
+            ranges.append((start, entry['offset']))
+            start = entry['offset']
+    ranges.append((start, None))
+    return ranges
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WARC记录索引工具")
+    subparsers = parser.add_subparsers(dest="command", help="命令")
+
+    build_parser = subparsers.add_parser("build", help="建立索引")
+    build_parser.add_argument("warc_path", type=str, help="WARC文件路径")
+    build_parser.add_argument("--lang", action="store_true", help="同时对response记录做中文判定并写入索引")
+
+    split_parser = subparsers.add_parser("split", help="按字节区间切分")
+    split_parser.add_argument("warc_path", type=str, help="WARC文件路径")
+    split_parser.add_argument("--parts", type=int, default=4, help="切分份数")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        classify = None
+        if args.lang:
+            from subsample_warc_warc import classify_record
+            classify = classify_record
+        print("索引已保存到:", build_index(args.warc_path, classify=classify))
+
+    elif args.command == "split":
+        index_path = index_path_for(args.warc_path)
+        if not os.path.exists(index_path):
+            build_index(args.warc_path)
+        for start, end in split_ranges(index_path, args.parts):
+            print(start, end if end is not None else '-')
+
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
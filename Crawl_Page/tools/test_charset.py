@@ -0,0 +1,53 @@
+"""
+测试网页字符集识别与解码
+"""
+import os
+import sys
+
+# 将 Crawl_Page 目录添加到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import charset
+from tools.charset import detect_and_decode, decode_html
+
+SIMPLIFIED = "中文网页的字符集识别与解码，这是一段用于测试的简体中文文本。" * 10
+TRADITIONAL = "繁體中文網頁的字元集識別與解碼，這是一段測試用的文字。" * 10
+
+
+def test_declared_charset_takes_precedence():
+    """BOM、HTTP 头和 meta 中声明的字符集依次生效，GB2312/GBK 按 GB18030 解码"""
+    cases = [
+        (b'\xef\xbb\xbf' + SIMPLIFIED.encode('utf-8'), None, 'utf-8', 'bom'),
+        (SIMPLIFIED.encode('gbk'), 'text/html; charset=GB2312', 'gb18030', 'header'),
+        (('<meta charset="gbk">' + SIMPLIFIED).encode('gbk'), 'text/html', 'gb18030', 'meta'),
+        (TRADITIONAL.encode('big5'), 'text/html; charset=big5', 'big5hkscs', 'header'),
+        (SIMPLIFIED.encode('utf-8'), None, 'utf-8', 'utf-8'),
+    ]
+    for content, content_type, expected, source in cases:
+        text, detected, detected_source = detect_and_decode(content, content_type)
+        assert (detected, detected_source) == (expected, source)
+        assert SIMPLIFIED[:10] in text or TRADITIONAL[:10] in text
+
+
+def test_undeclared_chinese_charsets_and_stats(monkeypatch):
+    """没有声明时区分 GB 和 Big5，乱码字节记为无法解码，统计按字符集累加"""
+    monkeypatch.setattr(charset, "_detector", None)
+    stats = {}
+    assert decode_html(SIMPLIFIED.encode('gbk'), stats=stats) == (SIMPLIFIED, 'gb18030')
+    assert decode_html(TRADITIONAL.encode('big5'), stats=stats) == (TRADITIONAL, 'big5hkscs')
+    # 声明为 UTF-8 但实际是 GBK：声明的字符集解码失败后继续检测
+    assert decode_html(('<meta charset=utf-8>' + SIMPLIFIED).encode('gbk'), stats=stats)[1] == 'gb18030'
+    assert decode_html(bytes(range(128, 256)) * 20, stats=stats)[1] is None
+    assert stats['gb18030']['count'] == 2 and stats['big5hkscs']['count'] == 1 and stats['undecodable']['count'] == 1
+    assert stats['_sources'] == {'detected': 3, 'fallback': 1}
+
+
+def test_undeclared_western_pages_fall_back_to_cp1252(monkeypatch):
+    """没有声明的西文网页能按 GB18030 / Big5 严格解码时也不当作中文，按 windows-1252 解码"""
+    monkeypatch.setattr(charset, "_detector", None)
+    german = "<p>Schöne Grüße aus München. Die Straße ist größer als gedacht, schön und ruhig.</p>" * 20
+    french = "<p>Très élégant café — « déjà vu » à côté de l’église, naïve façon.</p>" * 20
+    # Latin-1 的德文能按 Big5-HKSCS 严格解码，得到的是生僻字乱码
+    assert charset._decode_strict(german.encode('latin-1'), 'big5hkscs') is not None
+    assert detect_and_decode(german.encode('latin-1')) == (german, 'cp1252', 'detected')
+    assert detect_and_decode(french.encode('cp1252')) == (french, 'cp1252', 'detected')
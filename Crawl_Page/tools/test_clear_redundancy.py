@@ -0,0 +1,192 @@
+"""
+测试正文提取与清洗工具
+"""
+import os
+import re
+import sys
+import random
+
+# 将 Crawl_Page 目录添加到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.clear_redundancy import (remove_html_tags, clean_text, remove_long_repeated_substrings, remove_repeat,
+                                    LineDeduplicator, dedupe_documents, DOCUMENT_DELIMITER)
+from html_extract import available_backends
+
+HTML_SAMPLES = [
+    '<html><head><title>标题</title><style>p{color:red}</style></head>'
+    '<body><nav><a href="/">首页</a></nav><p>第一段<b>加粗</b>结尾</p><footer>版权所有</footer></body></html>',
+    '<!DOCTYPE html><p>未闭合段落<br>换行后的文字\n<p>第二段 &amp; 实体 &lt;标签&gt; &#x4e2d;&#25991;',
+    '<div>正文<!-- 注释不计入 -->继续<script>var s = "<p>脚本</p>";</script>脚本之后</div>',
+    '<header><h1>页眉</h1></header><table><tr><td>单元格一</td><td>单元格二</td></tr></table>'
+    '<noscript>请启用脚本</noscript>',
+    '纯文本，没有任何标签',
+    '',
+]
+
+
+def normalize(text):
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def test_remove_html_tags_drops_boilerplate():
+    """脚本、样式、导航、页眉页脚的内容都被去掉，尾随文本保留"""
+    for backend in available_backends():
+        text = remove_html_tags(HTML_SAMPLES[0], backend=backend)
+        assert normalize(text) == "标题第一段加粗结尾", backend
+        text = remove_html_tags(HTML_SAMPLES[2], backend=backend)
+        assert normalize(text) == "正文继续脚本之后", backend
+
+
+def test_backends_match_bs4():
+    """各后端清洗后的结果与 bs4 一致"""
+    for html in HTML_SAMPLES:
+        expected = clean_text(remove_html_tags(html, backend="bs4"))
+        for backend in available_backends():
+            assert clean_text(remove_html_tags(html, backend=backend)) == expected, (backend, html)
+
+
+def _reference_clean_text(text):
+    """逐字符匹配的旧实现，作为等价性测试的参照"""
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F300-\U0001F5FF"
+        "\u2190-\u21FF"
+        "\u2600-\u26FF"
+        "\u2700-\u27BF"
+        "\U0001F600-\U0001F6FF"
+        "\U0001F700-\U0001F77F"
+        "\U0001F900-\U0001F9FF"
+        "]+",
+        flags=re.UNICODE
+    )
+    text = emoji_pattern.sub('', text)
+    allowed_punctuation = " !~@#$%^&*()_+<>?:\"{}|,./;'[]\\-！￥……&*（）_+<>？：{}|，。，；【】—"
+    cleaned_chars = []
+    for char in text:
+        if re.match(r'[\u4e00-\u9fffA-Za-z0-9]', char):
+            cleaned_chars.append(char)
+        elif char in allowed_punctuation:
+            cleaned_chars.append(char)
+    cleaned_text = ''.join(cleaned_chars)
+    cleaned_text = re.sub(r'\s{2,}', ' ', cleaned_text)
+    return cleaned_text.strip()
+
+
+def test_clean_text_matches_reference():
+    """预编译正则实现与逐字符实现结果一致"""
+    # 覆盖白名单边界、全角字符、emoji、各种空白和控制字符
+    alphabet = (list("abcXYZ0189 !~@#$%^&*()_+<>?:\"{}|,./;'[]\\-！￥…&（）？：，。；【】—")
+                + ['\u4dff', '\u4e00', '\u4e2d', '\u9fff', '\ua000', '０', 'Ａ', 'é', 'İ', 'ß', '\u3000',
+                   '\t', '\n', '\r', '\xa0', '\x00', '\u200b', '\u2190', '\u27bf', '\U0001F600', '\U0001F9FF',
+                   '\U0001F300', '、', '“', '”', '《', '》', '·', '\U00020000'])
+    rng = random.Random(0)
+    samples = [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 200))) for _ in range(2000)]
+    samples += [remove_html_tags(html, backend="bs4") for html in HTML_SAMPLES]
+    samples.append("This is some 测试文本 🤔🙂😊😳,,,,,,行者.slideshare.net")
+    for text in samples:
+        assert clean_text(text) == _reference_clean_text(text), repr(text)
+
+
+def _reference_remove_long_repeated_substrings(s):
+    """保存全部出现位置集合的旧实现，作为等价性测试的参照"""
+    length, link, trans, endpos = [0], [-1], [{}], [set()]
+    last = 0
+    for pos, c in enumerate(s):
+        cur = len(length)
+        length.append(length[last] + 1)
+        link.append(-1)
+        trans.append({})
+        endpos.append({pos})
+        p = last
+        while p != -1 and c not in trans[p]:
+            trans[p][c] = cur
+            p = link[p]
+        if p == -1:
+            link[cur] = 0
+        else:
+            q = trans[p][c]
+            if length[p] + 1 == length[q]:
+                link[cur] = q
+            else:
+                clone = len(length)
+                length.append(length[p] + 1)
+                link.append(link[q])
+                trans.append(dict(trans[q]))
+                endpos.append(set(endpos[q]))
+                while p != -1 and trans[p][c] == q:
+                    trans[p][c] = clone
+                    p = link[p]
+                link[q] = clone
+                link[cur] = clone
+        last = cur
+    for state in sorted(range(len(length)), key=lambda x: -length[x]):
+        if link[state] != -1:
+            endpos[link[state]].update(endpos[state])
+
+    occurrences = {}
+    for state in range(len(length)):
+        if length[state] < 21 or len(endpos[state]) < 2:
+            continue
+        for end_pos in endpos[state]:
+            start_pos = end_pos - length[state] + 1
+            occurrences.setdefault(s[start_pos:end_pos + 1], []).append((start_pos, end_pos))
+    removed = set()
+    for intervals in occurrences.values():
+        intervals.sort()
+        for start, end in intervals[1:]:
+            removed.update(range(start, end + 1))
+    return ''.join(c for i, c in enumerate(s) if i not in removed)
+
+
+def _repeat_samples():
+    rng = random.Random(1)
+    samples = [
+        "",
+        "短文本",
+        "再拼接一大段文字，确保里面有超过20字符的重复" * 3,
+        "abc...abc...这里构造一些重复子串...xyz...xyz"
+        "再拼接一大段文字，确保里面有超过20字符的重复"
+        "再拼接一大段文字，确保里面有超过20字符的重复"
+        "...结尾处也可能有重复...",
+        "a" * 100,
+        "ab" * 30 + "c" + "ab" * 30,
+    ]
+    # 小字母表随机串，重复子串相互重叠、嵌套
+    for _ in range(300):
+        alphabet = "ab" if rng.random() < 0.5 else "abc中文"
+        samples.append(''.join(rng.choice(alphabet) for _ in range(rng.randint(20, 300))))
+    # 段落级重复，模拟网页中的导航和模板文字
+    paragraphs = [''.join(rng.choice("的一是了我不人在他有这个上们来到时大地为子中你说生国年着就那和要") for _ in range(rng.randint(5, 60)))
+                  for _ in range(10)]
+    for _ in range(50):
+        samples.append('\n'.join(rng.choice(paragraphs) for _ in range(rng.randint(1, 20))))
+    return samples
+
+
+def test_remove_long_repeated_substrings_matches_reference():
+    """数组实现的后缀自动机、后缀数组引擎与保存出现位置集合的旧实现结果一致"""
+    for text in _repeat_samples():
+        expected = _reference_remove_long_repeated_substrings(text)
+        assert remove_long_repeated_substrings(text) == expected, text
+        assert remove_long_repeated_substrings(text, engine="suffix_array") == expected, text
+
+
+def test_remove_repeat_keeps_first_occurrence():
+    """重复行只保留第一次出现，文档分隔符行总是保留，每行以换行结尾"""
+    text = f"{DOCUMENT_DELIMITER} a\n第一行\n第二行\n第一行\n\n\n{DOCUMENT_DELIMITER} a\n第二行\n最后一行"
+    assert remove_repeat(text) == f"{DOCUMENT_DELIMITER} a\n第一行\n第二行\n\n{DOCUMENT_DELIMITER} a\n最后一行\n"
+    assert remove_repeat("") == ""
+    assert remove_repeat("一行\n") == "一行\n"
+
+
+def test_dedupe_shares_hashes_across_documents():
+    """同一批文档共享哈希集合，后面文档中已出现过的行被去掉"""
+    docs = ["导航 首页 新闻\n正文一", "导航 首页 新闻\n正文二\n正文一"]
+    assert dedupe_documents(docs) == ["导航 首页 新闻\n正文一\n", "正文二\n"]
+
+    deduplicator = LineDeduplicator()
+    remove_repeat(docs[0], deduplicator)
+    assert remove_repeat(docs[1], deduplicator) == "正文二\n"
+    # 不共享时每个文档各自去重
+    assert remove_repeat(docs[1]) == "导航 首页 新闻\n正文二\n正文一\n"
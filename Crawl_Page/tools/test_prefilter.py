@@ -0,0 +1,65 @@
+"""
+测试中文网页字节级预筛
+"""
+import os
+import sys
+import random
+
+# 将 Crawl_Page 目录添加到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.prefilter import count_cjk_chars, count_cjk_lead_bytes, may_be_chinese
+
+SIMPLIFIED = "中文网页的字节级预筛，这是一段用于测试的简体中文文本。" * 4
+TRADITIONAL = "中文網頁的位元組級預篩，這是一段用於測試的繁體中文文本。" * 4
+
+
+def test_count_cjk_chars_requires_continuation_bytes():
+    """只有首字节后跟两个续字节的完整 UTF-8 序列才计数，按首字节计数只是上界"""
+    content = SIMPLIFIED.encode('utf-8')
+    assert count_cjk_chars(content) == count_cjk_lead_bytes(content) == len(SIMPLIFIED) - 8  # 不含标点
+
+    # Latin-1 的 ä/å/é 等字母落在 0xE4-0xE9，但后面跟的不是续字节
+    latin = ("Schöne Grüße aus Köln, hätte, wäre, Café, déjà vu, été. " * 20).encode('latin-1')
+    assert count_cjk_lead_bytes(latin) >= 20
+    assert count_cjk_chars(latin) == 0
+    assert not may_be_chinese(latin, 'text/html; charset=iso-8859-1')
+
+
+def test_may_be_chinese_payloads():
+    """UTF-8 中文放行，二进制和西文拒绝，非 UTF-8 的中文网页凭 meta 声明放行"""
+    html = '<html><head><title>测试</title></head><body>{}</body></html>'
+    assert may_be_chinese(html.format(SIMPLIFIED).encode('utf-8'), 'text/html')
+
+    rng = random.Random(0)
+    binary = bytes(rng.randrange(256) for _ in range(4096))
+    assert count_cjk_lead_bytes(binary) >= 20
+    assert not may_be_chinese(binary, 'application/octet-stream')
+
+    gbk = ('<html><head><meta charset="gbk"></head><body>' + SIMPLIFIED + '</body></html>').encode('gbk')
+    assert count_cjk_chars(gbk) < 20
+    assert may_be_chinese(gbk, 'text/html')
+
+    english = html.format("An English page about nothing in particular. " * 20).encode('utf-8')
+    assert not may_be_chinese(english, 'text/html')
+
+
+def test_may_be_chinese_undeclared_legacy_charsets():
+    """没有任何声明的 GBK 和 Big5 中文网页凭双字节字符放行，西文、其他语言的 UTF-8 和二进制仍拒绝"""
+    html = '<html><head><title>{0}</title></head><body><p>{0}</p></body></html>'
+    for text, charset in ((SIMPLIFIED, 'gbk'), (SIMPLIFIED, 'gb18030'), (TRADITIONAL, 'big5')):
+        content = html.format(text).encode(charset)
+        assert count_cjk_chars(content) < 20
+        assert may_be_chinese(content, 'text/html')
+        assert may_be_chinese(content, None)
+    # 双字节字符不足 min_cjk_chars 的不放行
+    assert not may_be_chinese(html.format("中文").encode('gbk'), 'text/html')
+
+    russian = html.format("Это страница на русском языке, без китайских иероглифов. " * 10).encode('utf-8')
+    assert not may_be_chinese(russian, 'text/html')
+    latin = html.format("Schöne Grüße aus Köln, hätte, wäre, Café, déjà vu, été. " * 20).encode('cp1252')
+    assert not may_be_chinese(latin, 'text/html')
+    rng = random.Random(1)
+    for _ in range(20):
+        binary = bytes(rng.randrange(256) for _ in range(4096))
+        assert not may_be_chinese(binary, 'application/octet-stream')
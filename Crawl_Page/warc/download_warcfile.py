@@ -1,52 +1,216 @@
 import os
+import glob
+import shutil
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 os.environ['http_proxy'] = 'http://127.0.0.1:7890'
 os.environ['https_proxy'] = 'http://127.0.0.1:7890'
 BASE_URL = r'https://data.commoncrawl.org/'
+CHUNK_SIZE = 1024 * 1024
+MIN_PART_SIZE = 16 * 1024 * 1024  # 每个分段的最小字节数，文件太小时不拆分
 
-def download_warcfile(output_dir, download_numbers=1):
+_local = threading.local()
+
+def thread_session():
+    """
+    返回当前线程专用的 requests.Session
+    requests 不保证 Session 线程安全，并行下载的每个线程各用一个，同一线程内的请求复用连接
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+def read_warc_paths(paths_file='./warc.paths', download_numbers=1):
+    """
+    从 warc.paths 文件读取前 download_numbers 个WARC文件的相对路径
+    """
     urls = []
-    downloaded_files = []
-    with open('./warc.paths', 'r') as f:
+    with open(paths_file, 'r') as f:
         for line in f:
             url = line.strip()
-            urls.append(url)
-    for url in urls[:download_numbers]:
+            if url:
+                urls.append(url)
+    return urls[:download_numbers]
+
+def probe_remote_file(session, url):
+    """
+    用 Range: bytes=0-0 探测远程文件
+    :return: (文件总长度, 服务器是否支持Range请求)
+    """
+    with session.get(url, headers={'Range': 'bytes=0-0'}, stream=True) as response:
+        response.raise_for_status()
+        if response.status_code == 206 and 'Content-Range' in response.headers:
+            return int(response.headers['Content-Range'].split('/')[-1]), True
+        return int(response.headers.get('Content-Length', 0)), False
+
+def _part_path(file_path, start, end):
+    return f"{file_path}.part-{start}-{end}"
+
+def plan_parts(file_path, resume_byte_pos, total_size, parts, min_part_size):
+    """
+    把剩余区间 [resume_byte_pos, total_size) 切分为若干分段，返回 [(start, end, part_path), ...]
+    如果磁盘上已有上次留下的分段文件且正好覆盖剩余区间，则沿用上次的切分以便各分段继续续传
+    """
+    existing = []
+    for part_path in glob.glob(glob.escape(file_path) + '.part-*-*'):
+        start, end = part_path.rsplit('.part-', 1)[1].split('-')
+        existing.append((int(start), int(end), part_path))
+    existing.sort()
+    expected_start = resume_byte_pos
+    for start, end, _ in existing:
+        if start != expected_start:
+            break
+        expected_start = end + 1
+    else:
+        if existing and expected_start == total_size:
+            return existing
+    # 切分方式对不上，丢弃旧的分段文件重新切分
+    for _, _, part_path in existing:
+        os.remove(part_path)
+
+    remaining = total_size - resume_byte_pos
+    parts = max(1, min(parts, remaining // min_part_size))
+    part_size = -(-remaining // parts)
+    plan = []
+    for start in range(resume_byte_pos, total_size, part_size):
+        end = min(start + part_size, total_size) - 1
+        plan.append((start, end, _part_path(file_path, start, end)))
+    return plan
+
+def _download_range(url, start, end, part_path, bar):
+    """
+    下载 [start, end] 字节区间到分段文件，已下载的部分按文件大小续传
+    在分段下载线程中执行，使用该线程自己的 Session
+    """
+    session = thread_session()
+    expected = end - start + 1
+    have = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if have > expected:
+        os.remove(part_path)
+        have = 0
+    if have < expected:
+        headers = {'Range': f'bytes={start + have}-{end}'}
+        with session.get(url, headers=headers, stream=True) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise IOError(f"服务器未按Range返回分段内容: {response.status_code}")
+            with open(part_path, 'ab') as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+                        bar.update(len(chunk))
+    size = os.path.getsize(part_path)
+    if size != expected:
+        raise IOError(f"分段 {start}-{end} 长度不符: 期望 {expected}，实际 {size}")
+
+def _download_stream(session, url, file_path, resume_byte_pos, bar):
+    """
+    单连接流式下载，按已下载的文件大小续传
+    """
+    headers = {}
+    if resume_byte_pos > 0:
+        headers['Range'] = f'bytes={resume_byte_pos}-'
+    with session.get(url, headers=headers, stream=True) as response:
+        response.raise_for_status()
+        # 服务器忽略了Range时只能从头下载
+        mode = 'ab' if resume_byte_pos > 0 and response.status_code == 206 else 'wb'
+        if mode == 'wb':
+            bar.reset()
+        with open(file_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if chunk:
+                    f.write(chunk)
+                    bar.update(len(chunk))
+
+def download_file(url, output_dir, parts=4, min_part_size=MIN_PART_SIZE, session=None, position=0):
+    """
+    下载单个文件：大文件拆成多个HTTP Range分段并行下载后按顺序拼接
+    - 续传：已存在的目标文件按大小续传，未下载完的分段文件按各自大小续传
+    - 校验：最终文件长度必须等于 Content-Range 中给出的总长度
+    :param url: 完整的下载地址
+    :param output_dir: 保存目录
+    :param parts: 单个文件的最大并行分段数
+    :param min_part_size: 每个分段的最小字节数
+    :param session: 探测和单连接下载使用的 Session，默认为当前线程的 Session；分段下载线程各用自己的 Session
+    :param position: tqdm 进度条所在行，多个文件同时下载时避免进度条互相覆盖
+    :return: 下载完成的文件路径
+    """
+    session = session or thread_session()
+    file_name = os.path.basename(url)
+    file_path = os.path.join(output_dir, file_name)
+
+    total_size, accept_ranges = probe_remote_file(session, url)
+    resume_byte_pos = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    if not accept_ranges and total_size == 0:
+        # 服务器既不支持Range也不给长度，无法续传和校验，只能整体重新下载
+        with tqdm(unit='B', unit_scale=True, desc=file_name, ascii=True, position=position) as bar:
+            _download_stream(session, url, file_path, 0, bar)
+        return file_path
+    if resume_byte_pos > total_size:
+        # 本地文件比远程还大，说明文件已损坏，重新下载
+        os.remove(file_path)
+        resume_byte_pos = 0
+
+    with tqdm(
+        total=total_size,
+        initial=resume_byte_pos,
+        unit='B',
+        unit_scale=True,
+        desc=file_name,
+        ascii=True,
+        position=position
+    ) as bar:
+        if resume_byte_pos < total_size:
+            if accept_ranges and total_size - resume_byte_pos >= 2 * min_part_size:
+                plan = plan_parts(file_path, resume_byte_pos, total_size, parts, min_part_size)
+                for start, end, part_path in plan:
+                    if os.path.exists(part_path):
+                        bar.update(min(os.path.getsize(part_path), end - start + 1))
+                with ThreadPoolExecutor(max_workers=len(plan)) as pool:
+                    futures = [pool.submit(_download_range, url, start, end, part_path, bar)
+                               for start, end, part_path in plan]
+                    for future in futures:
+                        future.result()
+                # 按顺序拼接，每拼接完一段就删除，中断后可按目标文件大小继续
+                with open(file_path, 'ab') as f:
+                    for _, _, part_path in plan:
+                        with open(part_path, 'rb') as part:
+                            shutil.copyfileobj(part, f, CHUNK_SIZE)
+                        f.flush()
+                        os.remove(part_path)
+            else:
+                _download_stream(session, url, file_path, resume_byte_pos, bar)
+
+    final_size = os.path.getsize(file_path)
+    if final_size != total_size:
+        raise IOError(f"{file_name} 长度校验失败: 期望 {total_size}，实际 {final_size}")
+    return file_path
+
+def download_warcfile(output_dir, download_numbers=1, max_files=2, parts_per_file=4):
+    """
+    并发下载 warc.paths 中的前 download_numbers 个WARC文件
+    :param max_files: 同时下载的文件数
+    :param parts_per_file: 每个文件的并行分段数
+    :return: 下载成功的文件路径列表，顺序与 warc.paths 一致
+    """
+    urls = read_warc_paths('./warc.paths', download_numbers)
+
+    def download(index_url):
+        index, url = index_url
         try:
-            file_name = os.path.basename(url)
-            file_path = os.path.join(output_dir, file_name)
-            # 获取已下载的文件大小
-            resume_byte_pos = 0
-            if os.path.exists(file_path):
-                resume_byte_pos = os.path.getsize(file_path)
-            headers = {}
-            if resume_byte_pos > 0:
-                headers['Range'] = f'bytes={resume_byte_pos}-'
-            # 流式下载
-            with requests.get(BASE_URL + url, headers=headers, stream=True) as response:
-                response.raise_for_status()
-                total_size = int(response.headers.get('Content-Length', 0))
-                # 如果是断点续传，Content-Range 里有总长度
-                if 'Content-Range' in response.headers:
-                    total_size = int(response.headers['Content-Range'].split('/')[-1])
-                mode = 'ab' if resume_byte_pos > 0 else 'wb'
-                with open(file_path, mode) as f, tqdm(
-                    total=total_size,
-                    initial=resume_byte_pos,
-                    unit='B',
-                    unit_scale=True,
-                    desc=file_name,
-                    ascii=True
-                ) as bar:
-                    for chunk in response.iter_content(chunk_size=1024 * 1024):
-                        if chunk:
-                            f.write(chunk)
-                            bar.update(len(chunk))
-            downloaded_files.append(file_path)
+            # 每个下载线程使用自己的 Session（见 thread_session）
+            return download_file(BASE_URL + url, output_dir, parts=parts_per_file,
+                                 position=index % max_files)
         except Exception as e:
             print(f"Error downloading {url}: {e}")
-    return downloaded_files
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_files) as pool:
+        results = list(pool.map(download, enumerate(urls)))
+    return [file_path for file_path in results if file_path]
 
 if __name__ == "__main__":
     output_dir = "./warc_files"
@@ -0,0 +1,91 @@
+"""
+测试分段并行下载
+使用本地HTTP服务模拟 data.commoncrawl.org，验证分段拼接、续传和长度校验
+"""
+import os
+import sys
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 将当前目录添加到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from download_warcfile import download_file, plan_parts
+
+# 本地服务不走代理
+os.environ['no_proxy'] = '127.0.0.1,localhost'
+
+random.seed(0)
+PAYLOAD = bytes(random.getrandbits(8) for _ in range(100000))
+
+
+def make_handler(support_range):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            range_header = self.headers.get('Range')
+            if support_range and range_header:
+                start, end = range_header.split('=')[1].split('-')
+                start = int(start)
+                end = int(end) if end else len(PAYLOAD) - 1
+                body = PAYLOAD[start:end + 1]
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{len(PAYLOAD)}')
+            else:
+                body = PAYLOAD
+                self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+def serve(support_range=True):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(support_range))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/CC-test.warc.gz"
+
+
+def test_parallel_ranged_download(tmp_path):
+    """大文件拆成多个分段并行下载，拼接结果与原文件一致"""
+    server, url = serve()
+    try:
+        path = download_file(url, str(tmp_path), parts=4, min_part_size=10000)
+    finally:
+        server.shutdown()
+    with open(path, 'rb') as f:
+        assert f.read() == PAYLOAD
+    assert not [name for name in os.listdir(tmp_path) if '.part-' in name]
+
+
+def test_resume_from_partial_file_and_parts(tmp_path):
+    """已下载的目标文件和未完成的分段文件都按大小续传"""
+    file_path = os.path.join(tmp_path, 'CC-test.warc.gz')
+    with open(file_path, 'wb') as f:
+        f.write(PAYLOAD[:30000])
+    plan = plan_parts(file_path, 30000, len(PAYLOAD), 4, 10000)
+    start, end, part_path = plan[1]
+    with open(part_path, 'wb') as f:
+        f.write(PAYLOAD[start:start + 100])
+
+    server, url = serve()
+    try:
+        path = download_file(url, str(tmp_path), parts=4, min_part_size=10000)
+    finally:
+        server.shutdown()
+    with open(path, 'rb') as f:
+        assert f.read() == PAYLOAD
+
+
+def test_fallback_without_range_support(tmp_path):
+    """服务器不支持Range时退回单连接下载"""
+    server, url = serve(support_range=False)
+    try:
+        path = download_file(url, str(tmp_path), parts=4, min_part_size=10000)
+    finally:
+        server.shutdown()
+    with open(path, 'rb') as f:
+        assert f.read() == PAYLOAD
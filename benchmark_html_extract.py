@@ -0,0 +1,120 @@
+"""
+HTML正文提取后端性能对比
+在固定的HTML语料上比较各后端每秒处理的网页数，并检查提取结果与 bs4 是否一致
+（一致性按清洗后的文本比较，即与 clean_text 之后进入下游的内容一致）
+
+用法:
+    python benchmark_html_extract.py                     # 使用固定随机种子生成的语料
+    python benchmark_html_extract.py --html-dir ./htmls  # 使用 convert_warc_to_htmls 输出的网页
+"""
+import os
+import re
+import glob
+import time
+import random
+import argparse
+
+from html_extract import get_extractor, available_backends
+
+WORDS_ZH = ["中文", "语料", "清洗", "网页", "数据", "模型", "训练", "质量", "过滤", "文本", "互联网", "新闻"]
+WORDS_EN = ["data", "corpus", "page", "model", "quality", "filter", "text", "news", "web", "crawl"]
+
+
+def _sentence(rng):
+    words = WORDS_ZH if rng.random() < 0.7 else WORDS_EN
+    sep = '' if words is WORDS_ZH else ' '
+    return sep.join(rng.choice(words) for _ in range(rng.randint(5, 30)))
+
+
+def make_page(rng):
+    """
+    生成一个结构接近真实网页的HTML：导航、页眉页脚、脚本样式、注释、实体、未闭合标签等
+    """
+    parts = ['<!DOCTYPE html><html><head><meta charset="utf-8">',
+             f'<title>{_sentence(rng)}</title>',
+             '<style>body{margin:0} .a>p{color:red}</style>',
+             '<script>var data = {"a": "<p>not text</p>"}; if (a < b) {}</script>',
+             '</head><body>',
+             f'<header><h1>{_sentence(rng)}</h1></header>',
+             '<nav><ul>' + ''.join(f'<li><a href="/{i}">{_sentence(rng)}</a>' for i in range(rng.randint(3, 10))) + '</ul></nav>',
+             '<div class="content">']
+    for _ in range(rng.randint(5, 40)):
+        kind = rng.random()
+        if kind < 0.5:
+            parts.append(f'<p>{_sentence(rng)}<b>{_sentence(rng)}</b>{_sentence(rng)}</p>\n')
+        elif kind < 0.6:
+            # 未闭合的段落和换行
+            parts.append(f'<p>{_sentence(rng)}<br>{_sentence(rng)}\n')
+        elif kind < 0.7:
+            parts.append(f'<!-- {_sentence(rng)} -->')
+        elif kind < 0.8:
+            parts.append(f'<span>{_sentence(rng)} &amp; &lt;{_sentence(rng)}&gt; &nbsp;&#x4e2d;&#25991;</span>')
+        elif kind < 0.9:
+            parts.append('<table><tr><td>' + '</td><td>'.join(_sentence(rng) for _ in range(3)) + '</td></tr></table>')
+        else:
+            parts.append(f'<noscript>{_sentence(rng)}</noscript><script>document.write("{_sentence(rng)}")</script>')
+    parts.append(f'</div><footer>{_sentence(rng)} &copy; 2025</footer></body></html>')
+    return ''.join(parts)
+
+
+def make_corpus(n=500, seed=0):
+    rng = random.Random(seed)
+    return [make_page(rng) for _ in range(n)]
+
+
+def load_corpus(html_dir, limit=None):
+    paths = sorted(glob.glob(os.path.join(glob.escape(html_dir), '*.html')))[:limit]
+    corpus = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            corpus.append(f.read().decode('utf-8', errors='ignore'))
+    return corpus
+
+
+def normalize(text):
+    # 与下游清洗一致：空白字符统一为单个空格
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def benchmark(corpus, backends, repeat=3):
+    """
+    对每个后端重复 repeat 轮取最快一轮的耗时
+    :return: {backend: {"pages_per_sec", "mismatch"}}
+    """
+    reference = [normalize(text) for text in map(get_extractor("bs4", separator=' ').extract, corpus)]
+    results = {}
+    for backend in backends:
+        extractor = get_extractor(backend, separator=' ')
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            texts = [extractor.extract(html) for html in corpus]
+            best = min(best, time.perf_counter() - start)
+        mismatch = sum(1 for text, ref in zip(texts, reference) if normalize(text) != ref)
+        results[backend] = {"pages_per_sec": len(corpus) / best, "mismatch": mismatch}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML正文提取后端性能对比")
+    parser.add_argument("--html-dir", type=str, default=None, help="HTML文件目录，不指定则使用生成的固定语料")
+    parser.add_argument("--pages", type=int, default=500, help="网页数量")
+    parser.add_argument("--repeat", type=int, default=3, help="重复轮数")
+    args = parser.parse_args()
+
+    if args.html_dir:
+        corpus = load_corpus(args.html_dir, args.pages)
+    else:
+        corpus = make_corpus(args.pages)
+    total_mb = sum(len(html.encode('utf-8')) for html in corpus) / 1024 / 1024
+    print(f"语料: {len(corpus)} 个网页, {total_mb:.1f} MB")
+
+    results = benchmark(corpus, available_backends(), args.repeat)
+    baseline = results["bs4"]["pages_per_sec"]
+    for backend, result in results.items():
+        print(f"{backend:>10}: {result['pages_per_sec']:8.1f} 页/秒  "
+              f"加速 {result['pages_per_sec'] / baseline:5.1f}x  与bs4不一致 {result['mismatch']} 页")
+
+
+if __name__ == "__main__":
+    main()
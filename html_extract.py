@@ -0,0 +1,155 @@
+"""
+HTML正文提取
+提供可替换的提取后端，统一接口为 extract(html) -> str：
+- bs4: BeautifulSoup + html.parser，纯Python，结果作为基准
+- lxml: libxml2 解析，C实现
+- selectolax: lexbor 解析，C实现，通常最快
+三个后端都会去掉 DROP_TAGS 中的元素（保留其后的尾随文本），按 separator 拼接剩余的文本节点，
+注释、文档类型声明和处理指令不计入正文。不同解析器对残缺HTML的容错方式不同，
+结果在空白归一化后与 bs4 一致（见 Crawl_Page/tools/test_clear_redundancy.py）
+
+默认后端按 selectolax > lxml > bs4 的顺序选择已安装的第一个，也可以用环境变量 HTML_EXTRACTOR 指定
+"""
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    try:
+        # selectolax 1.0 之前的版本没有 lexbor 后端
+        from selectolax.parser import HTMLParser as LexborHTMLParser
+    except ImportError:
+        LexborHTMLParser = None
+
+# 提取正文时整个去掉的元素
+DROP_TAGS = ("script", "style", "meta", "noscript", "header", "footer", "nav")
+
+
+class HTMLExtractor(ABC):
+    """
+    提取后端基类
+    """
+    name = "base"
+
+    def __init__(self, drop_tags: Iterable[str] = DROP_TAGS, separator: str = ''):
+        """
+        初始化
+        Args:
+            drop_tags: 需要连同内容一起去掉的元素
+            separator: 文本节点之间的分隔符
+        """
+        self.drop_tags = tuple(drop_tags)
+        self.separator = separator
+
+    @abstractmethod
+    def extract(self, html: str) -> str:
+        """
+        从 HTML 中提取正文文本
+        Args:
+            html: HTML 字符串
+        Returns:
+            str: 正文文本
+        """
+
+
+class BeautifulSoupExtractor(HTMLExtractor):
+    name = "bs4"
+
+    def extract(self, html: str) -> str:
+        soup = BeautifulSoup(html, "html.parser")
+        for element in soup(list(self.drop_tags)):
+            element.extract()
+        return soup.get_text(separator=self.separator)
+
+
+class LxmlExtractor(HTMLExtractor):
+    name = "lxml"
+
+    def __init__(self, drop_tags: Iterable[str] = DROP_TAGS, separator: str = ''):
+        super().__init__(drop_tags, separator)
+        # 统一按UTF-8字节输入，避免带 <?xml encoding=...?> 声明的字符串被 lxml 拒绝
+        self.parser = lxml.html.HTMLParser(encoding='utf-8')
+
+    def extract(self, html: str) -> str:
+        try:
+            root = lxml.html.document_fromstring(html.encode('utf-8', errors='ignore'), parser=self.parser)
+        except etree.ParserError:
+            # 空文档或只有注释，没有正文
+            return ''
+        for element in list(root.iter(*self.drop_tags)):
+            # drop_tree 会把元素的尾随文本并入前一个节点
+            element.drop_tree()
+        return self.separator.join(root.itertext())
+
+
+class SelectolaxExtractor(HTMLExtractor):
+    name = "selectolax"
+
+    def extract(self, html: str) -> str:
+        tree = LexborHTMLParser(html)
+        tree.strip_tags(list(self.drop_tags))
+        if tree.root is None:
+            return ''
+        return tree.root.text(deep=True, separator=self.separator)
+
+
+EXTRACTORS = {
+    "bs4": BeautifulSoupExtractor,
+    "lxml": LxmlExtractor,
+    "selectolax": SelectolaxExtractor,
+}
+
+
+def available_backends():
+    """
+    返回当前环境中可用的后端名称，按速度从快到慢排列
+    """
+    backends = []
+    if LexborHTMLParser is not None:
+        backends.append("selectolax")
+    if lxml is not None:
+        backends.append("lxml")
+    backends.append("bs4")
+    return backends
+
+
+def get_extractor(backend: Optional[str] = None, drop_tags: Iterable[str] = DROP_TAGS,
+                  separator: str = '') -> HTMLExtractor:
+    """
+    创建提取器
+    Args:
+        backend: 后端名称，None 时取环境变量 HTML_EXTRACTOR，仍未指定则用最快的可用后端
+        drop_tags: 需要连同内容一起去掉的元素
+        separator: 文本节点之间的分隔符
+    Returns:
+        提取器实例
+    """
+    backend = backend or os.environ.get("HTML_EXTRACTOR") or available_backends()[0]
+    if backend not in EXTRACTORS:
+        raise ValueError(f"未知的HTML提取后端: {backend}，可选: {list(EXTRACTORS)}")
+    if backend not in available_backends():
+        raise ImportError(f"HTML提取后端 {backend} 未安装: pip install {backend}")
+    return EXTRACTORS[backend](drop_tags=drop_tags, separator=separator)
+
+
+_default_extractors: Dict[tuple, HTMLExtractor] = {}
+
+
+def extract_text(html: str, separator: str = '', backend: Optional[str] = None) -> str:
+    """
+    用默认配置提取正文，同一配置的提取器只创建一次
+    """
+    key = (backend, separator)
+    if key not in _default_extractors:
+        _default_extractors[key] = get_extractor(backend, separator=separator)
+    return _default_extractors[key].extract(html)
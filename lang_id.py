@@ -0,0 +1,126 @@
+"""
+fastText 语言识别的批量接口
+- 一次把一批文本交给 model.predict(list) 做预测，避免每个文档单独调用一次
+- 可选只取每个文档中均匀分布的若干段字符做预测，识别开销不再随网页长度增长
+- 模型登记表：第一次用到时才加载，每个进程每个模型文件只加载一次；
+  在创建进程池之前调用 preload_model，fork 出的子进程直接共享父进程中已加载的模型（写时复制）
+模型路径按以下顺序确定：调用时传入的路径、环境变量 FASTTEXT_LID_MODEL、
+在当前目录、项目根目录和 Crawl_Page/tools 中查找 lid.176.bin 或压缩版 lid.176.ftz
+"""
+import os
+import threading
+from typing import Dict, List, Optional
+
+# 默认每个文档最多取的字符数和分段数
+DEFAULT_MAX_CHARS = 2000
+DEFAULT_WINDOWS = 4
+
+MODEL_PATH_ENV = "FASTTEXT_LID_MODEL"
+MODEL_FILES = ("lid.176.bin", "lid.176.ftz")
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIRS = (".", _BASE_DIR, os.path.join(_BASE_DIR, "Crawl_Page", "tools"))
+
+_models: Dict[str, object] = {}
+_models_lock = threading.Lock()
+
+
+def resolve_model_path(path: Optional[str] = None) -> str:
+    """
+    确定语言识别模型文件路径
+    """
+    path = path or os.environ.get(MODEL_PATH_ENV)
+    if path:
+        return path
+    for directory in MODEL_DIRS:
+        for name in MODEL_FILES:
+            candidate = os.path.join(directory, name)
+            if os.path.exists(candidate):
+                return os.path.abspath(candidate)
+    raise FileNotFoundError(f"找不到语言识别模型 {' / '.join(MODEL_FILES)}，"
+                            f"请放到 {MODEL_DIRS} 之一或用环境变量 {MODEL_PATH_ENV} 指定")
+
+
+def get_model(path: Optional[str] = None):
+    """
+    返回已加载的 fastText 模型，第一次调用时加载，同一进程内同一个文件只加载一次
+    Args:
+        path: 模型文件路径（.bin 或 .ftz），None 时见 resolve_model_path
+    """
+    path = resolve_model_path(path)
+    model = _models.get(path)
+    if model is None:
+        with _models_lock:
+            model = _models.get(path)
+            if model is None:
+                import fasttext
+                model = fasttext.load_model(path)
+                _models[path] = model
+    return model
+
+
+def preload_model(path: Optional[str] = None):
+    """
+    在 fork 子进程之前加载模型，子进程与父进程共享同一份模型内存
+    """
+    return get_model(path)
+
+
+def sample_text(text: str, max_chars: Optional[int] = DEFAULT_MAX_CHARS, windows: int = DEFAULT_WINDOWS) -> str:
+    """
+    从文本中均匀取 windows 段字符，段之间用空格连接，连同空格总长不超过 max_chars
+    文本不超过 max_chars 时原样返回
+    Args:
+        text: 输入文本
+        max_chars: 最多保留的字符数，None 表示不截取
+        windows: 分段数
+    Returns:
+        采样后的文本
+    """
+    if max_chars is None or len(text) <= max_chars:
+        return text
+    # 每段至少一个字符，段之间的空格也计入 max_chars
+    windows = max(1, min(windows, (max_chars + 1) // 2))
+    size = (max_chars - (windows - 1)) // windows
+    if windows == 1:
+        return text[:size]
+    # 第一段从开头开始，最后一段到结尾为止，中间各段等距分布
+    step = (len(text) - size) / (windows - 1)
+    return ' '.join(text[round(i * step):round(i * step) + size] for i in range(windows))
+
+
+def predict_languages(model, texts: List[str], max_chars: Optional[int] = DEFAULT_MAX_CHARS,
+                      windows: int = DEFAULT_WINDOWS):
+    """
+    批量预测语言
+    Args:
+        model: fastText 模型
+        texts: 文本列表
+        max_chars: 每个文本最多参与预测的字符数，None 表示使用全文
+        windows: 采样分段数
+    Returns:
+        [(标签, 置信度), ...]，与 texts 一一对应，空文本为 (None, 0.0)
+    """
+    results = [(None, 0.0)] * len(texts)
+    # fastText 按行预测，文本中不能含换行；空文本不参与预测
+    batch = []
+    for i, text in enumerate(texts):
+        sample = sample_text(text, max_chars, windows).replace('\n', ' ')
+        if sample.strip():
+            batch.append((i, sample))
+    if not batch:
+        return results
+    labels, probs = model.predict([sample for _, sample in batch], k=1)
+    for (i, _), label, prob in zip(batch, labels, probs):
+        results[i] = (label[0] if len(label) else None, float(prob[0]) if len(prob) else 0.0)
+    return results
+
+
+def predict_chinese(model, texts: List[str], threshold: float = 0.7, max_chars: Optional[int] = DEFAULT_MAX_CHARS,
+                    windows: int = DEFAULT_WINDOWS) -> List[bool]:
+    """
+    批量判断文本是否为中文
+    Returns:
+        布尔列表，与 texts 一一对应
+    """
+    return [label == '__label__zh' and confidence >= threshold
+            for label, confidence in predict_languages(model, texts, max_chars, windows)]
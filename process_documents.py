@@ -17,6 +17,10 @@ from typing import List, Dict, Optional
 # 导入文本质量过滤器
 from text_quality_filter.main import TextQualityFilter
 
+# 导入语料级去重
+from text_quality_filter.utils.minhash_dedup import dedup_corpus
+from text_quality_filter.config.config import DEDUP_CONFIG
+
 # 导入向量化相关功能
 from embed import create_vector_index
 
@@ -77,6 +81,16 @@ def process_documents(args):
         print(f"向量化嵌入完成，索引保存在：{vector_index.index_dir}")
 
 
+def dedup_documents(args):
+    """语料级去重：MinHash LSH 检测完全重复和近似重复的文档"""
+    config = dict(DEDUP_CONFIG)
+    for key in ("db_path", "threshold", "num_perm", "bands", "shingle_size"):
+        value = getattr(args, key)
+        if value is not None:
+            config[key] = value
+    return dedup_corpus(args.input_dir, args.output_dir, config, args.file_pattern)
+
+
 def train_models(args):
     """训练模型"""
     from text_quality_filter.main import train_models as train
@@ -112,6 +126,17 @@ def main():
     filter_parser.add_argument("--output_dir", type=str, default="filtered_quality", help="输出目录")
     filter_parser.add_argument("--file_pattern", type=str, default="*.txt", help="文件匹配模式")
     
+    # 语料级去重命令
+    dedup_parser = subparsers.add_parser("dedup", help="语料级去重（MinHash LSH）")
+    dedup_parser.add_argument("--input_dir", type=str, default="chinese_docs", help="输入目录")
+    dedup_parser.add_argument("--output_dir", type=str, default="deduped_docs", help="输出目录")
+    dedup_parser.add_argument("--file_pattern", type=str, default="*.txt", help="文件匹配模式")
+    dedup_parser.add_argument("--db_path", type=str, default=None, help="索引数据库路径，可跨多次运行累积")
+    dedup_parser.add_argument("--threshold", type=float, default=None, help="近似重复的 Jaccard 相似度阈值")
+    dedup_parser.add_argument("--num_perm", type=int, default=None, help="MinHash 签名长度")
+    dedup_parser.add_argument("--bands", type=int, default=None, help="LSH 分段数")
+    dedup_parser.add_argument("--shingle_size", type=int, default=None, help="字符 shingle 长度")
+    
     # 训练模型命令
     train_parser = subparsers.add_parser("train", help="训练模型")
     train_parser.add_argument("--train_dir", type=str, required=True, help="训练数据目录")
@@ -143,6 +168,10 @@ def main():
         filter = TextQualityFilter()
         filter.batch_process(args.input_dir, args.output_dir, args.file_pattern)
     
+    elif args.command == "dedup":
+        # 语料级去重
+        dedup_documents(args)
+    
     elif args.command == "train":
         # 训练模型
         train_models(args)
@@ -0,0 +1,183 @@
+"""
+分片文档存储
+把大量小文档打包成有大小上限的分片文件，配合偏移索引随机读取，避免每个文档一个文件
+- 分片文件: shard-00000.jsonl.zst（安装了 zstandard 时）或 shard-00000.jsonl.gz
+  每个文档是一行JSON，单独压缩为一个 zstd 帧 / gzip 成员后首尾相接，整个文件仍是合法的压缩流
+- 索引文件: shard-00000.jsonl.zst.idx，每行 "doc_id \t offset \t length"，可直接 seek 读取单个文档
+"""
+import os
+import io
+import glob
+import gzip
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SHARD_EXTENSIONS = ('.jsonl.zst', '.jsonl.gz')
+INDEX_SUFFIX = '.idx'
+
+
+def _compress(data: bytes, extension: str) -> bytes:
+    if extension == '.jsonl.zst':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes, extension: str) -> bytes:
+    if extension == '.jsonl.zst':
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _shard_extension(path: str) -> str:
+    for extension in SHARD_EXTENSIONS:
+        if path.endswith(extension):
+            return extension
+    raise ValueError(f"不是分片文件: {path}")
+
+
+class ShardWriter:
+    """
+    分片写出器，单个分片超过 max_shard_bytes 后自动切换到下一个分片
+    """
+
+    def __init__(self, output_dir: str, prefix: str = "shard", max_shard_bytes: int = 256 * 1024 * 1024,
+                 compression: Optional[str] = None):
+        """
+        初始化
+        Args:
+            output_dir: 输出目录
+            prefix: 分片文件名前缀
+            max_shard_bytes: 单个分片的最大字节数（压缩后）
+            compression: "zst" 或 "gz"，默认安装了 zstandard 时用 zst，否则用 gz
+        """
+        if compression is None:
+            compression = "zst" if zstandard is not None else "gz"
+        if compression == "zst" and zstandard is None:
+            raise ImportError("使用 zst 压缩需要安装 zstandard: pip install zstandard")
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.max_shard_bytes = max_shard_bytes
+        self.extension = f".jsonl.{compression}"
+        self.shard_id = self._next_shard_id()
+        self.shard_paths: List[str] = []
+        self.doc_count = 0
+        self.f = None
+        self.index_f = None
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _next_shard_id(self) -> int:
+        # 目录中已有同前缀分片时从最大编号之后接着编号，中间缺号时也不覆盖
+        pattern = os.path.join(glob.escape(self.output_dir), f"{glob.escape(self.prefix)}-*{self.extension}")
+        ids = []
+        for path in glob.glob(pattern):
+            suffix = os.path.basename(path)[len(self.prefix) + 1:-len(self.extension)]
+            if suffix.isdigit():
+                ids.append(int(suffix))
+        return max(ids) + 1 if ids else 0
+
+    def _open_shard(self):
+        path = os.path.join(self.output_dir, f"{self.prefix}-{self.shard_id:05d}{self.extension}")
+        self.f = open(path, 'wb')
+        self.index_f = open(path + INDEX_SUFFIX, 'w', encoding='utf-8')
+        self.shard_paths.append(path)
+        self.shard_id += 1
+
+    def _close_shard(self):
+        if self.f is not None:
+            self.f.close()
+            self.index_f.close()
+            self.f = None
+            self.index_f = None
+
+    def write(self, doc: Dict) -> None:
+        """
+        写入一个文档
+        Args:
+            doc: 文档字典，必须包含 "id" 字段
+        """
+        if self.f is None:
+            self._open_shard()
+        data = _compress((json.dumps(doc, ensure_ascii=False) + '\n').encode('utf-8'), self.extension)
+        offset = self.f.tell()
+        self.f.write(data)
+        doc_id = str(doc["id"]).replace('\t', ' ').replace('\n', ' ')
+        self.index_f.write(f"{doc_id}\t{offset}\t{len(data)}\n")
+        self.doc_count += 1
+        if self.f.tell() >= self.max_shard_bytes:
+            self._close_shard()
+
+    def flush(self) -> None:
+        """
+        把已写入的文档刷到文件中，进程被杀掉时不丢失缓冲区中的文档
+        """
+        if self.f is not None:
+            self.f.flush()
+            self.index_f.flush()
+
+    def close(self) -> None:
+        self._close_shard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def list_shards(input_dir: str) -> List[str]:
+    """
+    列出目录中的全部分片文件，按文件名排序
+    """
+    shards = []
+    for extension in SHARD_EXTENSIONS:
+        shards.extend(glob.glob(os.path.join(glob.escape(input_dir), f"*{extension}")))
+    return sorted(shards)
+
+
+def read_shard_index(shard_path: str) -> Iterator[Tuple[str, int, int]]:
+    """
+    读取分片索引，返回 (doc_id, offset, length) 迭代器
+    """
+    with open(shard_path + INDEX_SUFFIX, 'r', encoding='utf-8') as f:
+        for line in f:
+            doc_id, offset, length = line.rstrip('\n').rsplit('\t', 2)
+            yield doc_id, int(offset), int(length)
+
+
+def read_doc(shard_path: str, offset: int, length: int) -> Dict:
+    """
+    按索引中的偏移随机读取单个文档
+    """
+    with open(shard_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(length)
+    return json.loads(_decompress(data, _shard_extension(shard_path)))
+
+
+def iter_shard(shard_path: str) -> Iterator[Dict]:
+    """
+    顺序读取分片中的全部文档，整个分片只打开一次
+    """
+    extension = _shard_extension(shard_path)
+    with open(shard_path, 'rb') as raw:
+        if extension == '.jsonl.zst':
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        else:
+            stream = gzip.GzipFile(fileobj=raw)
+        with io.TextIOWrapper(stream, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def iter_shard_docs(input_dir: str) -> Iterator[Dict]:
+    """
+    顺序读取目录中所有分片的全部文档
+    """
+    for shard_path in list_shards(input_dir):
+        yield from iter_shard(shard_path)
@@ -0,0 +1,78 @@
+"""
+测试 fastText 语言识别的批量接口
+语言识别模型换成按汉字比例判定的假模型，不需要 fastText
+"""
+import random
+
+import lang_id
+from lang_id import sample_text, predict_chinese
+from tool import is_chinese_fasttext_batch
+
+CHINESE = "这是一段用于测试语言识别批量接口的中文文本。"
+ENGLISH = "This is an English sentence for the language identification test. "
+
+
+class FakeModel:
+    """汉字占比超过三成判为中文，并记录每次收到的样本"""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, texts, k=1):
+        self.batches.append(list(texts))
+        labels, probs = [], []
+        for text in texts:
+            cjk = sum(1 for char in text if '一' <= char <= '鿿')
+            labels.append(['__label__zh' if cjk > 0.3 * len(text) else '__label__en'])
+            probs.append([0.9])
+        return labels, probs
+
+
+def test_sample_text_within_max_chars():
+    """采样结果连同段间空格不超过 max_chars，首段从开头取，末段取到结尾"""
+    text = ''.join(chr(ord('a') + i % 26) for i in range(5000))
+    for max_chars in (1, 2, 3, 10, 99, 2000, 4999):
+        for windows in (1, 2, 4, 7):
+            sample = sample_text(text, max_chars, windows)
+            assert 0 < len(sample) <= max_chars
+            assert text.startswith(sample.split(' ')[0])
+            if windows > 1 and max_chars >= 3:
+                assert text.endswith(sample.split(' ')[-1])
+    assert sample_text(text[:100], 2000) == text[:100]
+    assert sample_text(text, None) == text
+
+
+def test_predict_chinese_keeps_order_and_skips_empty():
+    """分批预测的结果与输入顺序一致，空文本判为非中文且不交给模型，样本不含换行且不超过 max_chars"""
+    rng = random.Random(0)
+    texts, expected = [], []
+    for i in range(40):
+        kind = rng.choice(["zh", "en", "empty", "blank"])
+        if kind == "zh":
+            texts.append((CHINESE + "\n") * rng.randrange(1, 200))
+        elif kind == "en":
+            texts.append((ENGLISH + "\n") * rng.randrange(1, 100))
+        else:
+            texts.append("" if kind == "empty" else " \n\t ")
+        expected.append(kind == "zh")
+
+    model = FakeModel()
+    results = []
+    for start in range(0, len(texts), 7):
+        results.extend(predict_chinese(model, texts[start:start + 7], max_chars=500))
+    assert results == expected
+
+    samples = [sample for batch in model.batches for sample in batch]
+    assert len(samples) == sum(1 for text in texts if text.strip())
+    assert all(sample.strip() and '\n' not in sample and len(sample) <= 500 for sample in samples)
+    assert predict_chinese(model, ["", "  "]) == [False, False]
+    assert predict_chinese(model, []) == []
+
+
+def test_tool_batch_maps_results_back_to_input_positions(monkeypatch, tmp_path):
+    """过短的文本不参与预测，其余结果按原位置写回"""
+    path = str(tmp_path / "fake.ftz")
+    monkeypatch.setenv(lang_id.MODEL_PATH_ENV, path)
+    monkeypatch.setitem(lang_id._models, path, FakeModel())
+    texts = [CHINESE * 3, "短", ENGLISH * 3, "", CHINESE, None, ENGLISH]
+    assert is_chinese_fasttext_batch(texts) == [True, False, False, False, True, False, False]
@@ -0,0 +1,48 @@
+"""
+测试分片文档存储：写出、按索引随机读取、顺序读取，以及重新打开后接着编号
+"""
+import os
+import re
+
+import pytest
+
+from shard_store import ShardWriter, list_shards, read_shard_index, read_doc, iter_shard, zstandard
+
+
+def _shard_ids(paths):
+    return [int(re.search(r'-(\d+)\.jsonl', os.path.basename(path)).group(1)) for path in paths]
+
+
+@pytest.mark.parametrize("compression", ["gz", "zst"])
+def test_round_trip_and_reopen(tmp_path, compression):
+    """按索引偏移读取和顺序读取得到写入的文档；重新打开写出器时分片编号接着增长，不覆盖已有分片"""
+    if compression == "zst" and zstandard is None:
+        pytest.skip("没有安装 zstandard")
+    docs = [{"id": f"doc{i}", "text": f"第{i}个文档，" * (i % 7 + 1)} for i in range(60)]
+
+    with ShardWriter(str(tmp_path), max_shard_bytes=400, compression=compression) as writer:
+        for doc in docs[:30]:
+            writer.write(doc)
+    first_paths = writer.shard_paths
+    assert len(first_paths) > 2
+
+    # 删掉中间一个分片，重新打开后仍从最大编号之后接着写
+    removed = {doc_id for doc_id, _, _ in read_shard_index(first_paths[1])}
+    os.remove(first_paths[1])
+    os.remove(first_paths[1] + ".idx")
+    with ShardWriter(str(tmp_path), max_shard_bytes=400, compression=compression) as writer:
+        for doc in docs[30:]:
+            writer.write(doc)
+    assert min(_shard_ids(writer.shard_paths)) == max(_shard_ids(first_paths)) + 1
+
+    shards = list_shards(str(tmp_path))
+    ids = _shard_ids(shards)
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    read_back = []
+    for shard in shards:
+        indexed = [read_doc(shard, offset, length) for _, offset, length in read_shard_index(shard)]
+        assert [doc["id"] for doc in indexed] == [doc_id for doc_id, _, _ in read_shard_index(shard)]
+        assert list(iter_shard(shard)) == indexed
+        read_back.extend(indexed)
+    # 除了删掉的分片，其余文档都按写入顺序读回
+    assert read_back == [doc for doc in docs if doc["id"] not in removed]
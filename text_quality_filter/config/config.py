@@ -24,6 +24,7 @@ FEATURE_WORDS_CONFIG = {
     "feature_words_path": os.path.join(BASE_DIR, "data", "all_sensitive_words.txt"),  # 使用绝对路径
     "max_feature_words_per_line": 0.2,  # 每行最大特征词数量
     "use_dfa_filter": True,  # 是否使用DFA过滤器
+    "ac_cache_path": os.path.join(BASE_DIR, "data", "all_sensitive_words.ac"),  # 特征词自动机的保存路径，DFA 和 AC 两种方式分别保存为 xxx.dfa.ac / xxx.ac.ac，None 不保存
 }
 
 # 困惑度配置
@@ -43,6 +44,17 @@ CLUSTERING_CONFIG = {
     "max_outlier_distance": 0.8,  # 最大离群点距离
 }
 
+# 语料级去重配置（MinHash LSH）
+DEDUP_CONFIG = {
+    "db_path": os.path.join(BASE_DIR, "output", "minhash_dedup.sqlite"),  # 索引数据库路径
+    "num_perm": 128,  # MinHash 签名长度
+    "bands": 16,  # LSH 分段数，每段 num_perm / bands 行
+    "shingle_size": 5,  # 字符 shingle 长度
+    "threshold": 0.8,  # 估计 Jaccard 相似度不低于该值判为近似重复
+    "seed": 42,  # 排列哈希的随机种子，同一个索引必须保持不变
+    "commit_every": 10000,  # 每处理多少个文档提交一次
+}
+
 # 总体配置
 GENERAL_CONFIG = {
     "enable_rule_filter": True,  # 启用规则过滤
@@ -51,6 +63,9 @@ GENERAL_CONFIG = {
     "enable_clustering": False,  # 启用文本聚类
     "output_dir": os.path.join(BASE_DIR, "output"),  # 使用绝对路径
     "quality_threshold": 0.8,  # 质量阈值
+    # 过滤模式："cascade" 按开销从小到大运行各组件，确定达不到阈值时提前退出；"full" 运行全部组件（用于审计）
+    "filter_mode": "cascade",
+    "cascade_order": ["rule_score", "feature_score", "clustering_score", "perplexity_score"],
     # 各组件的权重
     "component_weights": {
         "rule_score": 0.3,      # 规则过滤分数权重
@@ -66,5 +81,6 @@ CONFIG = {
     "feature_words": FEATURE_WORDS_CONFIG,
     "perplexity": PERPLEXITY_CONFIG,
     "clustering": CLUSTERING_CONFIG,
+    "dedup": DEDUP_CONFIG,
     "general": GENERAL_CONFIG,
 } 
\ No newline at end of file
@@ -13,8 +13,9 @@ from typing import Dict, List, Tuple
 # 导入质量过滤模块
 from text_quality_filter.utils.rule_filter import RuleFilter
 from text_quality_filter.utils.feature_words import FeatureWordsDetector
-from text_quality_filter.utils.clustering import TextClustering, build_corpus_clustering
 from text_quality_filter.utils.sensitive_filter import DFAFilter
+from text_quality_filter.utils.aho_corasick import cache_path_for
+from shard_store import ShardWriter, list_shards, iter_shard
 from text_quality_filter.config.config import (
     RULE_FILTER_CONFIG, 
     FEATURE_WORDS_CONFIG, 
@@ -24,6 +25,9 @@ from text_quality_filter.config.config import (
     BASE_DIR
 )
 
+# 级联模式下各组件的默认运行顺序，从开销小到开销大
+CASCADE_ORDER = ["rule_score", "feature_score", "clustering_score", "perplexity_score"]
+
 
 class TextQualityFilter:
     """文本质量过滤类，集成多种过滤方法"""
@@ -39,6 +43,9 @@ class TextQualityFilter:
         if config:
             self.config.update(config)
         
+        # 各组件的运行和提前拒绝计数（见 filter_text 的级联模式）
+        self.stage_stats = self._new_stage_stats()
+        
         # 初始化各组件
         self.rule_filter = RuleFilter(RULE_FILTER_CONFIG)
         print(f"初始化特征词检测器，使用特征词文件: {FEATURE_WORDS_CONFIG['feature_words_path']}")
@@ -59,8 +66,9 @@ class TextQualityFilter:
             sensitive_words_path = os.path.join(BASE_DIR, "data", "sensitive_words.txt")
             ad_words_path = os.path.join(BASE_DIR, "data", "ad_words.txt")
             
-            # 初始化DFA过滤器
-            self.feature_detector.feature_filter = DFAFilter()
+            # 初始化DFA过滤器，词表与全量特征词表不同，自动机单独保存
+            self.feature_detector.feature_filter = DFAFilter(
+                cache_path=cache_path_for(FEATURE_WORDS_CONFIG.get("ac_cache_path"), "sensitive"))
             
             # 加载敏感词和广告词
             if os.path.exists(sensitive_words_path):
@@ -71,6 +79,12 @@ class TextQualityFilter:
                 print(f"加载广告词文件: {ad_words_path}")
                 self.feature_detector.feature_filter.parse_file(ad_words_path)
         
+        # 屏蔽敏感内容用的DFA过滤器：特征词检测器使用AC自动机时没有 feature_filter，另建一个，只初始化一次
+        if self.feature_detector.feature_filter is not None:
+            self.sensitive_filter = self.feature_detector.feature_filter
+        else:
+            self.sensitive_filter = self._load_sensitive_filter()
+        
         # 初始化困惑度计算器
         if self.config["enable_perplexity"]:
             if PERPLEXITY_CONFIG.get("use_external_library", False):
@@ -95,7 +109,16 @@ class TextQualityFilter:
                 os.path.dirname(PERPLEXITY_CONFIG["model_path"]), 
                 "clustering.bin"
             )
-            if os.path.exists(clustering_model_path):
+            try:
+                # 聚类依赖 sklearn 和 torch，只在启用时导入
+                from text_quality_filter.utils.clustering import TextClustering
+            except ImportError as e:
+                print(f"警告：缺少依赖库，无法使用文本聚类: {e}")
+                print("请安装所需依赖: pip install scikit-learn torch transformers")
+                TextClustering = None
+            if TextClustering is None:
+                self.text_clustering = None
+            elif os.path.exists(clustering_model_path):
                 try:
                     self.text_clustering = TextClustering.load(clustering_model_path, CLUSTERING_CONFIG)
                     print(f"成功加载聚类模型: {clustering_model_path}")
@@ -132,22 +155,87 @@ class TextQualityFilter:
             traceback.print_exc()
             return False, {"error": str(e)}
     
-    def filter_text(self, text: str) -> Tuple[bool, Dict]:
+    def filter_text(self, text: str, mode: str = None) -> Tuple[bool, Dict]:
         """
         对文本进行质量过滤
         Args:
             text: 输入文本
-            
+            mode: "cascade" 级联模式：按 cascade_order 从开销小到开销大依次运行各组件，
+                  其余组件即使都得满分也无法让综合得分达到 quality_threshold 时提前判为低质量，
+                  此时没有真实的综合得分，quality_score 为 None，quality_score_upper_bound 为综合得分的上界，
+                  在哪个组件之后退出、跳过了哪些组件记在 cascade 字段中；
+                  "full" 完整模式：运行全部启用的组件，用于审计；None 时使用配置中的 filter_mode
+        
         Returns:
             (是否为高质量文本, 详细评估结果)
         """
+        mode = mode or self.config.get("filter_mode", "full")
+        stages = self._enabled_stages()
+        if mode == "cascade":
+            order = self.config.get("cascade_order", CASCADE_ORDER)
+            stages.sort(key=lambda stage: order.index(stage) if stage in order else len(order))
+        
         results = {}
         scores = {}
+        threshold = self.config["quality_threshold"]
+        cascade = None
+        for i, stage in enumerate(stages):
+            self._run_stage(stage, text, results, scores)
+            self.stage_stats["ran"][stage] += 1
+            if mode != "cascade" or i == len(stages) - 1:
+                continue
+            # 剩余组件都按满分计算的综合得分上界，留出浮点误差的余量
+            remaining = stages[i + 1:]
+            upper_bound = self._calculate_quality_score(scores, assume_perfect=remaining)
+            if upper_bound < threshold - 1e-9:
+                self.stage_stats["rejected_after"][stage] += 1
+                cascade = {"stopped_after": stage, "skipped": remaining}
+                break
+        self.stage_stats["documents"] += 1
         
-        # 基础规则过滤
+        # 计算综合质量得分，提前退出时只有上界
+        if cascade is None:
+            quality_score = self._calculate_quality_score(scores)
+            is_high_quality = quality_score >= threshold
+        else:
+            quality_score = None
+            is_high_quality = False
+        
+        # 返回综合结果
+        report = {
+            "quality_score": quality_score,
+            "is_high_quality": is_high_quality,
+            "component_results": results,
+            "component_scores": scores
+        }
+        if cascade is not None:
+            report["quality_score_upper_bound"] = upper_bound
+            report["cascade"] = cascade
+        return is_high_quality, report
+    
+    def _enabled_stages(self) -> List[str]:
+        """
+        启用的组件，按完整模式下的运行顺序
+        """
+        stages = []
         if self.config["enable_rule_filter"]:
-            rule_passed, rule_results = self.rule_filter.filter(text)
-            rule_score = self.rule_filter.get_rule_score(text)
+            stages.append("rule_score")
+        if self.config["enable_feature_words"]:
+            stages.append("feature_score")
+        if self.config["enable_perplexity"] and self.perplexity_calculator:
+            stages.append("perplexity_score")
+        if self.config["enable_clustering"] and self.text_clustering:
+            stages.append("clustering_score")
+        return stages
+    
+    def _run_stage(self, stage: str, text: str, results: Dict, scores: Dict):
+        """
+        运行一个组件，把详细结果写入 results，得分写入 scores
+        """
+        # 基础规则过滤
+        if stage == "rule_score":
+            # filter 与 get_rule_score 共用一次统计
+            rule_passed, rule_results, rule_score = self.rule_filter.evaluate(text)
             
             results["rule_filter"] = {
                 "passed": rule_passed,
@@ -156,7 +244,7 @@ class TextQualityFilter:
             scores["rule_score"] = rule_score
         
         # 特征词检测
-        if self.config["enable_feature_words"]:
+        elif stage == "feature_score":
             feature_passed, feature_results = self.feature_detector.filter(text)
             feature_score = self.feature_detector.get_feature_score(text)
             
@@ -167,7 +255,7 @@ class TextQualityFilter:
             scores["feature_score"] = feature_score
         
         # 计算困惑度
-        if self.config["enable_perplexity"] and self.perplexity_calculator:
+        elif stage == "perplexity_score":
             try:
                 perplexity_passed, perplexity_results = self.perplexity_calculator.check_perplexity(text)
                 perplexity_score = self.perplexity_calculator.get_perplexity_score(text)
@@ -186,7 +274,7 @@ class TextQualityFilter:
                 scores["perplexity_score"] = 0.5  # 出错时给中等分数
         
         # 文本聚类（检测重复）
-        if self.config["enable_clustering"] and self.text_clustering:
+        elif stage == "clustering_score":
             try:
                 duplicate_passed, duplicate_results = self.text_clustering.check_duplicate(text)
                 duplicate_score = self.text_clustering.get_cluster_score(text)
@@ -203,28 +291,30 @@ class TextQualityFilter:
                     "details": {"error": str(e)}
                 }
                 scores["clustering_score"] = 0.5  # 出错时给中等分数
-        
-        # 计算综合质量得分
-        quality_score = self._calculate_quality_score(scores)
-        is_high_quality = quality_score >= self.config["quality_threshold"]
-        
-        # 返回综合结果
-        return is_high_quality, {
-            "quality_score": quality_score,
-            "is_high_quality": is_high_quality,
-            "component_results": results,
-            "component_scores": scores
+    
+    @staticmethod
+    def _new_stage_stats() -> Dict:
+        """
+        各组件的运行次数和级联模式下在该组件之后提前判为低质量的文档数
+        """
+        return {
+            "documents": 0,
+            "ran": {stage: 0 for stage in CASCADE_ORDER},
+            "rejected_after": {stage: 0 for stage in CASCADE_ORDER}
         }
     
-    def _calculate_quality_score(self, scores: Dict) -> float:
+    def _calculate_quality_score(self, scores: Dict, assume_perfect: List[str] = ()) -> float:
         """
         计算综合质量得分
         Args:
             scores: 各组件的得分字典
+            assume_perfect: 尚未运行的组件，按满分 1.0 计入（级联模式下求得分上界）
             
         Returns:
             综合质量得分，范围0-1
         """
+        if assume_perfect:
+            scores = dict(scores, **{stage: 1.0 for stage in assume_perfect})
         if not scores:
             return 0.0
         
@@ -254,7 +344,7 @@ class TextQualityFilter:
         """
         批量处理文件
         Args:
-            input_dir: 输入目录
+            input_dir: 输入目录，包含分片文件（见 shard_store）时直接按分片读取
             output_dir: 输出目录，默认使用配置中的输出目录
             file_pattern: 文件匹配模式
             
@@ -264,6 +354,13 @@ class TextQualityFilter:
         output_dir = output_dir or self.config["output_dir"]
         os.makedirs(output_dir, exist_ok=True)
         
+        self.stage_stats = self._new_stage_stats()
+        
+        # 输入目录是分片存储时直接按分片读取
+        shards = list_shards(input_dir)
+        if shards:
+            return self._batch_process_shards(shards, output_dir)
+        
         # 获取所有符合模式的文件
         files = glob.glob(os.path.join(input_dir, file_pattern))
         print(f"找到 {len(files)} 个文件需要处理")
@@ -307,13 +404,80 @@ class TextQualityFilter:
                 stats["error"] += 1
         
         # 保存统计信息
+        stats["stages"] = self.stage_stats
         stats_path = os.path.join(output_dir, "stats.json")
         with open(stats_path, 'w', encoding='utf-8') as f:
             json.dump(stats, f, ensure_ascii=False, indent=2)
             
+        self._print_stage_stats()
         print(f"处理完成：共 {stats['total']} 个文件，高质量 {stats['high_quality']} 个，低质量 {stats['low_quality']} 个，错误 {stats['error']} 个")
         return stats
     
+    def _batch_process_shards(self, shards: List[str], output_dir: str) -> Dict:
+        """
+        批量处理分片存储中的文档
+        高质量文档写入输出目录的分片，评估结果逐行写入 results.jsonl，不再每个文档一个文件
+        Args:
+            shards: 分片文件路径列表
+            output_dir: 输出目录
+            
+        Returns:
+            处理结果统计
+        """
+        print(f"找到 {len(shards)} 个分片需要处理")
+        
+        # 统计信息
+        stats = {
+            "total": 0,
+            "high_quality": 0,
+            "low_quality": 0,
+            "error": 0
+        }
+        
+        results_path = os.path.join(output_dir, "results.jsonl")
+        with ShardWriter(output_dir) as writer, open(results_path, 'w', encoding='utf-8') as results_f:
+            for shard_path in tqdm(shards, desc="处理分片"):
+                for doc in iter_shard(shard_path):
+                    stats["total"] += 1
+                    try:
+                        is_high_quality, results = self.filter_text(doc.get("text", ""))
+                        
+                        if is_high_quality:
+                            # 保存高质量文本
+                            writer.write(doc)
+                            stats["high_quality"] += 1
+                        else:
+                            stats["low_quality"] += 1
+                        
+                        # 保存评估结果
+                        results_f.write(json.dumps({"id": doc.get("id"), "results": results}, ensure_ascii=False) + "\n")
+                        
+                    except Exception as e:
+                        print(f"处理文档 {doc.get('id')} 失败: {e}")
+                        traceback.print_exc()
+                        stats["error"] += 1
+        
+        # 保存统计信息
+        stats["stages"] = self.stage_stats
+        stats_path = os.path.join(output_dir, "stats.json")
+        with open(stats_path, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+            
+        self._print_stage_stats()
+        print(f"处理完成：共 {stats['total']} 个文档，高质量 {stats['high_quality']} 个，低质量 {stats['low_quality']} 个，错误 {stats['error']} 个")
+        return stats
+    
+    def _print_stage_stats(self):
+        """
+        打印各组件的运行次数和提前拒绝数
+        """
+        documents = self.stage_stats["documents"]
+        for stage in CASCADE_ORDER:
+            ran = self.stage_stats["ran"][stage]
+            if ran:
+                print(f"  {stage}: 运行 {ran}/{documents} 次，之后提前判为低质量 "
+                      f"{self.stage_stats['rejected_after'][stage]} 个")
+    
     def filter_sensitive_content(self, text: str) -> str:
         """
         过滤文本中的敏感内容和广告内容
@@ -326,45 +490,48 @@ class TextQualityFilter:
         if not text:
             return text
             
-        # 使用特征词检测器的feature_filter过滤特征词（同时包含敏感词和广告词）
+        # 使用特征词检测器的feature_filter（或初始化时另建的DFA过滤器）过滤特征词（同时包含敏感词和广告词）
         try:
-            if self.feature_detector and hasattr(self.feature_detector, "feature_filter") and self.feature_detector.feature_filter is not None:
-                filtered_text = self.feature_detector.feature_filter.filter(text)
-                return filtered_text
-            else:
-                # 如果特征词过滤器不可用，尝试重新初始化
-                print("特征词过滤器不可用，尝试重新初始化")
-                dfa_filter = DFAFilter()
-                
-                # 尝试加载敏感词和广告词
-                sensitive_words_path = os.path.join(BASE_DIR, "data", "sensitive_words.txt")
-                ad_words_path = os.path.join(BASE_DIR, "data", "ad_words.txt")
-                all_words_path = os.path.join(BASE_DIR, "data", "all_sensitive_words.txt")
-                
-                if os.path.exists(all_words_path):
-                    print(f"加载特征词文件: {all_words_path}")
-                    dfa_filter.parse_file(all_words_path)
-                else:
-                    if os.path.exists(sensitive_words_path):
-                        print(f"加载敏感词文件: {sensitive_words_path}")
-                        dfa_filter.parse_file(sensitive_words_path)
-                    
-                    if os.path.exists(ad_words_path):
-                        print(f"加载广告词文件: {ad_words_path}")
-                        dfa_filter.parse_file(ad_words_path)
-                
-                # 使用临时过滤器过滤文本
-                return dfa_filter.filter(text)
+            return self.sensitive_filter.filter(text)
         except Exception as e:
             print(f"过滤特征词出错: {e}")
             traceback.print_exc()
             return text
     
+    def _load_sensitive_filter(self) -> DFAFilter:
+        """
+        特征词检测器没有DFA过滤器时，初始化屏蔽敏感内容用的DFA过滤器
+        优先加载全量特征词表（与DFA方式的特征词检测词表相同，共用保存的自动机），否则合并敏感词和广告词
+        
+        Returns:
+            DFA过滤器，自动机在第一次过滤时构建或加载
+        """
+        ac_cache_path = FEATURE_WORDS_CONFIG.get("ac_cache_path")
+        sensitive_words_path = os.path.join(BASE_DIR, "data", "sensitive_words.txt")
+        ad_words_path = os.path.join(BASE_DIR, "data", "ad_words.txt")
+        all_words_path = os.path.join(BASE_DIR, "data", "all_sensitive_words.txt")
+        
+        if os.path.exists(all_words_path):
+            dfa_filter = DFAFilter(cache_path=cache_path_for(ac_cache_path, "dfa"))
+            print(f"加载特征词文件: {all_words_path}")
+            dfa_filter.parse_file(all_words_path)
+            return dfa_filter
+        
+        dfa_filter = DFAFilter(cache_path=cache_path_for(ac_cache_path, "sensitive"))
+        if os.path.exists(sensitive_words_path):
+            print(f"加载敏感词文件: {sensitive_words_path}")
+            dfa_filter.parse_file(sensitive_words_path)
+        
+        if os.path.exists(ad_words_path):
+            print(f"加载广告词文件: {ad_words_path}")
+            dfa_filter.parse_file(ad_words_path)
+        return dfa_filter
+    
     def batch_filter_sensitive(self, input_dir: str, output_dir: str = None, file_pattern: str = "*.txt") -> Dict:
         """
         批量过滤文件中的敏感内容
         Args:
-            input_dir: 输入目录
+            input_dir: 输入目录，包含分片文件（见 shard_store）时直接按分片读取
             output_dir: 输出目录，默认使用配置中的输出目录
             file_pattern: 文件匹配模式
             
@@ -374,6 +541,11 @@ class TextQualityFilter:
         output_dir = output_dir or self.config["output_dir"]
         os.makedirs(output_dir, exist_ok=True)
         
+        # 输入目录是分片存储时直接按分片读取
+        shards = list_shards(input_dir)
+        if shards:
+            return self._batch_filter_sensitive_shards(shards, output_dir)
+        
         # 获取所有符合模式的文件
         files = glob.glob(os.path.join(input_dir, file_pattern))
         print(f"找到 {len(files)} 个文件需要处理")
@@ -416,6 +588,48 @@ class TextQualityFilter:
             
         print(f"处理完成：共 {stats['total']} 个文件，成功处理 {stats['processed']} 个，错误 {stats['error']} 个")
         return stats
+    
+    def _batch_filter_sensitive_shards(self, shards: List[str], output_dir: str) -> Dict:
+        """
+        批量过滤分片存储中文档的敏感内容，结果写入输出目录的分片
+        Args:
+            shards: 分片文件路径列表
+            output_dir: 输出目录
+            
+        Returns:
+            处理结果统计
+        """
+        print(f"找到 {len(shards)} 个分片需要处理")
+        
+        # 统计信息
+        stats = {
+            "total": 0,
+            "processed": 0,
+            "error": 0
+        }
+        
+        with ShardWriter(output_dir) as writer:
+            for shard_path in tqdm(shards, desc="过滤敏感内容"):
+                for doc in iter_shard(shard_path):
+                    stats["total"] += 1
+                    try:
+                        # 过滤敏感内容
+                        doc["text"] = self.filter_sensitive_content(doc.get("text", ""))
+                        writer.write(doc)
+                        stats["processed"] += 1
+                        
+                    except Exception as e:
+                        print(f"处理文档 {doc.get('id')} 失败: {e}")
+                        traceback.print_exc()
+                        stats["error"] += 1
+        
+        # 保存统计信息
+        stats_path = os.path.join(output_dir, "filter_stats.json")
+        with open(stats_path, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+            
+        print(f"处理完成：共 {stats['total']} 个文档，成功处理 {stats['processed']} 个，错误 {stats['error']} 个")
+        return stats
 
 
 def train_models(args):
@@ -428,6 +642,7 @@ def train_models(args):
     if not args.skip_clustering:
         print("构建语料库聚类...")
         try:
+            from text_quality_filter.utils.clustering import build_corpus_clustering
             clustering_model_path = os.path.join(
                 os.path.dirname(PERPLEXITY_CONFIG["model_path"]), 
                 "clustering.bin"
@@ -455,6 +670,7 @@ def main():
     filter_parser.add_argument("--input_dir", type=str, default="chinese_docs", help="输入目录")
     filter_parser.add_argument("--output_dir", type=str, default=None, help="输出目录")
     filter_parser.add_argument("--file_pattern", type=str, default="*.txt", help="文件匹配模式")
+    filter_parser.add_argument("--full_detail", action="store_true", help="完整模式：运行全部组件，不提前退出（用于审计）")
     
     # 训练模型命令
     train_parser = subparsers.add_parser("train", help="训练模型")
@@ -472,7 +688,7 @@ def main():
     args = parser.parse_args()
     
     # 创建过滤器
-    filter = TextQualityFilter()
+    filter = TextQualityFilter({"filter_mode": "full"} if getattr(args, "full_detail", False) else None)
     
     if args.command == "filter":
         # 批量处理
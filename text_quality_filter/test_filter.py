@@ -254,8 +254,8 @@ def test_complete_filter():
         name = case["name"]
         text = case["text"]
         
-        # 测试完整过滤
-        is_high_quality, complete_results = filter.filter_text(text)
+        # 测试完整过滤（完整模式下每个文档都有真实的综合得分）
+        is_high_quality, complete_results = filter.filter_text(text, mode="full")
         
         # 添加到结果
         results.append({
@@ -279,6 +279,34 @@ def test_complete_filter():
             print(f"  - {name}: {score:.4f}")
         print("-" * 80)
 
+def test_cascade_matches_full_mode():
+    """级联模式与完整模式的判定结果一致，级联模式只是提前跳过不可能改变结果的组件"""
+    filter = TextQualityFilter()
+    
+    texts = [
+        "文本质量过滤是自然语言处理中的重要任务，旨在从大量文本数据中筛选出高质量的内容。" * 5,
+        "久久久久久日本一区99 | 欧美日韩a∨毛片一区 | 99国产精品视频久久久久 | 在线播放 | " * 10,
+        "这是一个太短的文本",
+        "This is a test text with very little Chinese content. 这只有一点点中文内容。",
+        "",
+    ]
+    
+    for text in texts:
+        full_passed, full_results = filter.filter_text(text, mode="full")
+        cascade_passed, cascade_results = filter.filter_text(text, mode="cascade")
+        assert full_passed == cascade_passed
+        if "cascade" in cascade_results:
+            # 提前退出时没有真实得分，只给出综合得分的上界和跳过的组件
+            assert cascade_results["quality_score"] is None
+            assert cascade_results["quality_score_upper_bound"] >= full_results["quality_score"] - 1e-9
+            assert not set(cascade_results["cascade"]["skipped"]) & set(cascade_results["component_scores"])
+            print(f"提前退出于 {cascade_results['cascade']['stopped_after']}，"
+                  f"跳过 {cascade_results['cascade']['skipped']}")
+        else:
+            assert cascade_results["quality_score"] == full_results["quality_score"]
+    
+    print(f"各组件运行统计: {filter.stage_stats}")
+
 if __name__ == "__main__":
     print("开始测试文本质量过滤器...")
     
@@ -294,4 +322,7 @@ if __name__ == "__main__":
     # 测试完整过滤流程
     test_complete_filter()
     
+    # 测试级联模式
+    test_cascade_matches_full_mode()
+    
     print("测试完成！") 
\ No newline at end of file
@@ -0,0 +1,271 @@
+"""
+测试 text_quality_filter.utils 中不依赖模型的工具模块
+"""
+import os
+import sys
+import re
+import json
+import random
+import multiprocessing
+
+# 将项目根目录添加到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_quality_filter.utils.minhash_dedup import MinHashDeduplicator, dedup_corpus
+from shard_store import ShardWriter, iter_shard_docs
+from text_quality_filter.utils.rule_filter import RuleFilter, count_ngrams, _code_points
+from text_quality_filter.utils.aho_corasick import AhoCorasick, cache_path_for
+from text_quality_filter.utils.feature_words import FeatureWordsDetector
+from text_quality_filter.utils.sensitive_filter import DFAFilter
+from text_quality_filter.utils.spam_patterns import ALL_SPAM_PATTERNS, SEO_SPAM_PATTERNS, find_spam_patterns, has_spam_pattern
+
+CHARS = "的一是了我不人在他有这个上们来到时大地为子中你说生国年着就那和要出也得里后自以会家可下而过天去能对小多然于心学么之都好看起发当没成只如事把还用第样道想作种开美总从无情己面最女但现前些所同日手又行意动方期它头经长儿回位分爱老因很给名法间斯知世什两次使身者被高已亲其进此话常与活正感"
+
+
+def _random_doc(rng, length=600):
+    return ''.join(rng.choice(CHARS) for _ in range(length))
+
+
+def _near_copy(rng, text, edits=5):
+    chars = list(text)
+    for _ in range(edits):
+        chars[rng.randrange(len(chars))] = rng.choice(CHARS)
+    return ''.join(chars)
+
+
+def test_minhash_detects_exact_and_near_duplicates(tmp_path):
+    """完全重复和少量改动的近似重复被检出，无关文档保留"""
+    rng = random.Random(0)
+    config = {"db_path": str(tmp_path / "dedup.sqlite"), "threshold": 0.7}
+    base = [_random_doc(rng) for _ in range(20)]
+    with MinHashDeduplicator(config) as deduplicator:
+        for i, text in enumerate(base):
+            assert deduplicator.check(f"doc{i}", text)[0] is False
+        # 空白不同的完全重复
+        is_duplicate, info = deduplicator.check("exact", "  \n".join([base[3][:300], base[3][300:]]))
+        assert is_duplicate and info["type"] == "exact" and info["duplicate_of"] == "doc3"
+        # 少量字符改动的近似重复
+        is_duplicate, info = deduplicator.check("near", _near_copy(rng, base[7]))
+        assert is_duplicate and info["type"] == "near" and info["duplicate_of"] == "doc7"
+        assert deduplicator.check("new", _random_doc(rng))[0] is False
+
+    # 索引持久化：重新打开后仍能检出，已处理的文档直接返回上次结果
+    with MinHashDeduplicator(config) as deduplicator:
+        assert deduplicator.check("again", _near_copy(rng, base[11]))[1]["duplicate_of"] == "doc11"
+        is_duplicate, info = deduplicator.check("near", "")
+        assert is_duplicate and info["cached"]
+
+
+def test_dedup_corpus_writes_kept_files(tmp_path):
+    """目录去重只写出保留的文档，重复关系记入 duplicates.jsonl"""
+    rng = random.Random(1)
+    input_dir = tmp_path / "docs"
+    output_dir = tmp_path / "deduped"
+    input_dir.mkdir()
+    texts = {f"{i}.txt": _random_doc(rng) for i in range(5)}
+    texts["copy.txt"] = texts["2.txt"]
+    for name, text in texts.items():
+        (input_dir / name).write_text(text, encoding="utf-8")
+
+    stats = dedup_corpus(str(input_dir), str(output_dir), {"db_path": str(tmp_path / "dedup.sqlite")})
+    assert stats["total"] == 6 and stats["kept"] == 5 and stats["exact_duplicate"] == 1
+    kept = [name for name in os.listdir(output_dir) if name.endswith(".txt")]
+    assert len(kept) == 5
+    with open(output_dir / "duplicates.jsonl", encoding="utf-8") as f:
+        assert len([json.loads(line) for line in f]) == 1
+
+
+def _killed_dedup(input_dir, output_dir, config, kill_at):
+    """在检查 kill_at 文档时直接结束进程，模拟去重运行被杀掉"""
+    check = MinHashDeduplicator.check
+
+    def check_or_die(self, doc_id, text):
+        if doc_id == kill_at:
+            os._exit(1)
+        return check(self, doc_id, text)
+
+    MinHashDeduplicator.check = check_or_die
+    dedup_corpus(input_dir, output_dir, config)
+
+
+def test_dedup_corpus_rerun_after_kill_writes_each_doc_once(tmp_path):
+    """分片输入的去重被杀掉后重新运行，每个保留的文档和重复记录只写出一次，缺少 id 的文档计为错误"""
+    rng = random.Random(2)
+    input_dir, output_dir = str(tmp_path / "shards"), str(tmp_path / "deduped")
+    docs = [{"id": f"doc{i}", "text": _random_doc(rng)} for i in range(40)]
+    copies = [{"id": f"copy{i}", "text": docs[i * 3]["text"]} for i in range(5)]
+    with ShardWriter(input_dir, max_shard_bytes=16 * 1024) as writer:
+        for doc in docs[:20] + copies + docs[20:] + [{"id": None, "text": _random_doc(rng)}]:
+            writer.write(doc)
+    # 用默认的 commit_every，被杀掉时还没到定期提交
+    config = {"db_path": str(tmp_path / "dedup.sqlite")}
+
+    process = multiprocessing.get_context("fork").Process(target=_killed_dedup,
+                                                          args=(input_dir, output_dir, config, "doc30"))
+    process.start()
+    process.join()
+    assert process.exitcode == 1
+
+    stats = dedup_corpus(input_dir, output_dir, config)
+    assert stats["error"] == 1
+    assert [doc["id"] for doc in iter_shard_docs(output_dir)] == [doc["id"] for doc in docs]
+    with open(os.path.join(output_dir, "duplicates.jsonl"), encoding="utf-8") as f:
+        assert [json.loads(line)["id"] for line in f] == [doc["id"] for doc in copies]
+
+
+RULE_PIECES = ["中文文本测试", "，", "。", "|", ",", " ", "\n", "\n\n", "  \t", "http://a.com/x ", "www.abc.com",
+               "example.org", "😀", "😀😁", "✂", "abc", "123", "_", "!?", "在线播放", "鿿", "　", "久久久"]
+RULE_CHECKS = [("length_check", "check_text_length"), ("avg_line_check", "check_avg_line_length"),
+               ("chinese_check", "check_chinese_ratio"), ("symbol_check", "check_symbol_ratio"),
+               ("dup_check", "check_internal_duplication"), ("vbar_check", "check_vertical_bar_ratio"),
+               ("comma_check", "check_comma_ratio"), ("url_check", "check_url_density"),
+               ("emoji_check", "check_emoji_ratio")]
+
+
+def test_rule_filter_stats_match_individual_checks():
+    """一次统计得到的判定结果和原因与逐项 check_* 扫描完全一致"""
+    rng = random.Random(2)
+    rule_filter = RuleFilter({"min_text_length": 100, "min_avg_line_length": 5})
+    texts = ["", "\n", "  \n "] + ["".join(rng.choice(RULE_PIECES) for _ in range(rng.randint(1, 300)))
+                                 for _ in range(500)]
+    texts.append("重复的句子内容。" * 100)
+    for text in texts:
+        passed, results, score = rule_filter.evaluate(text)
+        for key, check in RULE_CHECKS:
+            assert (results[key]["pass"], results[key]["reason"]) == getattr(rule_filter, check)(text)
+        assert passed == all(result["pass"] for result in results.values())
+        assert 0.0 <= score <= 1.0 and (score == 1.0 or not passed)
+        assert rule_filter.get_rule_score(text) == score
+
+
+def test_rolling_hash_ngram_counts_match_substring_sets():
+    """滚动哈希统计的 n-gram 总数和去重数与子串集合一致"""
+    rng = random.Random(3)
+    for n in (1, 2, 5, 13, 30):
+        for _ in range(100):
+            text = "".join(rng.choice("ab中文😀\n ") for _ in range(rng.randint(0, 300)))
+            total = max(0, len(text) - n + 1)
+            assert count_ngrams(_code_points(text), n) == (total, len({text[i:i + n] for i in range(total)}))
+    rule_filter = RuleFilter({"dup_ngram_size": 5, "max_internal_dup_ratio": 0.5})
+    assert rule_filter.check_internal_duplication("重复内容" * 50)[0] is False
+    assert rule_filter.check_internal_duplication(CHARS)[0] is True
+
+
+SPAM_PIECES = ["在线", "播放", "观看", "视频", "一区", "二区", "久", "精品", "成人", "不卡", "日本", "韩国", "欧美",
+               "中文", "字幕", "一本", "道", "激情", "小说", "区", "9", "٣", " ", "\u3000", "\n", "x", "的"]
+
+
+def test_combined_spam_scan_matches_individual_patterns():
+    """合并扫描命中的特征与逐条 re.search 一致，包括特征互相重叠的情况"""
+    rng = random.Random(4)
+    texts = ["", "成人视频一区二区", "精品视频在线播放", "第 12 区 3", "区9", "久久久"]
+    texts += ["".join(rng.choice(SPAM_PIECES) for _ in range(rng.randint(1, 30))) for _ in range(3000)]
+    for text in texts:
+        expected = {pattern for pattern in ALL_SPAM_PATTERNS if re.search(pattern, text)}
+        assert find_spam_patterns(text) == expected, text
+        assert has_spam_pattern(text) == any(re.search(pattern, text) for pattern in SEO_SPAM_PATTERNS)
+    # 同一文档第二次查询直接返回缓存的结果
+    assert find_spam_patterns(texts[-1]) is find_spam_patterns(texts[-1])
+
+
+def _all_occurrences(text, words):
+    matches = []
+    for word in words:
+        start = text.find(word)
+        while start >= 0:
+            matches.append((start, word))
+            start = text.find(word, start + 1)
+    return sorted(matches)
+
+
+def test_aho_corasick_matches_all_occurrences_and_reloads(tmp_path):
+    """双数组AC自动机找到全部（含重叠的）出现位置，保存后内存映射加载的结果相同"""
+    rng = random.Random(5)
+    words = sorted({"".join(rng.choice(CHARS[:30]) for _ in range(rng.randint(1, 6))) for _ in range(400)})
+    ac = AhoCorasick()
+    for word in words:
+        ac.add_pattern(word)
+    ac.save(str(tmp_path / "words.ac"))
+    loaded = AhoCorasick.load(str(tmp_path / "words.ac"))
+    for _ in range(300):
+        text = "".join(rng.choice(words) if rng.random() < 0.3 else rng.choice(CHARS[:40] + "ab\n")
+                       for _ in range(rng.randint(0, 60)))
+        expected = _all_occurrences(text, words)
+        assert sorted(ac.search(text)) == expected
+        assert sorted(loaded.search(text)) == expected
+
+    # 特征词检测器在词表不变时加载保存的自动机，词表变化时重新构建
+    words_path = tmp_path / "words.txt"
+    words_path.write_text("\n".join(words), encoding="utf-8")
+    config = {"feature_words_path": str(words_path), "use_dfa_filter": False,
+              "ac_cache_path": str(tmp_path / "detector.ac")}
+    assert FeatureWordsDetector(config).feature_ac._mmap is None
+    assert FeatureWordsDetector(config).feature_ac._mmap is not None
+    words_path.write_text("\n".join(words[1:]), encoding="utf-8")
+    assert FeatureWordsDetector(config).feature_ac._mmap is None
+    # DFA方式（小写词表）与AC方式分别保存，不互相覆盖
+    FeatureWordsDetector(dict(config, use_dfa_filter=True)).detect_feature_words("")
+    assert os.path.exists(cache_path_for(config["ac_cache_path"], "dfa"))
+    assert FeatureWordsDetector(config).feature_ac._mmap is not None
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def _restart_scan(text, words):
+    """逐位置查找最短敏感词的参考实现"""
+    max_len = max(map(len, words))
+    spans = []
+    start = 0
+    while start < len(text):
+        for end in range(start + 1, min(len(text), start + max_len) + 1):
+            if text[start:end] in words:
+                spans.append((start, end))
+                start = end
+                break
+        else:
+            start += 1
+    return spans
+
+
+def test_dfa_filter_linear_scan_matches_restart_scan():
+    """一遍扫描的检测和屏蔽结果与逐位置重新查找一致，包括敏感词互为前缀、后缀和大小写混合的情况"""
+    rng = random.Random(6)
+    words = {"".join(rng.choice("ab中文敏感") for _ in range(rng.randint(1, 5))) for _ in range(40)}
+    words |= {"Ab", "abc", "bcd", "中文敏感词", "文敏"}
+    dfa_filter = DFAFilter()
+    dfa_filter.parse_list(list(words) + ["  ", "ab "])
+    lowered = {word.lower().strip() for word in words}
+    for _ in range(500):
+        text = "".join(rng.choice("aAbBcd中文敏感词 \n") for _ in range(rng.randint(0, 50)))
+        spans = _restart_scan(text.lower(), lowered)
+        assert dfa_filter.detect(text) == [text.lower()[start:end] for start, end in spans]
+        masked = list(text.lower())
+        for start, end in spans:
+            masked[start:end] = "*" * (end - start)
+        assert dfa_filter.filter(text) == "".join(masked)
+    assert DFAFilter().filter("没有敏感词") == "没有敏感词"
+
+
+def test_feature_words_single_scan_counts_per_line(tmp_path):
+    """一遍匹配按行归类得到的计数与逐行匹配一致，get_feature_score 复用同一次匹配"""
+    rng = random.Random(7)
+    words = ["特价", "促销", "价促", "免费咨询", "QQ", "赌博"]
+    words_path = tmp_path / "words.txt"
+    words_path.write_text("\n".join(words), encoding="utf-8")
+    for use_dfa_filter in (True, False):
+        detector = FeatureWordsDetector({"feature_words_path": str(words_path), "use_dfa_filter": use_dfa_filter})
+        for _ in range(200):
+            text = "".join(rng.choice(words + ["特", "价", "qq", "正常内容", " ", "\n", "\n\n"])
+                           for _ in range(rng.randint(0, 30)))
+            lines = text.split("\n")
+            if use_dfa_filter:
+                line_counts = [detector.feature_filter.count_sensitive_words(line)[0] for line in lines]
+                expected_words = detector.feature_filter.detect(text)
+            else:
+                line_counts = [len(_all_occurrences(line, words)) for line in lines]
+                expected_words = [word for _, word in _all_occurrences(text, words)]
+            valid_lines = sum(1 for line in lines if len(line.strip()) >= 5)
+            passed, results = detector.check_feature_words(text)
+            assert sorted(results["feature_words"]) == sorted(expected_words)
+            assert results["avg_per_line"] == (sum(line_counts) / valid_lines if valid_lines else 0)
+            assert results["max_per_line"] == max(line_counts)
+            assert detector.check_feature_words(text)[1] is results
@@ -0,0 +1,449 @@
+"""
+扁平数组实现的 Aho-Corasick 自动机
+状态是整数，转移用双数组（base / check）存放：状态 s 经字符编码 c 转移到 t = base[s] + c，当且仅当 check[t] == s；
+失败指针和输出链接在构建时一次算好，匹配时每个字符只做几次数组下标访问，不再比较字典
+- 字符编码按词表中出现频率从高到低分配，高频字符编码小，双数组更紧凑
+- 完整的 goto 表需要 状态数 × 字符表大小 个格子（全量敏感词表约 30 万状态 × 4 千多个字符），放不下；
+  缺失的转移沿失败指针回退，均摊每个字符 O(1)
+- 输出链接指向失败链上最近的终止状态，匹配时只访问有输出的状态
+- 构建时绝大多数状态只有一个子状态，直接取第一个空闲格子；有多个子状态时用 numpy 按窗口一次检查一批候选 base，
+  不再逐个候选、逐个子状态地试探
+自动机可以保存为单个文件（见 save / load），加载时直接内存映射数组，不需要重新构建
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import tempfile
+from array import array
+from collections import Counter, deque
+from typing import Any, Iterator, List, Tuple
+
+import numpy as np
+
+# 文件格式：魔数、版本、头部 JSON 长度，随后是头部 JSON 和按 4 字节对齐的各个数组
+_MAGIC = b'ACDA'
+_VERSION = 1
+_PREFIX = struct.Struct('<4sII')
+_ARRAYS = ("base", "check", "fail", "depth", "term", "out", "link")
+# 多子状态查找 base 时每次检查的候选个数
+_BASE_WINDOW = 1024
+
+
+def lexicon_fingerprint(patterns, ids=None) -> str:
+    """
+    词表的指纹，用于判断保存的自动机是否与当前词表一致
+    Args:
+        patterns: 模式串
+        ids: 可选的 {模式串: [模式ID]}，默认模式ID即模式串本身
+    """
+    patterns = set(patterns)
+    # 模式ID都是模式串本身时与不给 ids 相同
+    if ids is not None and all(ids[p] == [p] for p in patterns):
+        ids = None
+    items = sorted(patterns) if ids is None else sorted((p, ids[p]) for p in patterns)
+    return hashlib.sha1(json.dumps(items, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class _NextFree:
+    """
+    双数组中空闲格子的查找：find(i) 返回 >= i 的第一个空闲格子（带路径压缩的并查集）
+    """
+    def __init__(self):
+        self.parent = []
+
+    def _grow(self, size: int):
+        # 按倍数扩容，每个新格子都指向自身（空闲）
+        if len(self.parent) < size:
+            self.parent.extend(range(len(self.parent), max(size, 2 * len(self.parent))))
+
+    def find(self, i: int) -> int:
+        if i >= len(self.parent):
+            self._grow(i + 1)
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def occupy(self, i: int):
+        if i + 1 >= len(self.parent):
+            self._grow(i + 2)
+        self.parent[i] = i + 1
+
+
+def _find_base(occupied: np.ndarray, offset: int, child_codes: List[int]) -> Tuple[np.ndarray, int]:
+    """
+    从 offset 起查找使 offset + code 对全部子状态编码都空闲的最小 base
+    Args:
+        occupied: 格子占用标记，长度不足时扩展
+        offset: 候选 base 的起点（第一个子状态落在空闲格子上的最小 base）
+        child_codes: 升序的子状态字符编码
+
+    Returns:
+        (可能已扩展的占用标记, base)
+    """
+    while True:
+        end = offset + child_codes[-1] + _BASE_WINDOW
+        if len(occupied) < end:
+            occupied = np.concatenate([occupied, np.zeros(max(end, len(occupied)), dtype=bool)])
+        # blocked[k] 表示 base = offset + k 时有子状态落在已占用的格子上
+        blocked = occupied[offset + child_codes[0]:offset + child_codes[0] + _BASE_WINDOW].copy()
+        for code in child_codes[1:]:
+            blocked |= occupied[offset + code:offset + code + _BASE_WINDOW]
+        candidates = np.flatnonzero(~blocked)
+        if len(candidates):
+            return occupied, offset + int(candidates[0])
+        offset += _BASE_WINDOW
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick算法实现，用于高效多模式匹配
+    """
+    def __init__(self):
+        # 模式串 -> 模式ID列表（保持添加顺序）
+        self._pattern_ids = {}
+        self.built = False
+        self.fingerprint = None
+        self._mmap = None
+
+    def add_pattern(self, pattern: str, pattern_id=None):
+        """
+        添加模式串，空串忽略；构建之后添加需要重新构建
+        """
+        if not pattern:
+            return
+        pattern_id = pattern_id if pattern_id is not None else pattern
+        ids = self._pattern_ids.setdefault(pattern, [])
+        if pattern_id not in ids:
+            ids.append(pattern_id)
+        self.built = False
+
+    def build(self):
+        """
+        构建双数组、失败指针和输出链接
+        """
+        if self.built:
+            return
+
+        patterns = sorted(self._pattern_ids)
+        frequency = Counter(char for pattern in patterns for char in pattern)
+        alphabet = ''.join(char for char, _ in sorted(frequency.items(), key=lambda item: (-item[1], item[0])))
+        codes = {char: i + 1 for i, char in enumerate(alphabet)}
+
+        # 根状态占格子 0；check 为 -1 表示空闲。数组按倍数扩容，size 为实际用到的长度
+        base, check, fail, depth, term = [0], [-1], [0], [0], [-1]
+        size = 1
+        free = _NextFree()
+        free.occupy(0)
+        occupied = np.zeros(1 << 16, dtype=bool)
+        occupied[0] = True
+
+        def ensure(needed):
+            if len(check) < needed:
+                extra = max(needed, 2 * len(check)) - len(check)
+                base.extend([0] * extra)
+                check.extend([-1] * extra)
+                fail.extend([0] * extra)
+                depth.extend([0] * extra)
+                term.extend([-1] * extra)
+
+        # 广度优先：每个状态对应排序后模式串中共享同一前缀的区间 [lo, hi)
+        queue = deque([(0, 0, 0, len(patterns))])
+        order = []
+        while queue:
+            state, level, lo, hi = queue.popleft()
+            order.append(state)
+            if lo < hi and len(patterns[lo]) == level:
+                term[state] = lo
+                lo += 1
+            if lo >= hi:
+                continue
+
+            # 按下一个字符分组，排序保证同组相邻
+            groups = []
+            start = lo
+            for i in range(lo + 1, hi + 1):
+                if i == hi or patterns[i][level] != patterns[start][level]:
+                    groups.append((codes[patterns[start][level]], start, i))
+                    start = i
+
+            # 找到使所有子状态格子都空闲的 base：只有一个子状态时即第一个空闲格子
+            if len(groups) == 1:
+                first = groups[0][0]
+                offset = free.find(first) - first
+                last = first
+            else:
+                child_codes = sorted(code for code, _, _ in groups)
+                first, last = child_codes[0], child_codes[-1]
+                occupied, offset = _find_base(occupied, free.find(first) - first, child_codes)
+            base[state] = offset
+            size = max(size, offset + last + 1)
+            ensure(size)
+
+            for code, child_lo, child_hi in groups:
+                child = offset + code
+                free.occupy(child)
+                if child >= len(occupied):
+                    occupied = np.concatenate([occupied, np.zeros(max(child + 1, len(occupied)), dtype=bool)])
+                occupied[child] = True
+                check[child] = state
+                depth[child] = level + 1
+                # 失败指针：沿父状态的失败链找到第一个有相同出边的状态
+                f = fail[state]
+                while state:
+                    target = base[f] + code
+                    if target < size and check[target] == f:
+                        fail[child] = target
+                        break
+                    if f == 0:
+                        break
+                    f = fail[f]
+                queue.append((child, level + 1, child_lo, child_hi))
+
+        # 截去多余的容量，并填充末尾，使 base[s] + c 对任意字符编码都不越界
+        size = max(base) + len(alphabet) + 1
+        ensure(size)
+        for values in (base, check, fail, depth, term):
+            del values[size:]
+
+        # 输出链接：out[s] 为 s 自身（终止状态）或失败链上最近的终止状态，link[s] 为其后的下一个，0 表示没有
+        out = [0] * size
+        link = [0] * size
+        for state in order[1:]:
+            f = fail[state]
+            link[state] = out[f]
+            out[state] = state if term[state] >= 0 else link[state]
+
+        self._set_tables(alphabet, patterns, [self._pattern_ids[p] for p in patterns],
+                         {"base": base, "check": check, "fail": fail, "depth": depth, "term": term,
+                          "out": out, "link": link})
+        self.fingerprint = lexicon_fingerprint(patterns, self._pattern_ids)
+        self.built = True
+
+    def _set_tables(self, alphabet: str, patterns: List[str], ids: List[list], arrays: dict):
+        self.alphabet = alphabet
+        self.patterns = patterns
+        self._codes = {char: i + 1 for i, char in enumerate(alphabet)}
+        self._ids = ids
+        for name in _ARRAYS:
+            values = arrays[name]
+            setattr(self, "_" + name, values if isinstance(values, memoryview) else array('i', values))
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        逐个产生文本中的全部匹配（含互相重叠的），按结束位置排序
+        Returns:
+            (起始位置, 结束位置(不含), 模式串下标) 的迭代器，模式串为 self.patterns[下标]
+        """
+        if not self.built:
+            self.build()
+        codes = self._codes
+        base, check, fail = self._base, self._check, self._fail
+        depth, term, out, link = self._depth, self._term, self._out, self._link
+
+        state = 0
+        for i, char in enumerate(text):
+            code = codes.get(char)
+            if code is None:
+                state = 0
+                continue
+            while True:
+                target = base[state] + code
+                if check[target] == state:
+                    state = target
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            node = out[state]
+            while node:
+                yield i + 1 - depth[node], i + 1, term[node]
+                node = link[node]
+
+    def iter_leftmost_shortest(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        从左到右产生互不重叠的匹配：每次取起始位置最靠左的匹配，同一起始位置取最短的，
+        与从每个位置出发沿 trie 走到第一个终止状态的逐位置扫描结果相同，但每个字符只处理常数次
+        Returns:
+            (起始位置, 结束位置(不含), 模式串下标) 的迭代器
+        """
+        if not self.built:
+            self.build()
+        codes = self._codes
+        base, check, fail = self._base, self._check, self._fail
+        depth, term, out = self._depth, self._term, self._out
+
+        state = 0
+        best = None
+        i = 0
+        n = len(text)
+        while True:
+            if i < n:
+                code = codes.get(text[i])
+                if code is None:
+                    state = 0
+                else:
+                    while True:
+                        target = base[state] + code
+                        if check[target] == state:
+                            state = target
+                            break
+                        if state == 0:
+                            break
+                        state = fail[state]
+                    # 以 i 结尾的匹配中 out[state] 最长，即起始位置最靠左
+                    node = out[state]
+                    if node and (best is None or i + 1 - depth[node] < best[0]):
+                        best = (i + 1 - depth[node], i + 1, term[node])
+                i += 1
+                # 当前状态是仍可能延伸成匹配的最长后缀，它的起点早于候选匹配时，后面还可能出现更靠左的匹配
+                if best is None or i - depth[state] < best[0]:
+                    continue
+            elif best is None:
+                break
+            yield best
+            # 从匹配结束处重新开始，被越过的字符不超过最长模式串的长度
+            i = best[1]
+            state = 0
+            best = None
+
+    def search(self, text: str) -> List[Tuple[int, Any]]:
+        """
+        在文本中搜索所有模式串
+        Returns:
+            List of (position, pattern)
+        """
+        if not self.built:
+            self.build()
+        ids = self._ids
+        results = []
+        for start, _, index in self.iter_matches(text):
+            for pattern_id in ids[index]:
+                results.append((start, pattern_id))
+        return results
+
+    def save(self, path: str):
+        """
+        保存为单个文件，模式ID须可序列化为 JSON
+        """
+        if not self.built:
+            self.build()
+        default_ids = all(ids == [pattern] for pattern, ids in zip(self.patterns, self._ids))
+        arrays = {}
+        offset = 0
+        for name in _ARRAYS:
+            values = getattr(self, "_" + name)
+            arrays[name] = [offset, len(values)]
+            offset += len(values) * 4
+        header = json.dumps({
+            "byteorder": sys.byteorder,
+            "fingerprint": self.fingerprint,
+            "alphabet": self.alphabet,
+            "patterns": self.patterns,
+            "ids": None if default_ids else self._ids,
+            "arrays": arrays,
+        }, ensure_ascii=False).encode('utf-8')
+        # 数组起始位置按 4 字节对齐
+        header += b' ' * (-(_PREFIX.size + len(header)) % 4)
+        # 先写到同目录下唯一的临时文件再替换，多个进程同时保存同一路径时互不干扰，读到的总是完整文件
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.',
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_PREFIX.pack(_MAGIC, _VERSION, len(header)))
+                f.write(header)
+                for name in _ARRAYS:
+                    values = getattr(self, "_" + name)
+                    f.write(values)
+            # mkstemp 创建的文件只有属主可读，改为与普通文件相同的权限
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "AhoCorasick":
+        """
+        加载 save 保存的自动机，数组直接内存映射
+        Raises:
+            ValueError: 文件格式、版本或字节序不符
+        """
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_size = _PREFIX.unpack_from(buffer, 0) if len(buffer) >= _PREFIX.size else (b'', 0, 0)
+        if magic != _MAGIC or version != _VERSION:
+            buffer.close()
+            raise ValueError(f"不是可识别的AC自动机文件: {path}")
+        header = json.loads(buffer[_PREFIX.size:_PREFIX.size + header_size].decode('utf-8'))
+        if header["byteorder"] != sys.byteorder:
+            buffer.close()
+            raise ValueError(f"AC自动机文件的字节序不符: {path}")
+
+        data_start = _PREFIX.size + header_size
+        view = memoryview(buffer)
+        arrays = {}
+        for name, (offset, length) in header["arrays"].items():
+            start = data_start + offset
+            arrays[name] = view[start:start + length * 4].cast('i')
+        patterns = header["patterns"]
+        ids = header["ids"] if header["ids"] is not None else [[pattern] for pattern in patterns]
+
+        ac = cls()
+        ac._set_tables(header["alphabet"], patterns, ids, arrays)
+        ac._pattern_ids = dict(zip(patterns, ids))
+        ac.fingerprint = header["fingerprint"]
+        ac._mmap = buffer
+        ac.built = True
+        return ac
+
+
+def cache_path_for(cache_path: str, variant: str) -> str:
+    """
+    同一个保存路径下不同用途的自动机（如小写后的DFA词表和原样的AC词表）各用一个文件，互不覆盖
+    Args:
+        cache_path: 配置的保存路径，如 all_sensitive_words.ac
+        variant: 用途，如 "dfa" / "ac"
+
+    Returns:
+        如 all_sensitive_words.dfa.ac，cache_path 为空时返回 None
+    """
+    if not cache_path:
+        return None
+    root, _ = os.path.splitext(cache_path)
+    return f"{root}.{variant}.ac"
+
+
+def load_or_build(words, cache_path: str = None) -> AhoCorasick:
+    """
+    构建词表的AC自动机；给出 cache_path 时优先加载与词表一致的已保存自动机，否则构建后保存到该路径
+    """
+    if cache_path and os.path.exists(cache_path):
+        try:
+            ac = AhoCorasick.load(cache_path)
+            if ac.fingerprint == lexicon_fingerprint(words):
+                return ac
+            print(f"词表已变化，重新构建AC自动机: {cache_path}")
+        except (OSError, ValueError) as e:
+            print(f"加载AC自动机失败，重新构建: {e}")
+
+    ac = AhoCorasick()
+    for word in words:
+        ac.add_pattern(word)
+    ac.build()
+
+    if cache_path:
+        try:
+            ac.save(cache_path)
+        except OSError as e:
+            print(f"保存AC自动机失败: {e}")
+    return ac
@@ -3,104 +3,14 @@
 """
 import os
 import re
+from bisect import bisect_right
+from collections import Counter
+from itertools import accumulate
 from typing import Dict, List, Set, Tuple
-from collections import defaultdict
 
 # 修复导入路径
 from text_quality_filter.utils.sensitive_filter import DFAFilter
-
-class AhoCorasick:
-    """
-    Aho-Corasick算法实现，用于高效多模式匹配
-    """
-    def __init__(self):
-        self.trie = {}
-        self.fail = {}
-        self.output = defaultdict(set)
-        self.depth = {}
-        self.built = False
-    
-    def add_pattern(self, pattern: str, pattern_id=None):
-        """
-        添加模式串
-        """
-        node = self.trie
-        for i, char in enumerate(pattern):
-            if char not in node:
-                node[char] = {}
-            node = node[char]
-            self.depth[id(node)] = i + 1
-        
-        # 设置输出
-        pattern_id = pattern_id if pattern_id is not None else pattern
-        self.output[id(node)].add(pattern_id)
-    
-    def build(self):
-        """
-        构建失败指针
-        """
-        if self.built:
-            return
-        
-        # 构建BFS队列
-        queue = []
-        for k, v in self.trie.items():
-            self.fail[id(v)] = self.trie
-            queue.append(v)
-        
-        # BFS构建失败指针
-        while queue:
-            current = queue.pop(0)
-            for char, node in current.items():
-                queue.append(node)
-                
-                # 获取父节点的失败指针
-                failure = self.fail[id(current)]
-                
-                # 沿着失败指针回溯，直到找到一个节点有相同的出边
-                while failure != self.trie and char not in failure:
-                    failure = self.fail[id(failure)]
-                
-                # 如果找到了这样的节点，设置失败指针
-                self.fail[id(node)] = failure[char] if char in failure else self.trie
-                
-                # 合并输出
-                if id(self.fail[id(node)]) in self.output:
-                    self.output[id(node)].update(self.output[id(self.fail[id(node)])])
-        
-        self.built = True
-    
-    def search(self, text: str) -> List[Tuple[int, str]]:
-        """
-        在文本中搜索所有模式串
-        Returns:
-            List of (position, pattern)
-        """
-        if not self.built:
-            self.build()
-        
-        results = []
-        node = self.trie
-        
-        for i, char in enumerate(text):
-            # 回溯失败指针直到找到匹配或回到根节点
-            while node != self.trie and char not in node:
-                node = self.fail[id(node)]
-            
-            # 如果找到匹配，更新节点
-            if char in node:
-                node = node[char]
-            else:
-                continue
-            
-            # 检查是否有匹配的模式
-            if id(node) in self.output:
-                for pattern in self.output[id(node)]:
-                    depth = self.depth[id(node)]
-                    start_pos = i - depth + 1
-                    results.append((start_pos, pattern))
-        
-        return results
+from text_quality_filter.utils.aho_corasick import AhoCorasick, cache_path_for, load_or_build
 
 class FeatureWordsDetector:
     """
@@ -115,13 +25,19 @@ class FeatureWordsDetector:
         self.feature_words_path = config.get("feature_words_path", "")
         self.max_feature_words_per_line = config.get("max_feature_words_per_line", 0.1)
         self.use_dfa_filter = config.get("use_dfa_filter", True)
+        # AC自动机的保存路径，词表未变时直接内存映射加载，不重新构建；
+        # DFA过滤器的词表是小写后的，两种方式各存一个文件（xxx.dfa.ac / xxx.ac.ac），互不覆盖
+        self.ac_cache_path = config.get("ac_cache_path")
+        
+        # 最近一次 check_feature_words 的 (文本, 结果)
+        self._last_check = None
         
         # 加载特征词
         self.feature_words = self._load_words(self.feature_words_path)
         
         # 根据配置决定使用哪种特征词过滤方式
         if self.use_dfa_filter:
-            self.feature_filter = DFAFilter()
+            self.feature_filter = DFAFilter(cache_path=cache_path_for(self.ac_cache_path, "dfa"))
             self.feature_filter.parse_list(list(self.feature_words))
             self.feature_ac = None
         else:
@@ -143,26 +59,23 @@ class FeatureWordsDetector:
     
     def _build_ac(self, words: Set[str]) -> AhoCorasick:
         """
-        构建AC自动机
+        构建AC自动机，配置了 ac_cache_path 时优先加载与当前词表一致的已保存自动机，否则构建后保存
         """
-        ac = AhoCorasick()
-        for word in words:
-            ac.add_pattern(word)
-        ac.build()
-        return ac
+        return load_or_build(words, cache_path_for(self.ac_cache_path, "ac"))
     
     def detect_feature_words(self, text: str) -> List[Tuple[int, str]]:
         """
         检测特征词
+        Returns:
+            (位置, 特征词) 列表，按位置排序；DFA过滤器在小写文本上匹配，位置和特征词都对应 text.lower()
         """
         if not self.feature_words:
             return []
         
         if self.use_dfa_filter:
             # 使用DFA过滤器
-            _, feature_words = self.feature_filter.count_sensitive_words(text)
-            # 转换格式为 (0, word) 以保持API兼容
-            return [(0, word) for word in feature_words]
+            lowered = text.lower()
+            return [(start, lowered[start:end]) for start, end in self.feature_filter.find_spans(lowered)]
         else:
             # 使用AC自动机
             return self.feature_ac.search(text)
@@ -170,48 +83,42 @@ class FeatureWordsDetector:
     def check_feature_words(self, text: str) -> Tuple[bool, Dict]:
         """
         检查是否包含过多特征词
+        整段文本只匹配一遍，按换行符位置把每个匹配归到所在行；同一文本的结果会被缓存，
+        get_feature_score 紧接着 filter 调用时不再重复匹配
         """
         if not self.feature_words:
             return True, {"feature_count": 0, "feature_words": []}
         
+        if self._last_check is not None and self._last_check[0] == text:
+            return self._last_check[1]
+        
         feature_matches = self.detect_feature_words(text)
         feature_words = [word for _, word in feature_matches]
         
-        # 计算每行特征词数量
-        lines = text.split('\n')
-        line_feature_counts = []
-        
-        for line in lines:
-            if not line.strip():
-                continue
-            
-            if self.use_dfa_filter:
-                # 使用DFA过滤器直接检测每行
-                count, _ = self.feature_filter.count_sensitive_words(line)
-                line_feature_counts.append(count)
-            else:
-                # 使用AC自动机结果，需要计算每行的特征词
-                count = 0
-                for _, word in feature_matches:
-                    if word in line:
-                        count += 1
-                line_feature_counts.append(count)
+        # 计算每行特征词数量：每行结束位置（含换行符）的前缀和，匹配起点二分查找所在行
+        scanned = text.lower() if self.use_dfa_filter else text
+        line_ends = list(accumulate(len(line) + 1 for line in scanned.split('\n')))
+        line_feature_counts = Counter(bisect_right(line_ends, start) for start, _ in feature_matches)
         
         # 有效行数(至少5个字符)
+        lines = text.split('\n')
         valid_lines = [line for line in lines if len(line.strip()) >= 5]
         valid_line_count = len(valid_lines)
         
         # 计算平均每行特征词数量
-        avg_feature_per_line = sum(line_feature_counts) / valid_line_count if valid_line_count > 0 else 0
+        avg_feature_per_line = sum(line_feature_counts.values()) / valid_line_count if valid_line_count > 0 else 0
         
         # 判断是否超过阈值
         is_good = avg_feature_per_line <= self.max_feature_words_per_line
         
-        return is_good, {
+        result = (is_good, {
             "feature_count": len(feature_words),
             "feature_words": feature_words,
-            "avg_per_line": avg_feature_per_line
-        }
+            "avg_per_line": avg_feature_per_line,
+            "max_per_line": max(line_feature_counts.values(), default=0)
+        })
+        self._last_check = (text, result)
+        return result
     
     def filter(self, text: str) -> Tuple[bool, Dict]:
         """
@@ -265,8 +172,9 @@ class FeatureWordsDetector:
         
         # 对高权重词汇计数
         high_weight_count = 0
+        lowered = text.lower()
         for word in high_weight_keywords:
-            if word in text.lower():
+            if word in lowered:
                 high_weight_count += 3  # 高权重词计3倍
         
         # 修正后的特征词计数（包含权重）
@@ -9,6 +9,8 @@ import torch
 from typing import Dict, Tuple
 from transformers import AutoModelForCausalLM, AutoTokenizer
 
+from text_quality_filter.utils.spam_patterns import ALL_SPAM_PATTERNS, has_spam_pattern
+
 class LMPPLPerplexityCalculator:
     """使用预训练语言模型计算困惑度的计算器"""
     
@@ -157,24 +159,9 @@ class LMPPLPerplexityCalculator:
         """
         检查文本是否包含常见垃圾文本特征
         """
-        spam_patterns = [
-            r'\d+\s*区\s*\d+',  # 例如 "99区99"
-            r'在线\s*播放',
-            r'视频\s*一区\s*二区',
-            r'久久+久+',
-            r'不卡\s*一区\s*二区',
-            r'精品\s*视频\s*在线',
-            r'日本\s*韩国\s*欧美',
-            r'激情\s*小说',
-            r'成人\s*视频',
-            r'在线\s*观看',
-            r'一本\s*道',
-            r'中文\s*字幕'
-        ]
-        
-        for pattern in spam_patterns:
-            if re.search(pattern, text):
-                return True
+        # 特征正则与 RuleFilter 共用一次合并扫描，结果按文档缓存
+        if has_spam_pattern(text, ALL_SPAM_PATTERNS):
+            return True
         
         # 检查垂直线分隔的文本
         if "|" in text and text.count("|") / len(text) > 0.01:
@@ -202,13 +189,14 @@ class LMPPLPerplexityCalculator:
         is_good = perplexity <= self.ppl_threshold
         
         # 额外检查：如果文本中包含垃圾特征，即使困惑度较低也判定为不通过
-        if is_good and self._has_spam_patterns(text):
+        has_spam = self._has_spam_patterns(text)
+        if is_good and has_spam:
             is_good = False
         
         return is_good, {
             "perplexity": perplexity,
             "threshold": self.ppl_threshold,
-            "has_spam_patterns": self._has_spam_patterns(text)
+            "has_spam_patterns": has_spam
         }
     
     def get_perplexity_score(self, text: str) -> float:
@@ -0,0 +1,294 @@
+"""
+语料级去重模块
+用字符 shingle 的 MinHash 签名 + 分段 LSH 分桶检测近似重复文档，不做两两比较
+- 完全重复：归一化文本的哈希命中即判为重复
+- 近似重复：任一分段的桶中已有文档时，用签名估计 Jaccard 相似度，超过阈值判为重复
+- 只有保留下来的文档进入索引，先出现的文档被保留
+索引保存在 SQLite 数据库中，可跨多次运行累积，中断后重新运行会跳过已处理的文档
+"""
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import fnmatch
+import numpy as np
+from tqdm import tqdm
+from typing import Dict, Iterator, Tuple
+from shard_store import ShardWriter, list_shards, iter_shard
+
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# 计算签名时每次处理的 shingle 数，限制临时矩阵的大小
+_SHINGLE_CHUNK = 4096
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, doc_id TEXT UNIQUE, type TEXT, duplicate_of TEXT,
+                                 similarity REAL, signature BLOB);
+CREATE TABLE IF NOT EXISTS exact (hash INTEGER PRIMARY KEY, doc INTEGER);
+CREATE TABLE IF NOT EXISTS buckets (key INTEGER, doc INTEGER, PRIMARY KEY (key, doc)) WITHOUT ROWID;
+"""
+
+
+def _hash64(data: bytes, salt: bytes = b'') -> int:
+    # SQLite 的 INTEGER 是有符号 64 位
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8, salt=salt).digest(), 'little', signed=True)
+
+
+class MinHashDeduplicator:
+    """MinHash LSH 去重器"""
+
+    def __init__(self, config: Dict):
+        """
+        初始化
+        Args:
+            config: 配置字典，见 config.DEDUP_CONFIG
+        """
+        self.db_path = config.get("db_path", "minhash_dedup.sqlite")
+        self.num_perm = config.get("num_perm", 128)
+        self.bands = config.get("bands", 16)
+        self.shingle_size = config.get("shingle_size", 5)
+        self.threshold = config.get("threshold", 0.8)
+        self.seed = config.get("seed", 42)
+        self.commit_every = config.get("commit_every", 10000)
+        if self.num_perm % self.bands != 0:
+            raise ValueError(f"num_perm ({self.num_perm}) 必须是 bands ({self.bands}) 的整数倍")
+        self.rows = self.num_perm // self.bands
+
+        # 排列哈希 h(x) = (a * x + b) mod 2^32，a 为奇数时是 32 位整数上的一一映射
+        rng = np.random.RandomState(self.seed)
+        self.a = (rng.randint(0, 1 << 31, size=self.num_perm, dtype=np.uint64) * 2 + 1).astype(np.uint32)[:, None]
+        self.b = rng.randint(0, 1 << 32, size=self.num_perm, dtype=np.uint64).astype(np.uint32)[:, None]
+
+        db_dir = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._check_params()
+        self._pending = 0
+
+    def _check_params(self):
+        """
+        参数不同的签名不可比较，已有索引时要求参数一致
+        """
+        params = {"num_perm": self.num_perm, "bands": self.bands,
+                  "shingle_size": self.shingle_size, "seed": self.seed}
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'params'").fetchone()
+        if row is None:
+            self.conn.execute("INSERT INTO meta VALUES ('params', ?)", (json.dumps(params),))
+            self.conn.commit()
+        elif json.loads(row[0]) != params:
+            raise ValueError(f"索引 {self.db_path} 的参数 {row[0]} 与当前配置 {params} 不一致")
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        归一化：去掉所有空白并转为小写
+        """
+        return re.sub(r'\s+', '', text).lower()
+
+    def shingle_hashes(self, text: str) -> np.ndarray:
+        """
+        计算归一化文本所有字符 shingle 的 32 位哈希（去重后）
+        按码位做多项式滚动哈希，整段向量化计算，不逐个切片
+        """
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        k = min(self.shingle_size, len(codes))
+        if k == 0:
+            return np.zeros(0, dtype=np.uint32)
+        n = len(codes) - k + 1
+        hashes = np.zeros(n, dtype=np.uint64)
+        for j in range(k):
+            hashes = (hashes * np.uint64(1000003) + codes[j:j + n]) & _MAX_HASH
+        # murmur3 finalizer 打散低位
+        hashes ^= hashes >> np.uint64(16)
+        hashes = (hashes * np.uint64(0x85ebca6b)) & _MAX_HASH
+        hashes ^= hashes >> np.uint64(13)
+        hashes = (hashes * np.uint64(0xc2b2ae35)) & _MAX_HASH
+        hashes ^= hashes >> np.uint64(16)
+        return np.unique(hashes.astype(np.uint32))
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        计算 MinHash 签名
+        Args:
+            text: 归一化后的文本
+        Returns:
+            长度为 num_perm 的 uint32 数组
+        """
+        hashes = self.shingle_hashes(text)
+        signature = np.full(self.num_perm, 0xFFFFFFFF, dtype=np.uint32)
+        for start in range(0, len(hashes), _SHINGLE_CHUNK):
+            chunk = hashes[None, start:start + _SHINGLE_CHUNK]
+            # uint32 乘加自然按 2^32 取模
+            permuted = self.a * chunk + self.b
+            np.minimum(signature, permuted.min(axis=1), out=signature)
+        return signature
+
+    def band_keys(self, signature: np.ndarray):
+        """
+        把签名切成 bands 段，每段哈希为一个桶键，段号作为盐区分不同分段
+        """
+        data = signature.tobytes()
+        step = self.rows * 4
+        return [_hash64(data[i * step:(i + 1) * step], salt=i.to_bytes(2, 'little'))
+                for i in range(self.bands)]
+
+    def check(self, doc_id: str, text: str) -> Tuple[bool, Dict]:
+        """
+        检查文档是否与已索引文档重复，不重复时加入索引
+        同一个 doc_id 再次检查时直接返回上次的结果
+        Args:
+            doc_id: 文档标识（文件名或分片中的 id）
+            text: 文档文本
+        Returns:
+            (是否重复, 详细信息)
+        """
+        row = self.conn.execute("SELECT type, duplicate_of, similarity FROM docs WHERE doc_id = ?",
+                                (doc_id,)).fetchone()
+        if row is not None:
+            return row[1] is not None, {"type": row[0], "duplicate_of": row[1], "similarity": row[2], "cached": True}
+
+        normalized = self.normalize(text)
+        exact_hash = _hash64(normalized.encode('utf-8', errors='surrogatepass'))
+        row = self.conn.execute(
+            "SELECT docs.doc_id FROM exact JOIN docs ON docs.id = exact.doc WHERE exact.hash = ?",
+            (exact_hash,)).fetchone()
+        if row is not None:
+            self._record(doc_id, "exact", row[0], 1.0)
+            return True, {"type": "exact", "duplicate_of": row[0], "similarity": 1.0}
+
+        signature = self.signature(normalized)
+        keys = self.band_keys(signature)
+        best_doc, best_similarity = None, 0.0
+        candidates = set()
+        for key in keys:
+            for (doc,) in self.conn.execute("SELECT doc FROM buckets WHERE key = ?", (key,)):
+                candidates.add(doc)
+        for doc in candidates:
+            candidate_id, blob = self.conn.execute(
+                "SELECT doc_id, signature FROM docs WHERE id = ?", (doc,)).fetchone()
+            similarity = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == signature))
+            if similarity > best_similarity:
+                best_doc, best_similarity = candidate_id, similarity
+        if best_doc is not None and best_similarity >= self.threshold:
+            self._record(doc_id, "near", best_doc, best_similarity)
+            return True, {"type": "near", "duplicate_of": best_doc, "similarity": best_similarity}
+
+        cursor = self.conn.execute("INSERT INTO docs (doc_id, signature) VALUES (?, ?)",
+                                   (doc_id, signature.tobytes()))
+        doc = cursor.lastrowid
+        self.conn.execute("INSERT OR IGNORE INTO exact VALUES (?, ?)", (exact_hash, doc))
+        self.conn.executemany("INSERT OR IGNORE INTO buckets VALUES (?, ?)", [(key, doc) for key in keys])
+        self._tick()
+        return False, {"type": None, "duplicate_of": None, "similarity": best_similarity}
+
+    def _record(self, doc_id: str, dup_type: str, duplicate_of: str, similarity: float):
+        self.conn.execute("INSERT INTO docs (doc_id, type, duplicate_of, similarity) VALUES (?, ?, ?, ?)",
+                          (doc_id, dup_type, duplicate_of, similarity))
+        self._tick()
+
+    def _tick(self):
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._pending = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_files(input_dir: str, file_pattern: str = "*.txt") -> Iterator[str]:
+    """
+    流式列出目录中符合模式的文件，目录中文件很多时不一次性生成完整列表
+    """
+    with os.scandir(input_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and fnmatch.fnmatch(entry.name, file_pattern):
+                yield entry.path
+
+
+def dedup_corpus(input_dir: str, output_dir: str, config: Dict, file_pattern: str = "*.txt") -> Dict:
+    """
+    对目录中的文档去重，保留的文档写入输出目录，重复关系逐行写入 duplicates.jsonl
+    每个文档先提交索引再写出并刷新输出，进程被杀掉后重新运行不会把已写出的文档再写一遍
+    Args:
+        input_dir: 输入目录，包含分片文件（见 shard_store）时按分片读取，输出也写为分片
+        output_dir: 输出目录
+        config: 去重配置
+        file_pattern: 文件匹配模式
+
+    Returns:
+        去重结果统计
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stats = {"total": 0, "kept": 0, "exact_duplicate": 0, "near_duplicate": 0, "error": 0}
+
+    shards = list_shards(input_dir)
+    if shards:
+        docs = ((doc.get("id"), doc) for shard_path in shards for doc in iter_shard(shard_path))
+        writer = ShardWriter(output_dir)
+    else:
+        docs = ((os.path.basename(path), path) for path in iter_files(input_dir, file_pattern))
+        writer = None
+
+    duplicates_path = os.path.join(output_dir, "duplicates.jsonl")
+    with MinHashDeduplicator(config) as deduplicator, open(duplicates_path, 'a', encoding='utf-8') as dup_f:
+        try:
+            for doc_id, doc in tqdm(docs, desc="去重"):
+                stats["total"] += 1
+                try:
+                    if writer is not None:
+                        if doc_id is None:
+                            # 没有 id 的文档无法跨运行识别，不能用 "None" 代替，否则互相判为已处理
+                            raise ValueError("分片中的文档缺少 id")
+                        text = doc.get("text", "")
+                    else:
+                        with open(doc, 'r', encoding='utf-8', errors='ignore') as f:
+                            text = f.read()
+                    is_duplicate, info = deduplicator.check(str(doc_id), text)
+                    if is_duplicate:
+                        stats[f"{info['type']}_duplicate"] += 1
+                    else:
+                        stats["kept"] += 1
+                    if info.get("cached"):
+                        # 上次运行已处理过，输出已经写过
+                        continue
+                    # 索引行落盘后再写输出，避免输出已写出而索引未提交，重新运行时重复写出
+                    deduplicator.commit()
+                    if is_duplicate:
+                        dup_f.write(json.dumps({"id": doc_id, **info}, ensure_ascii=False) + "\n")
+                        dup_f.flush()
+                        continue
+                    if writer is not None:
+                        writer.write(doc)
+                        writer.flush()
+                    else:
+                        with open(os.path.join(output_dir, doc_id), 'w', encoding='utf-8') as f:
+                            f.write(text)
+                except Exception as e:
+                    print(f"去重文档 {doc_id} 失败: {e}")
+                    stats["error"] += 1
+        finally:
+            if writer is not None:
+                writer.close()
+
+    stats_path = os.path.join(output_dir, "dedup_stats.json")
+    with open(stats_path, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, ensure_ascii=False, indent=2)
+
+    print(f"去重完成：共 {stats['total']} 个文档，保留 {stats['kept']} 个，完全重复 {stats['exact_duplicate']} 个，"
+          f"近似重复 {stats['near_duplicate']} 个，错误 {stats['error']} 个")
+    return stats
@@ -1,9 +1,112 @@
 """
 基础规则过滤模块
+filter 和 get_rule_score 所需的全部计数由 compute_stats 一次得到（RuleStats），两者共用同一个统计对象：
+文本先转为码点数组，中文、符号、'|'、','、表情符号、换行和空白的计数都在这个数组上向量化完成，
+只有 URL 仍需一次正则扫描；单独的 check_* 方法保留逐项扫描的实现
+内部重复率用码点上的滚动哈希计算 n-gram 去重数（见 count_ngrams），不再为每个 n-gram 创建子串
 """
 import re
 import string
-from typing import Dict, Tuple, List, Set, Union
+import numpy as np
+from typing import Dict, Tuple, List, Set, Union, Optional
+
+from text_quality_filter.utils.spam_patterns import SEO_SPAM_PATTERNS, has_spam_pattern
+
+# 表情符号码点区间，与 emoji_pattern 保持一致
+EMOJI_RANGES = [
+    (0x1F600, 0x1F64F), (0x1F300, 0x1F5FF), (0x1F680, 0x1F6FF), (0x1F700, 0x1F77F), (0x1F780, 0x1F7FF),
+    (0x1F800, 0x1F8FF), (0x1F900, 0x1F9FF), (0x1FA00, 0x1FA6F), (0x1FA70, 0x1FAFF), (0x2702, 0x27B0),
+    (0x24C2, 0x1F251),
+]
+
+# 码点类别表：与正则的 \s 和 \w 判定一致（str.isspace / str.isalnum 或 '_'），第一次使用时建立
+CHAR_SPACE = 1
+CHAR_WORD = 2
+_char_classes = None
+
+
+def _get_char_classes() -> np.ndarray:
+    global _char_classes
+    if _char_classes is None:
+        _char_classes = np.fromiter(
+            (CHAR_WORD if (c := chr(i)).isalnum() or c == '_' else CHAR_SPACE if c.isspace() else 0
+             for i in range(0x110000)),
+            dtype=np.uint8, count=0x110000)
+    return _char_classes
+
+
+def _code_points(text: str) -> np.ndarray:
+    """
+    文本转为 uint32 码点数组
+    """
+    return np.frombuffer(text.encode('utf-32-le', errors='surrogatepass'), dtype=np.uint32)
+
+
+# n-gram 哈希参数：码点先经 splitmix64 打散，再按多项式 h = h * BASE + x (mod 2^64) 滚动
+_NGRAM_BASE = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def _mix(cp: np.ndarray) -> np.ndarray:
+    x = cp.astype(np.uint64) + _NGRAM_BASE
+    x = (x ^ (x >> np.uint64(30))) * _MIX_1
+    x = (x ^ (x >> np.uint64(27))) * _MIX_2
+    return x ^ (x >> np.uint64(31))
+
+
+def count_ngrams(cp: np.ndarray, n: int = 13) -> Tuple[int, int]:
+    """
+    统计字符 n-gram 的总数和去重后的个数
+    对码点做 Rabin-Karp 式的多项式哈希，所有窗口同时按 Horner 法展开（n 次向量运算），只保存 64 位整数哈希，
+    内存约为每个字符 8 字节的若干倍，与 n 无关；不同 n-gram 的哈希碰撞概率约为 窗口数^2 / 2^64，可以忽略
+    Args:
+        cp: 码点数组（见 _code_points）
+        n: n-gram 长度
+
+    Returns:
+        (n-gram 总数, 去重后的个数)，文本短于 n 时为 (0, 0)
+    """
+    total = len(cp) - n + 1
+    if total <= 0:
+        return 0, 0
+    mixed = _mix(cp)
+    hashes = mixed[:total].copy()
+    for j in range(1, n):
+        hashes *= _NGRAM_BASE
+        hashes += mixed[j:j + total]
+    return total, len(np.unique(hashes))
+
+
+class RuleStats:
+    """
+    一篇文本的规则统计量，由 RuleFilter.compute_stats 一次计算得到
+    """
+    def __init__(self, length: int, chinese: int, symbols: int, vertical_bars: int, commas: int,
+                 urls: int, emojis: int, nonempty_lines: int, nonempty_line_chars: int,
+                 ngram_total: int, ngram_unique: int):
+        self.length = length
+        self.chinese = chinese
+        self.symbols = symbols
+        self.vertical_bars = vertical_bars
+        self.commas = commas
+        self.urls = urls
+        self.emojis = emojis
+        self.nonempty_lines = nonempty_lines
+        self.nonempty_line_chars = nonempty_line_chars
+        self.ngram_total = ngram_total
+        self.ngram_unique = ngram_unique
+
+    def ratio(self, count: int) -> float:
+        return count / self.length if self.length else 0
+
+    @property
+    def avg_line_length(self) -> float:
+        return self.nonempty_line_chars / self.nonempty_lines if self.nonempty_lines else 0
+
+    @property
+    def dup_ratio(self) -> float:
+        return 1 - self.ngram_unique / self.ngram_total if self.ngram_total else 0
 
 class RuleFilter:
     """
@@ -30,7 +133,54 @@ class RuleFilter:
         self.symbol_pattern = re.compile(r'[^\w\s\u4e00-\u9fff]')
         self.url_pattern = re.compile(r'https?://\S+|www\.\S+|[a-zA-Z0-9][a-zA-Z0-9-]{1,61}[a-zA-Z0-9]\.[a-zA-Z]{2,}')
         self.emoji_pattern = re.compile(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F700-\U0001F77F\U0001F780-\U0001F7FF\U0001F800-\U0001F8FF\U0001F900-\U0001F9FF\U0001FA00-\U0001FA6F\U0001FA70-\U0001FAFF\U00002702-\U000027B0\U000024C2-\U0001F251]+')
-        
+        # 内部重复检测的 n-gram 长度
+        self.ngram_size = config.get("dup_ngram_size", 13)
+
+    def compute_stats(self, text: str) -> RuleStats:
+        """
+        一次计算 filter 和 get_rule_score 所需的全部统计量
+        Args:
+            text: 输入文本
+
+        Returns:
+            RuleStats 统计对象
+        """
+        cp = _code_points(text)
+        length = len(cp)
+        classes = _get_char_classes()[cp]
+        is_space = classes == CHAR_SPACE
+
+        # 表情符号按连续片段计数，与 emoji_pattern.findall 一致
+        is_emoji = np.zeros(length, dtype=bool)
+        for low, high in EMOJI_RANGES:
+            is_emoji |= (cp >= low) & (cp <= high)
+        emojis = int(np.count_nonzero(is_emoji[1:] & ~is_emoji[:-1])) + int(length > 0 and is_emoji[0])
+
+        # 按 '\n' 分行，含非空白字符的行计为非空行
+        newlines = np.flatnonzero(cp == 10)
+        starts = np.concatenate(([0], newlines + 1))
+        ends = np.concatenate((newlines, [length]))
+        nonspace_before = np.concatenate(([0], np.cumsum(~is_space)))
+        nonempty = nonspace_before[ends] > nonspace_before[starts]
+
+        ngram_total, ngram_unique = count_ngrams(cp, self.ngram_size)
+
+        # 符号：既不是 \w 也不是 \s 的字符，CJK 基本区中未分配的码点也不算符号，与 symbol_pattern 一致
+        is_chinese = (cp >= 0x4E00) & (cp <= 0x9FFF)
+        return RuleStats(
+            length=length,
+            chinese=int(np.count_nonzero(is_chinese)),
+            symbols=int(np.count_nonzero((classes == 0) & ~is_chinese)),
+            vertical_bars=int(np.count_nonzero(cp == 124)),
+            commas=int(np.count_nonzero(cp == 44)),
+            urls=len(self.url_pattern.findall(text)),
+            emojis=emojis,
+            nonempty_lines=int(np.count_nonzero(nonempty)),
+            nonempty_line_chars=int((ends - starts)[nonempty].sum()),
+            ngram_total=ngram_total,
+            ngram_unique=ngram_unique,
+        )
+
     def check_text_length(self, text: str) -> Tuple[bool, str]:
         """
         检查文本长度是否符合要求
@@ -178,195 +328,181 @@ class RuleFilter:
     
     def check_internal_duplication(self, text: str) -> Tuple[bool, str]:
         """
-        检查内部重复率是否符合要求，使用13-gram检测
+        检查内部重复率是否符合要求，使用 n-gram（默认13-gram）检测
         Args:
             text: 输入文本
         
         Returns:
             (是否通过, 失败原因)
         """
-        if len(text) < 13:
-            return True, ""  # 文本太短，不检查重复
-        
-        # 使用13-gram检测重复
-        n = 13
-        ngrams = [text[i:i+n] for i in range(len(text)-n+1)]
-        unique_ngrams = set(ngrams)
-        
-        if not ngrams:
+        # 文本短于 n 时不检查重复
+        total, unique = count_ngrams(_code_points(text), self.ngram_size)
+        if not total:
             return True, ""
         
         # 计算重复率
-        dup_ratio = 1 - len(unique_ngrams) / len(ngrams)
+        dup_ratio = 1 - unique / total
         
         if dup_ratio > self.max_internal_dup_ratio:
             return False, f"内部重复率({dup_ratio:.2f})大于最大要求({self.max_internal_dup_ratio})"
         return True, ""
     
-    def filter(self, text: str) -> Tuple[bool, Dict]:
+    def filter(self, text: str, stats: Optional[RuleStats] = None) -> Tuple[bool, Dict]:
         """
         对文本应用所有规则过滤
         Args:
             text: 输入文本
+            stats: 已计算的统计对象，为 None 时计算一次
         
         Returns:
             (是否通过所有规则, 详细结果字典)
         """
+        if stats is None:
+            stats = self.compute_stats(text)
         results = {}
-        
-        # 应用所有规则
-        length_check, length_reason = self.check_text_length(text)
-        results["length_check"] = {"pass": length_check, "reason": length_reason}
-        
-        avg_line_check, avg_line_reason = self.check_avg_line_length(text)
-        results["avg_line_check"] = {"pass": avg_line_check, "reason": avg_line_reason}
-        
-        chinese_check, chinese_reason = self.check_chinese_ratio(text)
-        results["chinese_check"] = {"pass": chinese_check, "reason": chinese_reason}
-        
-        symbol_check, symbol_reason = self.check_symbol_ratio(text)
-        results["symbol_check"] = {"pass": symbol_check, "reason": symbol_reason}
-        
-        dup_check, dup_reason = self.check_internal_duplication(text)
-        results["dup_check"] = {"pass": dup_check, "reason": dup_reason}
-        
-        # 检查"|"符号比例
-        vbar_check, vbar_reason = self.check_vertical_bar_ratio(text)
-        results["vbar_check"] = {"pass": vbar_check, "reason": vbar_reason}
-        
-        # 新增检查项
-        comma_check, comma_reason = self.check_comma_ratio(text)
-        results["comma_check"] = {"pass": comma_check, "reason": comma_reason}
-        
-        url_check, url_reason = self.check_url_density(text)
-        results["url_check"] = {"pass": url_check, "reason": url_reason}
-        
-        emoji_check, emoji_reason = self.check_emoji_ratio(text)
-        results["emoji_check"] = {"pass": emoji_check, "reason": emoji_reason}
-        
+
+        def record(name, passed, reason):
+            results[name] = {"pass": passed, "reason": reason}
+
+        if stats.length < self.min_text_length:
+            record("length_check", False, f"文本长度({stats.length})小于最小长度要求({self.min_text_length})")
+        else:
+            record("length_check", True, "")
+
+        if not stats.nonempty_lines:
+            record("avg_line_check", False, "文本没有非空行")
+        elif stats.avg_line_length < self.min_avg_line_length:
+            record("avg_line_check", False,
+                   f"平均行长度({stats.avg_line_length:.2f})小于最小要求({self.min_avg_line_length})")
+        else:
+            record("avg_line_check", True, "")
+
+        # 以下比例类检查在空文本时一律判为失败
+        checks = [
+            ("chinese_check", stats.ratio(stats.chinese) < self.min_chinese_ratio,
+             lambda r: f"中文字符比例({r:.2f})小于最小要求({self.min_chinese_ratio})", stats.chinese),
+            ("symbol_check", stats.ratio(stats.symbols) > self.max_symbol_ratio,
+             lambda r: f"符号比例({r:.2f})大于最大要求({self.max_symbol_ratio})", stats.symbols),
+        ]
+        for name, failed, reason, count in checks:
+            if not stats.length:
+                record(name, False, "文本为空")
+            elif failed:
+                record(name, False, reason(stats.ratio(count)))
+            else:
+                record(name, True, "")
+
+        if stats.dup_ratio > self.max_internal_dup_ratio:
+            record("dup_check", False, f"内部重复率({stats.dup_ratio:.2f})大于最大要求({self.max_internal_dup_ratio})")
+        else:
+            record("dup_check", True, "")
+
+        checks = [
+            ("vbar_check", stats.vertical_bars, self.max_vertical_bar_ratio,
+             lambda r: f"'|'符号比例({r:.4f})超过阈值({self.max_vertical_bar_ratio})"),
+            ("comma_check", stats.commas, self.max_comma_ratio,
+             lambda r: f"','符号比例({r:.4f})超过阈值({self.max_comma_ratio})"),
+            ("url_check", stats.urls, self.max_url_density,
+             lambda r: f"URL密度({r:.4f})超过阈值({self.max_url_density})"),
+            ("emoji_check", stats.emojis, self.max_emoji_ratio,
+             lambda r: f"表情符号比例({r:.4f})超过阈值({self.max_emoji_ratio})"),
+        ]
+        for name, count, limit, reason in checks:
+            if not stats.length:
+                record(name, False, "文本为空")
+            elif stats.ratio(count) > limit:
+                record(name, False, reason(stats.ratio(count)))
+            else:
+                record(name, True, "")
+
         # 整体结果
-        all_passed = all([
-            length_check, 
-            avg_line_check, 
-            chinese_check, 
-            symbol_check, 
-            dup_check,
-            vbar_check,  # 添加新检查条件
-            comma_check,
-            url_check,
-            emoji_check
-        ])
-        
+        all_passed = all(result["pass"] for result in results.values())
         return all_passed, results
     
-    def get_rule_score(self, text: str) -> float:
+    def get_rule_score(self, text: str, stats: Optional[RuleStats] = None) -> float:
         """
         获取规则评分，范围0-1，越高越好
         Args:
             text: 输入文本
+            stats: 已计算的统计对象，为 None 时计算一次
             
         Returns:
             规则评分，0-1之间
         """
-        passed, results = self.filter(text)
+        if stats is None:
+            stats = self.compute_stats(text)
+        return self.evaluate(text, stats)[2]
+
+    def evaluate(self, text: str, stats: Optional[RuleStats] = None) -> Tuple[bool, Dict, float]:
+        """
+        同时得到过滤结果和规则评分，两者共用一次统计
+        Args:
+            text: 输入文本
+            stats: 已计算的统计对象，为 None 时计算一次
+
+        Returns:
+            (是否通过所有规则, 详细结果字典, 规则评分)
+        """
+        if stats is None:
+            stats = self.compute_stats(text)
+        passed, results = self.filter(text, stats)
         if passed:
-            return 1.0
+            return passed, results, 1.0
         
         # 计算各个规则的得分
         scores = []
         weights = []
+
+        def ratio_score(check, ratio, limit, cap=1.0):
+            # 超过上限的比例类规则：得分为 上限/实际比例，最高为 cap
+            if results[check]["pass"]:
+                return 1.0
+            return max(0.0, min(cap, limit / ratio if ratio > 0 else 1.0))
         
         # 长度得分 (权重低)
-        if results["length_check"]["pass"]:
-            scores.append(1.0)
-        else:
-            text_len = len(text)
-            scores.append(min(1.0, text_len / self.min_text_length))
+        scores.append(1.0 if results["length_check"]["pass"] else min(1.0, stats.length / self.min_text_length))
         weights.append(0.05)
         
         # 平均行长度得分
         if results["avg_line_check"]["pass"]:
             scores.append(1.0)
         else:
-            lines = [line for line in text.split('\n') if line.strip()]
-            if lines:
-                avg_length = sum(len(line) for line in lines) / len(lines)
-                scores.append(min(1.0, avg_length / self.min_avg_line_length))
-            else:
-                scores.append(0.0)
+            scores.append(min(1.0, stats.avg_line_length / self.min_avg_line_length) if stats.nonempty_lines else 0.0)
         weights.append(0.1)
         
         # 中文比例得分 (权重高)
         if results["chinese_check"]["pass"]:
             scores.append(1.0)
         else:
-            chinese_chars = self.chinese_pattern.findall(text)
-            chinese_ratio = len(chinese_chars) / len(text) if text else 0
-            scores.append(min(1.0, chinese_ratio / self.min_chinese_ratio))
+            scores.append(min(1.0, stats.ratio(stats.chinese) / self.min_chinese_ratio))
         weights.append(0.15)
         
         # 符号比例得分
-        if results["symbol_check"]["pass"]:
+        symbol_ratio = stats.ratio(stats.symbols)
+        if results["symbol_check"]["pass"] or symbol_ratio == 0:
             scores.append(1.0)
         else:
-            symbols = self.symbol_pattern.findall(text)
-            symbol_ratio = len(symbols) / len(text) if text else 0
-            if symbol_ratio == 0:
-                scores.append(1.0)
-            else:
-                scores.append(max(0.0, min(1.0, self.max_symbol_ratio / symbol_ratio)))
+            scores.append(max(0.0, min(1.0, self.max_symbol_ratio / symbol_ratio)))
         weights.append(0.1)
         
         # 内部重复率得分
-        if results["dup_check"]["pass"]:
-            scores.append(1.0)
-        else:
-            if len(text) < 13:
-                scores.append(1.0)
-            else:
-                n = 13
-                ngrams = [text[i:i+n] for i in range(len(text)-n+1)]
-                unique_ngrams = set(ngrams)
-                dup_ratio = 1 - len(unique_ngrams) / len(ngrams) if ngrams else 0
-                scores.append(max(0.0, min(1.0, self.max_internal_dup_ratio / dup_ratio if dup_ratio > 0 else 1.0)))
+        scores.append(ratio_score("dup_check", stats.dup_ratio, self.max_internal_dup_ratio))
         weights.append(0.1)
         
-        # 垂直线符号比例得分 (权重高)
-        if results["vbar_check"]["pass"]:
-            scores.append(1.0)
-        else:
-            vertical_bars = text.count("|")
-            vertical_bar_ratio = vertical_bars / len(text) if text else 0
-            # 垂直线是严重的垃圾内容指标，失败时得分应该很低
-            scores.append(max(0.0, min(0.5, self.max_vertical_bar_ratio / vertical_bar_ratio if vertical_bar_ratio > 0 else 1.0)))
+        # 垂直线符号比例得分 (权重高)，垂直线是严重的垃圾内容指标，失败时得分应该很低
+        scores.append(ratio_score("vbar_check", stats.ratio(stats.vertical_bars), self.max_vertical_bar_ratio, 0.5))
         weights.append(0.2)
         
         # 逗号比例得分
-        if results["comma_check"]["pass"]:
-            scores.append(1.0)
-        else:
-            commas = text.count(",")
-            comma_ratio = commas / len(text) if text else 0
-            scores.append(max(0.0, min(1.0, self.max_comma_ratio / comma_ratio if comma_ratio > 0 else 1.0)))
+        scores.append(ratio_score("comma_check", stats.ratio(stats.commas), self.max_comma_ratio))
         weights.append(0.1)
         
-        # URL密度得分 (权重高)
-        if results["url_check"]["pass"]:
-            scores.append(1.0)
-        else:
-            urls = self.url_pattern.findall(text)
-            url_density = len(urls) / len(text) if text else 0
-            # URL过多是垃圾内容的强指标
-            scores.append(max(0.0, min(0.3, self.max_url_density / url_density if url_density > 0 else 1.0)))
+        # URL密度得分 (权重高)，URL过多是垃圾内容的强指标
+        scores.append(ratio_score("url_check", stats.ratio(stats.urls), self.max_url_density, 0.3))
         weights.append(0.1)
         
         # 表情符号比例得分
-        if results["emoji_check"]["pass"]:
-            scores.append(1.0)
-        else:
-            emojis = self.emoji_pattern.findall(text)
-            emoji_ratio = len(emojis) / len(text) if text else 0
-            scores.append(max(0.0, min(1.0, self.max_emoji_ratio / emoji_ratio if emoji_ratio > 0 else 1.0)))
+        scores.append(ratio_score("emoji_check", stats.ratio(stats.emojis), self.max_emoji_ratio))
         weights.append(0.1)
         
         # 计算加权平均分
@@ -376,30 +512,18 @@ class RuleFilter:
         is_obvious_spam = False
         
         # 检查垂直线符号
-        if "|" in text and text.count("|") / len(text) > self.max_vertical_bar_ratio * 2:
+        if stats.vertical_bars and stats.ratio(stats.vertical_bars) > self.max_vertical_bar_ratio * 2:
             is_obvious_spam = True
             
         # 检查URL数量
-        if len(self.url_pattern.findall(text)) / len(text) > self.max_url_density * 3:
+        if stats.ratio(stats.urls) > self.max_url_density * 3:
             is_obvious_spam = True
             
-        # 检查SEO垃圾文本特征
-        seo_spam_patterns = [
-            r'\d+\s*区\s*\d+',  # 例如 "99区99"
-            r'在线\s*播放',
-            r'视频\s*一区\s*二区',
-            r'久久+久+',
-            r'不卡\s*一区\s*二区',
-            r'精品\s*视频\s*在线',
-            r'日本\s*韩国\s*欧美'
-        ]
-        
-        for pattern in seo_spam_patterns:
-            if re.search(pattern, text):
-                is_obvious_spam = True
-                break
+        # 检查SEO垃圾文本特征，结果按文档缓存，困惑度检查复用同一次扫描
+        if has_spam_pattern(text, SEO_SPAM_PATTERNS):
+            is_obvious_spam = True
                 
         if is_obvious_spam:
             weighted_score = weighted_score * 0.3  # 如果是明显垃圾文本，分数大幅降低
             
-        return weighted_score 
\ No newline at end of file
+        return passed, results, weighted_score
@@ -1,20 +1,30 @@
 """
 敏感词过滤模块
 基于DFA算法实现的高效敏感词过滤
+敏感词编译为 Aho-Corasick 自动机（见 aho_corasick），整段文本只扫描一遍：
+从左到右取起始位置最靠左的敏感词，同一位置取最短的，与逐位置沿 trie 查找的结果一致，
+但不再从每个位置重新开始，也不再为每个位置复制剩余的文本，长文本上耗时随长度线性增长
 """
 import os
 from typing import List, Set, Dict, Any, Optional, Tuple
 
+from text_quality_filter.utils.aho_corasick import AhoCorasick, load_or_build
+
 class DFAFilter:
     """
     基于DFA算法的敏感词过滤器
     使用确定性有限自动机来保持算法性能稳定
     """
 
-    def __init__(self):
-        """初始化过滤器"""
-        self.keyword_chains = {}
-        self.delimit = '\x00'
+    def __init__(self, cache_path: Optional[str] = None):
+        """
+        初始化过滤器
+        Args:
+            cache_path: 可选的自动机保存路径，敏感词不变时直接加载，不重新构建
+        """
+        self.keywords = set()
+        self.cache_path = cache_path
+        self._automaton = None
 
     def add(self, keyword: str) -> None:
         """
@@ -27,21 +37,15 @@ class DFAFilter:
         if not chars:
             return
         
-        level = self.keyword_chains
-        for i in range(len(chars)):
-            if chars[i] in level:
-                level = level[chars[i]]
-            else:
-                if not isinstance(level, dict):
-                    break
-                for j in range(i, len(chars)):
-                    level[chars[j]] = {}
-                    last_level, last_char = level, chars[j]
-                    level = level[chars[j]]
-                last_level[last_char] = {self.delimit: 0}
-                break
-        if i == len(chars) - 1:
-            level[self.delimit] = 0
+        if chars not in self.keywords:
+            self.keywords.add(chars)
+            # 敏感词变化后在下次匹配时重新构建自动机
+            self._automaton = None
+
+    def _get_automaton(self) -> AhoCorasick:
+        if self._automaton is None:
+            self._automaton = load_or_build(self.keywords, self.cache_path)
+        return self._automaton
 
     def parse_file(self, path: str) -> None:
         """
@@ -69,6 +73,19 @@ class DFAFilter:
         for keyword in keywords:
             self.add(keyword.strip())
 
+    def find_spans(self, message: str) -> List[Tuple[int, int]]:
+        """
+        查找敏感词的位置
+        Args:
+            message: 已转为小写的文本
+            
+        Returns:
+            互不重叠的 (起始位置, 结束位置(不含)) 列表，按位置排序
+        """
+        if not self.keywords:
+            return []
+        return [(start, end) for start, end, _ in self._get_automaton().iter_leftmost_shortest(message)]
+
     def filter(self, message: str, repl: str = "*") -> str:
         """
         过滤文本中的敏感词
@@ -81,25 +98,12 @@ class DFAFilter:
         """
         message = message.lower()
         ret = []
-        start = 0
-        while start < len(message):
-            level = self.keyword_chains
-            step_ins = 0
-            for char in message[start:]:
-                if char in level:
-                    step_ins += 1
-                    if self.delimit not in level[char]:
-                        level = level[char]
-                    else:
-                        ret.append(repl * step_ins)
-                        start += step_ins - 1
-                        break
-                else:
-                    ret.append(message[start])
-                    break
-            else:
-                ret.append(message[start])
-            start += 1
+        last = 0
+        for start, end in self.find_spans(message):
+            ret.append(message[last:start])
+            ret.append(repl * (end - start))
+            last = end
+        ret.append(message[last:])
 
         return ''.join(ret)
     
@@ -113,25 +117,7 @@ class DFAFilter:
             检测到的敏感词列表
         """
         message = message.lower()
-        found_words = []
-        start = 0
-        while start < len(message):
-            level = self.keyword_chains
-            step_ins = 0
-            for char in message[start:]:
-                if char in level:
-                    step_ins += 1
-                    if self.delimit not in level[char]:
-                        level = level[char]
-                    else:
-                        found_words.append(message[start:start+step_ins])
-                        start += step_ins - 1
-                        break
-                else:
-                    break
-            start += 1
-        
-        return found_words
+        return [message[start:end] for start, end in self.find_spans(message)]
     
     def count_sensitive_words(self, message: str) -> Tuple[int, List[str]]:
         """
@@ -0,0 +1,114 @@
+"""
+SEO 垃圾文本特征的合并匹配
+RuleFilter 和 LMPPLPerplexityCalculator 原先各自逐条 re.search 同一批正则，同一文档会被扫描多次，
+这里把全部特征合成一个不带分组的正则交替式，一次扫描给出命中的全部特征，并按文档缓存结果供两者复用：
+- 交替式不能带命名分组，否则 re 无法用首字符集合跳过不可能匹配的位置，速度会慢二十多倍；
+  每个特征都以固定汉字开头，扫描到候选位置后按首字符只对少数几个特征做一次锚定匹配，确定具体命中了哪个
+- 以 \\d 开头的特征（如 "99区99"）同样会让首字符跳过失效，扫描时改为从 "区" 开始匹配，再向前检查数字
+- 每个命中位置的下一个字符都会重新搜索，特征之间互相重叠时也不会漏掉，结果与逐条 re.search 一致；
+  已命中的特征从交替式中去掉，垃圾文本中反复出现的同一特征不会被逐个处理
+"""
+import re
+from functools import lru_cache
+from typing import FrozenSet, Iterable
+
+# RuleFilter 与 LMPPLPerplexityCalculator 共用的 SEO 垃圾文本特征
+SEO_SPAM_PATTERNS = [
+    r'\d+\s*区\s*\d+',  # 例如 "99区99"
+    r'在线\s*播放',
+    r'视频\s*一区\s*二区',
+    r'久久+久+',
+    r'不卡\s*一区\s*二区',
+    r'精品\s*视频\s*在线',
+    r'日本\s*韩国\s*欧美'
+]
+
+# 只在困惑度检查中使用的特征
+EXTRA_SPAM_PATTERNS = [
+    r'激情\s*小说',
+    r'成人\s*视频',
+    r'在线\s*观看',
+    r'一本\s*道',
+    r'中文\s*字幕'
+]
+
+ALL_SPAM_PATTERNS = SEO_SPAM_PATTERNS + EXTRA_SPAM_PATTERNS
+
+# 以数字开头的特征在扫描时使用的形式：从 "区" 开始匹配，前面的 "\d+\s*" 另行检查
+NUMBERED_DISTRICT = r'\d+\s*区\s*\d+'
+_SCAN_FORMS = {NUMBERED_DISTRICT: r'区\s*\d'}
+
+# 按文档缓存的结果数量，同一文档在各组件之间复用即可
+CACHE_SIZE = 8
+
+# 首字符 -> [(特征, 锚定匹配用的正则)]
+_by_first_char = {}
+for _pattern in ALL_SPAM_PATTERNS:
+    _scan_form = _SCAN_FORMS.get(_pattern, _pattern)
+    _by_first_char.setdefault(_scan_form[0], []).append((_pattern, re.compile(_scan_form)))
+
+
+def _combined(patterns) -> re.Pattern:
+    """
+    尚未命中的特征合成的交替式，re 模块会缓存编译结果
+    """
+    return re.compile('|'.join(_SCAN_FORMS.get(pattern, pattern) for pattern in patterns))
+
+
+def _preceded_by_digit(text: str, start: int) -> bool:
+    """
+    start 之前跳过空白后是否为数字，与 "\\d+\\s*" 的判定一致
+    """
+    i = start
+    while i > 0 and text[i - 1].isspace():
+        i -= 1
+    return i > 0 and text[i - 1].isdecimal()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def find_spam_patterns(text: str) -> FrozenSet[str]:
+    """
+    一次扫描找出文本中出现的全部垃圾文本特征
+    Args:
+        text: 输入文本
+
+    Returns:
+        命中的特征（ALL_SPAM_PATTERNS 中的正则字符串）集合，按文本缓存
+    """
+    hits = set()
+    remaining = list(ALL_SPAM_PATTERNS)
+    combined = _combined(remaining)
+    pos = 0
+    while remaining:
+        match = combined.search(text, pos)
+        if match is None:
+            break
+        start = match.start()
+        pos = start + 1
+        found = False
+        for pattern, anchored in _by_first_char[text[start]]:
+            if pattern in hits or not anchored.match(text, start):
+                continue
+            if pattern == NUMBERED_DISTRICT and not _preceded_by_digit(text, start):
+                continue
+            hits.add(pattern)
+            found = True
+        if found:
+            # 已命中的特征不再参与后续扫描
+            remaining = [pattern for pattern in remaining if pattern not in hits]
+            combined = _combined(remaining) if remaining else None
+    return frozenset(hits)
+
+
+def has_spam_pattern(text: str, patterns: Iterable[str] = SEO_SPAM_PATTERNS) -> bool:
+    """
+    文本是否包含 patterns 中的任一特征
+    Args:
+        text: 输入文本
+        patterns: 要检查的特征，须为 ALL_SPAM_PATTERNS 的子集
+
+    Returns:
+        是否命中
+    """
+    hits = find_spam_patterns(text)
+    return any(pattern in hits for pattern in patterns)
@@ -1,9 +1,8 @@
-import fasttext
-from bs4 import BeautifulSoup
 import re
+from html_extract import get_extractor
+from lang_id import predict_chinese, get_model, DEFAULT_MAX_CHARS
 
-# 加载预训练语言识别模型（模型文件路径自行替换）  
-model = fasttext.load_model("lid.176.bin")  
+# 预训练语言识别模型在第一次判定时才加载，路径可用环境变量 FASTTEXT_LID_MODEL 指定（见 lang_id）
 
 def clean_text(text):
     """清理文本，去除无用字符"""
@@ -13,30 +12,51 @@ def clean_text(text):
     text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]', '', text)
     return text.strip()
 
-def is_chinese_fasttext(text, threshold=0.7):  
-    if not text or len(text) < 10:
-        return False
-        
-    # 清理文本
-    text = clean_text(text)
-    if not text:
-        return False
+def is_chinese_fasttext(text, threshold=0.7, max_chars=DEFAULT_MAX_CHARS):  
+    """判断单个文本是否为中文
+    :param max_chars: 只取均匀分布的最多 max_chars 个字符做预测，None 表示使用全文
+    """
+    return is_chinese_fasttext_batch([text], threshold, max_chars)[0]
+
+
+def is_chinese_fasttext_batch(texts, threshold=0.7, max_chars=DEFAULT_MAX_CHARS):
+    """批量判断文本是否为中文，整批只调用一次 model.predict
+    :param texts: 文本列表
+    :param max_chars: 每个文本只取均匀分布的最多 max_chars 个字符做预测，None 表示使用全文
+    :return: 布尔列表，与 texts 一一对应
+    """
+    results = [False] * len(texts)
+    # 过短或清理后为空的文本直接判为非中文，不参与预测
+    batch = []
+    for i, text in enumerate(texts):
+        if not text or len(text) < 10:
+            continue
+        # 清理文本
+        text = clean_text(text)
+        if text:
+            batch.append((i, text))
+    if not batch:
+        return results
         
     try:
-        predictions = model.predict(text, k=1)  # 返回最可能的语言和置信度  
-        lang_label, confidence = predictions[0][0], predictions[1][0]  
-        return lang_label == '__label__zh' and confidence >= threshold
+        predictions = predict_chinese(get_model(), [text for _, text in batch], threshold, max_chars)
     except ValueError as e:
         # 如果文本仍然有问题，可能需要进一步清理
         print(f"预测错误: {e}")
-        return False
+        return results
     except Exception as e:
         print(f"未知错误: {e}")
-        return False
+        return results
+    for (i, _), is_chinese in zip(batch, predictions):
+        results[i] = is_chinese
+    return results
+
 
+# 提取后端默认使用最快的可用实现，可用环境变量 HTML_EXTRACTOR 指定（见 html_extract）
+html_extractor = get_extractor(separator=' ')
 
 def remove_html_tags(html_content):
-    """使用 BeautifulSoup 移除 HTML 标签
+    """移除 HTML 标签，同时去掉脚本、样式、导航、页眉页脚等元素
     :param html_content: 包含 HTML 标签的字符串
     :return: 移除 HTML 标签后的文本
     """
@@ -45,14 +65,8 @@ def remove_html_tags(html_content):
         if not html_content or not isinstance(html_content, str):
             return ""
             
-        soup = BeautifulSoup(html_content, "html.parser")
-        
-        # 移除脚本和样式元素
-        for script in soup(["script", "style", "meta", "noscript", "header", "footer", "nav"]):
-            script.extract()
-            
         # 获取文本
-        text = soup.get_text(separator=' ')
+        text = html_extractor.extract(html_content)
         
         # 清理文本
         text = clean_text(text)